@@ -0,0 +1,393 @@
+"""
+Concurrent-user load test for the SSE HTTP server
+
+Starts the mock Ironclad API and `ironclad_mcp.http_server` as child
+processes, then opens simulated MCP SSE sessions, each with its own
+X-User-Email, and runs scripted tool-call mixes against them. The number of
+open sessions is stepped up through the requested levels so one run shows
+where latency starts to collapse.
+
+Reports, per interval and per load level: throughput, latency percentiles,
+error rate, open sessions and server process RSS.
+
+Usage:
+    python -m benchmarks.load_test --users 10 50 100 --stage-seconds 30
+    python -m benchmarks.load_test --users 200 --records 50000 --latency-ms 80 --output load.json
+    python -m benchmarks.load_test --target http://127.0.0.1:8000 --server-pid 12345 --users 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from .mock_ironclad import (
+    COUNTERPARTIES, PROJECT_ROOT, RECORD_TYPES, MockConfig, MockIroncladServer, _free_port
+)
+from .run_benchmarks import _git_commit, percentile
+
+
+# ========== Scenarios ==========
+
+class Scenario:
+    """A weighted, scripted sequence of tool calls run by one simulated user"""
+
+    def __init__(self, name: str, weight: int, steps):
+        """
+        Args:
+            name: Label used in the report
+            weight: Relative frequency among scenarios
+            steps: Callable (rng, records) -> list of (tool name, arguments)
+        """
+        self.name = name
+        self.weight = weight
+        self.steps = steps
+
+
+def _record_id(rng: random.Random, records: int) -> str:
+    return f"IC-{rng.randint(1, records)}"
+
+
+SCENARIOS = [
+    # Quick lookups: what most interactive questions turn into
+    Scenario("lookup", 6, lambda rng, records: [
+        ("search_contracts", {"counterparty": rng.choice(COUNTERPARTIES).split()[0], "limit": 20}),
+        ("get_contract_details", {"record_id": _record_id(rng, records)}),
+    ]),
+    # Browsing a record type and its workflows
+    Scenario("browse", 3, lambda rng, records: [
+        ("search_contracts", {"record_type": rng.choice(RECORD_TYPES), "limit": 50}),
+        ("count_contracts", {"record_type": rng.choice(RECORD_TYPES)}),
+        ("search_workflows", {"stage": "Review", "limit": 20}),
+    ]),
+    # Scan-backed questions (full scan on first use per user, then local indexes)
+    Scenario("analysis", 1, lambda rng, records: [
+        ("upcoming_renewals", {"record_type": rng.choice(RECORD_TYPES), "days": 90}),
+        ("get_contract_family", {"record_id": _record_id(rng, records)}),
+    ]),
+]
+
+
+# ========== Measurement ==========
+
+class LoadStats:
+    """Call samples and session counts shared by all simulated users"""
+
+    def __init__(self):
+        self.open_sessions = 0
+        self.failed_sessions = 0
+        # (monotonic finish time, tool, latency ms, error kind or None)
+        self.samples: List[Tuple[float, str, float, Optional[str]]] = []
+
+    def record(self, tool: str, latency_ms: float, error: Optional[str]) -> None:
+        self.samples.append((time.monotonic(), tool, latency_ms, error))
+
+    def window(self, start: float, end: float) -> List[Tuple[float, str, float, Optional[str]]]:
+        return [s for s in self.samples if start <= s[0] < end]
+
+
+def summarize_window(samples: List[Tuple[float, str, float, Optional[str]]], seconds: float) -> Dict:
+    """Throughput, latency percentiles and errors for a set of call samples"""
+    latencies = [s[2] for s in samples if s[3] is None]
+    errors: Dict[str, int] = {}
+    for _, _, _, error in samples:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    summary = {
+        "calls": len(samples),
+        "throughput_per_s": round(len(samples) / seconds, 2) if seconds else None,
+        "error_rate": round(sum(errors.values()) / len(samples), 4) if samples else 0.0,
+        "errors": errors,
+    }
+    if latencies:
+        summary.update({
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(max(latencies), 1),
+        })
+    return summary
+
+
+def process_rss_mb(pid: Optional[int]) -> Optional[float]:
+    """Resident set size of a process in MB (Linux /proc, falling back to ps)"""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        output = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True).stdout
+        return round(int(output.strip()) / 1024, 1) if output.strip() else None
+    except (OSError, ValueError):
+        return None
+
+
+# ========== Simulated Users ==========
+
+async def run_user(
+    index: int,
+    url: str,
+    records: int,
+    stats: LoadStats,
+    stop: asyncio.Event,
+    think_time: float,
+    call_timeout: float,
+    seed: int
+) -> None:
+    """One MCP session: connect, initialize, then run scenarios until stopped"""
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+
+    rng = random.Random(seed + index)
+    headers = {"X-User-Email": f"loadtest-user{index}@example.com"}
+    weights = [scenario.weight for scenario in SCENARIOS]
+
+    try:
+        async with sse_client(url, headers=headers, timeout=call_timeout, sse_read_timeout=call_timeout * 10) as (read, write):
+            async with ClientSession(read, write) as session:
+                await asyncio.wait_for(session.initialize(), call_timeout)
+                stats.open_sessions += 1
+                try:
+                    while not stop.is_set():
+                        scenario = rng.choices(SCENARIOS, weights)[0]
+                        for tool, arguments in scenario.steps(rng, records):
+                            if stop.is_set():
+                                break
+                            start = time.perf_counter()
+                            error = None
+                            try:
+                                result = await asyncio.wait_for(session.call_tool(tool, arguments), call_timeout)
+                                # Tool failures come back as an error message, not an MCP error
+                                text = "".join(getattr(content, "text", "") for content in result.content)
+                                if result.isError or text.startswith("❌ **Error calling tool"):
+                                    error = "tool_error"
+                            except asyncio.TimeoutError:
+                                error = "timeout"
+                            except Exception as e:
+                                error = type(e).__name__
+                            stats.record(tool, (time.perf_counter() - start) * 1000, error)
+                            # Think time between calls, exponentially distributed around the mean
+                            if think_time > 0:
+                                try:
+                                    await asyncio.wait_for(stop.wait(), rng.expovariate(1 / think_time))
+                                except asyncio.TimeoutError:
+                                    pass
+                finally:
+                    stats.open_sessions -= 1
+    except Exception as e:
+        stats.failed_sessions += 1
+        print(f"session {index} failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+async def run_load(args, url: str, server_pid: Optional[int]) -> Dict:
+    """Step through the load levels and collect per-interval and per-level results"""
+    stats = LoadStats()
+    stop = asyncio.Event()
+    tasks: List[asyncio.Task] = []
+    timeline: List[Dict] = []
+    stages: List[Dict] = []
+    test_start = time.monotonic()
+
+    def sample_interval(start: float, end: float) -> Dict:
+        row = {
+            "t_s": round(end - test_start, 1),
+            "open_sessions": stats.open_sessions,
+            "rss_mb": process_rss_mb(server_pid),
+            **summarize_window(stats.window(start, end), end - start),
+        }
+        timeline.append(row)
+        print(
+            f"t={row['t_s']:>6.1f}s sessions {row['open_sessions']:>4}  "
+            f"{row['throughput_per_s'] or 0:>7.1f} calls/s  "
+            f"p50 {row.get('p50_ms', 0):>8.1f} ms  p95 {row.get('p95_ms', 0):>8.1f} ms  "
+            f"errors {row['error_rate'] * 100:>5.1f}%  rss {row['rss_mb'] or 0:>7.1f} MB",
+            file=sys.stderr
+        )
+        return row
+
+    for level in sorted(args.users):
+        # Ramp up to this level, spreading connection setup over the ramp time
+        new_users = range(len(tasks), level)
+        for position, index in enumerate(new_users):
+            tasks.append(asyncio.create_task(run_user(
+                index, url, args.records, stats, stop, args.think_time, args.call_timeout, args.seed
+            )))
+            if args.ramp_seconds and len(new_users) > 1:
+                await asyncio.sleep(args.ramp_seconds / len(new_users))
+
+        print(f"--- {level} users ---", file=sys.stderr)
+        stage_start = time.monotonic()
+        interval_start = stage_start
+        rss_samples = []
+        while time.monotonic() - stage_start < args.stage_seconds:
+            await asyncio.sleep(min(args.interval, args.stage_seconds - (time.monotonic() - stage_start)))
+            now = time.monotonic()
+            row = sample_interval(interval_start, now)
+            if row["rss_mb"] is not None:
+                rss_samples.append(row["rss_mb"])
+            interval_start = now
+
+        stage_end = time.monotonic()
+        stages.append({
+            "users": level,
+            "open_sessions": stats.open_sessions,
+            "failed_sessions": stats.failed_sessions,
+            "seconds": round(stage_end - stage_start, 1),
+            "rss_mb_max": max(rss_samples) if rss_samples else None,
+            **summarize_window(stats.window(stage_start, stage_end), stage_end - stage_start),
+        })
+
+    stop.set()
+    await asyncio.wait(tasks, timeout=args.call_timeout)
+    for task in tasks:
+        task.cancel()
+
+    per_tool: Dict[str, Dict] = {}
+    for tool in sorted({s[1] for s in stats.samples}):
+        tool_samples = [s for s in stats.samples if s[1] == tool]
+        per_tool[tool] = summarize_window(tool_samples, time.monotonic() - test_start)
+
+    return {"stages": stages, "per_tool": per_tool, "timeline": timeline}
+
+
+# ========== Server Under Test ==========
+
+class HTTPServerProcess:
+    """Runs `python -m ironclad_mcp.http_server` against a mock Ironclad API"""
+
+    def __init__(self, ironclad_base_url: str, host: str = "127.0.0.1", port: int = 0):
+        self.ironclad_base_url = ironclad_base_url
+        self.host = host
+        self.port = port or _free_port(host)
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process else None
+
+    def start(self) -> "HTTPServerProcess":
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(PROJECT_ROOT / "src"), os.getenv("PYTHONPATH")])),
+            "HOST": self.host,
+            "PORT": str(self.port),
+            "IRONCLAD_BASE_URL": self.ironclad_base_url,
+            # The mock accepts any client credentials, so Secret Manager is skipped
+            "IRONCLAD_OAUTH_CLIENT_ID": "load-test",
+            "IRONCLAD_OAUTH_CLIENT_SECRET": "load-test",
+            "LOG_LEVEL": "warning",
+            "IRONCLAD_LOG_LEVEL": "WARNING",
+            "ACCESS_LOG": "false",
+        }
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "ironclad_mcp.http_server"],
+            cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                with urllib.request.urlopen(f"{self.url}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return self
+            except OSError:
+                if time.monotonic() > deadline or self._process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError("Ironclad MCP HTTP server failed to start")
+                time.sleep(0.1)
+
+    def stop(self) -> None:
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+    def __enter__(self) -> "HTTPServerProcess":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for the Ironclad MCP HTTP server")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 25, 50],
+                        help="Concurrent sessions per load level; levels run in ascending order")
+    parser.add_argument("--stage-seconds", type=float, default=30.0, help="How long each load level runs")
+    parser.add_argument("--ramp-seconds", type=float, default=5.0, help="Time to open the new sessions of a level")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between timeline samples")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between a user's calls (seconds)")
+    parser.add_argument("--call-timeout", type=float, default=60.0, help="Per-call timeout (seconds)")
+    parser.add_argument("--records", type=int, default=5_000, help="Mock dataset size")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mock upstream latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Mock upstream latency jitter")
+    parser.add_argument("--error-429-rate", type=float, default=0.0, help="Share of mock requests answered with 429")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for scenario choice and think time")
+    parser.add_argument("--target", help="Load an already running server (base URL) instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="PID of the --target server, for RSS sampling")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    args = parser.parse_args()
+
+    async def run(url: str, pid: Optional[int]) -> Dict:
+        return await run_load(args, f"{url}/sse", pid)
+
+    if args.target:
+        results = asyncio.run(run(args.target.rstrip("/"), args.server_pid))
+    else:
+        mock_config = MockConfig(
+            records=args.records,
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_429_rate=args.error_429_rate,
+        )
+        with MockIroncladServer(mock_config) as mock, HTTPServerProcess(mock.base_url) as server:
+            results = asyncio.run(run(server.url, server.pid))
+
+    print(f"{'users':>6} {'sessions':>9} {'calls/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'rss MB':>8}",
+          file=sys.stderr)
+    for stage in results["stages"]:
+        print(
+            f"{stage['users']:>6} {stage['open_sessions']:>9} {stage['throughput_per_s'] or 0:>9.1f} "
+            f"{stage.get('p50_ms', 0):>9.1f} {stage.get('p95_ms', 0):>9.1f} {stage.get('p99_ms', 0):>9.1f} "
+            f"{stage['error_rate'] * 100:>6.1f}% {stage['rss_mb_max'] or 0:>8.1f}",
+            file=sys.stderr
+        )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": vars(args),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
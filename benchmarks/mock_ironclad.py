@@ -0,0 +1,594 @@
+"""
+Local stand-in for the Ironclad public API
+
+Serves /oauth/token, /public/api/v1/records and /public/api/v1/workflows
+from a synthetic dataset so the MCP server can be benchmarked and load
+tested without network access or credentials.
+
+Records are generated on demand from their index (nothing is stored), so
+datasets of 1M records cost no memory. Properties follow the field
+definitions in knowledge_base/critical_fields.json, plus the term, renewal
+and parentRecordID fields the tools read.
+
+Usage:
+    python -m benchmarks.mock_ironclad --records 100000 --latency-ms 80 --port 8900
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CRITICAL_FIELDS_PATH = PROJECT_ROOT / "knowledge_base" / "critical_fields.json"
+
+RECORD_TYPES = [
+    "plusAgreement",
+    "procurementAgreement",
+    "NDA",
+    "plusAmendingAgreement",
+    "partnerMarketingAddendum",
+    "salesChannel",
+]
+REVENUE_TYPES = {"plusAgreement"}
+COUNTERPARTIES = [
+    "Zoom Video Communications", "Slack Technologies", "Microsoft Corporation",
+    "Acme Widgets Inc.", "Globex Corporation", "Initech LLC", "Umbrella Corp",
+    "Stark Industries", "Wayne Enterprises", "Hooli", "Pied Piper", "Vandelay Industries",
+]
+WORKFLOW_STEPS = ["Create", "Review", "Sign", "Archive"]
+
+TERM_FIELDS = {
+    "initialTermMonths_648ebaad-410a-4699-b44d-3766a659e1f0_number": ("number", [12, 24, 36]),
+    "renewalTerm_648ebaad-410a-4699-b44d-3766a659e1f0_number": ("number", [0, 12, 12, 24]),
+    "noticeForNonRenewal_648ebaad-410a-4699-b44d-3766a659e1f0_number": ("number", [30, 60, 90]),
+}
+END_DATE_FIELD = "agreementEndDate_b6b03c00-e54d-4644-9b47-15c12d4809b7_date"
+
+# Share of records that are children of an earlier record of the same type
+CHILD_RATIO = 0.1
+
+# Tokens of the filter syntax: operators, parentheses, commas, [field] and "value"
+FILTER_TOKEN = re.compile(r'\s*(?:(And|Or|Not|Equals|Contains)|([(),])|\[([^\]]+)\]|"((?:[^"\\]|\\.)*)")')
+
+
+class MockConfig:
+    """Knobs for the mock API"""
+
+    def __init__(
+        self,
+        records: int = 10_000,
+        workflows: int = 1_000,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        max_page_size: int = 100,
+        error_429_rate: float = 0.0,
+        retry_after_seconds: int = 1,
+        extra_properties: int = 0,
+        validators: int = 1,
+        seed: int = 42
+    ):
+        """
+        Args:
+            records: Number of records in the synthetic dataset
+            workflows: Number of workflows in the synthetic dataset
+            latency_ms: Added latency per request
+            jitter_ms: Uniform random jitter added on top of latency_ms
+            max_page_size: Largest pageSize honoured (Ironclad caps at 100)
+            error_429_rate: Probability (0-1) of answering a request with 429
+            retry_after_seconds: Retry-After sent with injected 429s
+            extra_properties: Padding properties per record, to mimic large records
+            validators: 1 to send ETag and Last-Modified with single records and
+                workflows and answer conditional requests for them with 304, 0 not to
+            seed: Seed for latency jitter and 429 injection
+        """
+        self.records = records
+        self.workflows = workflows
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.max_page_size = max_page_size
+        self.error_429_rate = error_429_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.extra_properties = extra_properties
+        self.validators = validators
+        self.seed = seed
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+
+def _load_field_specs() -> List[Tuple[str, str, str]]:
+    """(apiField, dataType, category) for every field in critical_fields.json"""
+    data = json.loads(CRITICAL_FIELDS_PATH.read_text(encoding="utf-8"))
+    specs = []
+    for category, group in data.items():
+        if not category.endswith("Fields"):
+            continue
+        for key, info in group.items():
+            specs.append((info.get("apiField", key), info.get("dataType", "string"), category))
+    return specs
+
+
+class SyntheticDataset:
+    """Deterministic records and workflows generated from their index"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.field_specs = _load_field_specs()
+        self.today = date.today()
+
+    # ========== Records ==========
+
+    @staticmethod
+    def record_uuid(index: int) -> str:
+        return f"{index:08x}-0000-4000-8000-{index:012x}"
+
+    def record_type(self, index: int) -> str:
+        return RECORD_TYPES[index % len(RECORD_TYPES)]
+
+    def _value(self, rng: random.Random, api_field: str, data_type: str, index: int):
+        if data_type == "date":
+            return (self.today - timedelta(days=rng.randint(0, 5 * 365))).isoformat()
+        if data_type == "number":
+            return round(rng.uniform(0, 5), 2)
+        if data_type == "monetaryAmount":
+            return {"amount": float(rng.randint(500, 50_000)), "currency": "USD"}
+        if data_type == "email":
+            return f"contact{index}@example.com"
+        return f"{api_field.split('_')[0]} value {index % 97}"
+
+    def record(self, index: int) -> Dict:
+        rng = random.Random(index)
+        record_type = self.record_type(index)
+        counterparty = COUNTERPARTIES[(index // len(RECORD_TYPES)) % len(COUNTERPARTIES)]
+
+        props: Dict[str, Dict] = {}
+        for api_field, data_type, category in self.field_specs:
+            if category == "revenueFields" and record_type not in REVENUE_TYPES:
+                continue
+            props[api_field] = {"type": data_type, "value": self._value(rng, api_field, data_type, index)}
+
+        effective = self.today - timedelta(days=rng.randint(0, 4 * 365))
+        props["counterpartyName"] = {"type": "string", "value": counterparty}
+        props["effectiveDate"] = {"type": "date", "value": effective.isoformat()}
+        for api_field, (data_type, choices) in TERM_FIELDS.items():
+            props[api_field] = {"type": data_type, "value": rng.choice(choices)}
+        if rng.random() < 0.5:
+            end = effective + timedelta(days=30 * props[next(iter(TERM_FIELDS))]["value"])
+            props[END_DATE_FIELD] = {"type": "date", "value": end.isoformat()}
+        props["contractValue"] = {
+            "type": "monetaryAmount",
+            "value": {"amount": float(rng.randint(1_000, 2_000_000)), "currency": "USD"}
+        }
+        props["status"] = {"type": "string", "value": "Active"}
+
+        # Children point at an earlier record of the same type
+        if index >= len(RECORD_TYPES) and rng.random() < CHILD_RATIO:
+            parent = index - len(RECORD_TYPES) * rng.randint(1, min(50, index // len(RECORD_TYPES)))
+            props["parentRecordID"] = {"type": "string", "value": f"IC-{parent + 1}"}
+
+        for n in range(self.config.extra_properties):
+            props[f"customField{n}_00000000-0000-4000-8000-000000000000_string"] = {
+                "type": "string",
+                "value": f"padding value {n} for record {index}"
+            }
+
+        return {
+            "id": self.record_uuid(index),
+            "ironcladId": f"IC-{index + 1}",
+            "name": f"{counterparty} - {record_type} {index + 1}",
+            "type": record_type,
+            "lastUpdated": (self.today - timedelta(days=index % 365)).isoformat() + "T00:00:00Z",
+            "properties": props,
+            "attachments": {},
+        }
+
+    def record_index(self, record_id: str) -> Optional[int]:
+        """Index of a record from its IC-ID or UUID"""
+        if record_id.upper().startswith("IC-"):
+            try:
+                index = int(record_id[3:]) - 1
+            except ValueError:
+                return None
+        else:
+            try:
+                index = int(record_id.split("-")[-1], 16)
+            except ValueError:
+                return None
+        return index if 0 <= index < self.config.records else None
+
+    def record_indexes(self, record_type: Optional[str]) -> range:
+        """Indexes of every record of a type (types are assigned round-robin)"""
+        if not record_type:
+            return range(self.config.records)
+        if record_type not in RECORD_TYPES:
+            return range(0)
+        return range(RECORD_TYPES.index(record_type), self.config.records, len(RECORD_TYPES))
+
+    # ========== Workflows ==========
+
+    def workflow(self, index: int) -> Dict:
+        rng = random.Random(-index - 1)
+        record_type = RECORD_TYPES[index % len(RECORD_TYPES)]
+        counterparty = COUNTERPARTIES[(index * 7) % len(COUNTERPARTIES)]
+        return {
+            "id": f"{index:08x}-1111-4000-8000-{index:012x}",
+            "ironcladId": f"IC-{self.config.records + index + 1}",
+            "title": f"{counterparty} - {record_type} workflow {index + 1}",
+            "type": record_type,
+            "step": WORKFLOW_STEPS[index % len(WORKFLOW_STEPS)],
+            "status": "active",
+            "created": (self.today - timedelta(days=rng.randint(0, 90))).isoformat() + "T00:00:00Z",
+            "lastUpdated": (self.today - timedelta(days=rng.randint(0, 10))).isoformat() + "T00:00:00Z",
+            "attributes": {"counterpartyName": counterparty},
+            "participants": [{"name": f"Reviewer {n}", "role": "reviewer"} for n in range(3)],
+            "approvals": [{"approver": {"email": "legal@example.com"}, "status": "Pending"}],
+            "comments": [],
+        }
+
+    def workflow_index(self, workflow_id: str) -> Optional[int]:
+        if workflow_id.upper().startswith("IC-"):
+            try:
+                index = int(workflow_id[3:]) - self.config.records - 1
+            except ValueError:
+                return None
+        else:
+            try:
+                index = int(workflow_id.split("-")[-1], 16)
+            except ValueError:
+                return None
+        return index if 0 <= index < self.config.workflows else None
+
+
+def _tokenize_filter(expression: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = FILTER_TOKEN.match(expression, pos)
+        if not match:
+            raise ValueError(f"Bad filter at {pos}: {expression[pos:pos + 20]!r}")
+        op, punct, field, value = match.groups()
+        if op:
+            tokens.append(("op", op))
+        elif punct:
+            tokens.append((punct, punct))
+        elif field is not None:
+            tokens.append(("field", field))
+        else:
+            tokens.append(("value", re.sub(r'\\(.)', r'\1', value)))
+        pos = match.end()
+    return tokens
+
+
+def _parse_filter(expression: Optional[str]) -> Optional[Tuple]:
+    """
+    Parse a filter expression into nested tuples
+
+    ("Equals" | "Contains", field, value) for terms, ("And" | "Or", [nodes])
+    and ("Not", node) for combinators; None for no filter.
+    """
+    if not expression:
+        return None
+    tokens = _tokenize_filter(expression)
+    pos = 0
+
+    def expect(kind: str) -> str:
+        nonlocal pos
+        if pos >= len(tokens) or tokens[pos][0] != kind:
+            raise ValueError(f"Expected {kind} in filter {expression!r}")
+        pos += 1
+        return tokens[pos - 1][1]
+
+    def node() -> Tuple:
+        nonlocal pos
+        if tokens[pos][0] == "(":
+            pos += 1
+            inner = node()
+            expect(")")
+            return inner
+        op = expect("op")
+        expect("(")
+        if op in ("Equals", "Contains"):
+            field = expect("field")
+            expect(",")
+            value = expect("value")
+            expect(")")
+            return (op, field, value)
+        operands = [node()]
+        while tokens[pos][0] == ",":
+            pos += 1
+            operands.append(node())
+        expect(")")
+        return ("Not", operands[0]) if op == "Not" else (op, operands)
+
+    return node()
+
+
+def _field_value(item: Dict, field: str):
+    if field in item:
+        return item[field]
+    container = item.get("properties") or {}
+    if field in container:
+        prop = container[field]
+        return prop.get("value") if isinstance(prop, dict) else prop
+    return (item.get("attributes") or {}).get(field)
+
+
+def _matches(item: Dict, node: Optional[Tuple]) -> bool:
+    if node is None:
+        return True
+    op = node[0]
+    if op == "And":
+        return all(_matches(item, child) for child in node[1])
+    if op == "Or":
+        return any(_matches(item, child) for child in node[1])
+    if op == "Not":
+        return not _matches(item, node[1])
+    _, field, expected = node
+    actual = _field_value(item, field)
+    if actual is None:
+        return False
+    if op == "Equals":
+        return str(actual) == expected
+    return expected.lower() in str(actual).lower()
+
+
+def _sorted_items(items: Iterator[Dict], field: str, descending: bool) -> List[Dict]:
+    """Order by a field like the MCP server's merge expects: missing values last"""
+    def value(item: Dict):
+        raw = _field_value(item, field)
+        if isinstance(raw, dict):
+            raw = raw.get("amount")
+        return raw
+
+    def key(item: Dict):
+        raw = value(item)
+        if isinstance(raw, (int, float)) and not isinstance(raw, bool):
+            return (0, raw)
+        return (1, str(raw).lower())
+
+    items = list(items)
+    present = [item for item in items if value(item) not in (None, "")]
+    missing = [item for item in items if value(item) in (None, "")]
+    return sorted(present, key=key, reverse=descending) + missing
+
+
+class MockIroncladAPI:
+    """Starlette application serving the synthetic dataset"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.dataset = SyntheticDataset(config)
+        self._rng = random.Random(config.seed)
+        self.request_count = 0
+        self.injected_429s = 0
+        self.not_modified = 0
+        self.app = Starlette(
+            routes=[
+                Route("/oauth/token", self.handle_token, methods=["POST"]),
+                Route("/public/api/v1/records", self.handle_records, methods=["GET"]),
+                Route("/public/api/v1/records/{record_id}", self.handle_record, methods=["GET"]),
+                Route("/public/api/v1/workflows", self.handle_workflows, methods=["GET"]),
+                Route("/public/api/v1/workflows/{workflow_id}", self.handle_workflow, methods=["GET"]),
+            ]
+        )
+
+    async def _simulate(self) -> Optional[Response]:
+        """Apply latency and 429 injection; returns a response to short-circuit with"""
+        self.request_count += 1
+        delay = self.config.latency_ms + self._rng.uniform(0, self.config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if self.config.error_429_rate and self._rng.random() < self.config.error_429_rate:
+            self.injected_429s += 1
+            return JSONResponse(
+                {"message": "Too Many Requests"},
+                status_code=429,
+                headers={"Retry-After": str(self.config.retry_after_seconds)}
+            )
+        return None
+
+    def _page_params(self, request: Request) -> Tuple[int, int]:
+        page = int(request.query_params.get("page", 0))
+        page_size = min(int(request.query_params.get("pageSize", 20)), self.config.max_page_size)
+        return page, max(page_size, 1)
+
+    def _paginate(self, items: Iterator[Dict], page: int, page_size: int) -> Dict:
+        """One page of a filtered listing; the full count needs a complete pass"""
+        start = page * page_size
+        page_items = []
+        count = 0
+        for item in items:
+            if start <= count < start + page_size:
+                page_items.append(item)
+            count += 1
+        return {
+            "page": page,
+            "pageSize": page_size,
+            "count": count,
+            "list": page_items,
+        }
+
+    async def handle_token(self, request: Request) -> Response:
+        rejected = await self._simulate()
+        if rejected:
+            return rejected
+        return JSONResponse({
+            "access_token": f"mock-token-{int(time.time())}",
+            "token_type": "Bearer",
+            "expires_in": 21600,
+        })
+
+    async def handle_records(self, request: Request) -> Response:
+        rejected = await self._simulate()
+        if rejected:
+            return rejected
+        page, page_size = self._page_params(request)
+        indexes = self.dataset.record_indexes(request.query_params.get("types"))
+        terms = _parse_filter(request.query_params.get("filter"))
+        sort_field = request.query_params.get("sortField")
+
+        if terms is None and not sort_field:
+            # Unfiltered: page arithmetically without generating other records
+            window = indexes[page * page_size:(page + 1) * page_size]
+            return JSONResponse({
+                "page": page,
+                "pageSize": page_size,
+                "count": len(indexes),
+                "list": [self.dataset.record(i) for i in window],
+            })
+
+        matches = (
+            record for record in (self.dataset.record(i) for i in indexes)
+            if _matches(record, terms)
+        )
+        if sort_field:
+            descending = request.query_params.get("sortDirection", "ASC").upper() == "DESC"
+            matches = iter(_sorted_items(matches, sort_field, descending))
+        return JSONResponse(self._paginate(matches, page, page_size))
+
+    async def handle_record(self, request: Request) -> Response:
+        rejected = await self._simulate()
+        if rejected:
+            return rejected
+        index = self.dataset.record_index(request.path_params["record_id"])
+        if index is None:
+            return JSONResponse({"message": "Record not found"}, status_code=404)
+        return self._conditional(request, self.dataset.record(index))
+
+    async def handle_workflows(self, request: Request) -> Response:
+        rejected = await self._simulate()
+        if rejected:
+            return rejected
+        page, page_size = self._page_params(request)
+        record_type = request.query_params.get("types")
+        terms = _parse_filter(request.query_params.get("filter"))
+        workflows = (self.dataset.workflow(i) for i in range(self.config.workflows))
+        matches = (
+            wf for wf in workflows
+            if (not record_type or wf["type"] == record_type) and _matches(wf, terms)
+        )
+        return JSONResponse(self._paginate(matches, page, page_size))
+
+    async def handle_workflow(self, request: Request) -> Response:
+        rejected = await self._simulate()
+        if rejected:
+            return rejected
+        index = self.dataset.workflow_index(request.path_params["workflow_id"])
+        if index is None:
+            return JSONResponse({"message": "Workflow not found"}, status_code=404)
+        return self._conditional(request, self.dataset.workflow(index))
+
+    def _conditional(self, request: Request, item: Dict) -> Response:
+        """A single record or workflow, or 304 if the client's copy is current"""
+        if not self.config.validators:
+            return JSONResponse(item)
+        body = json.dumps(item).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        updated = datetime.fromisoformat(item["lastUpdated"].replace("Z", "+00:00"))
+        last_modified = format_datetime(updated, usegmt=True)
+        headers = {"ETag": etag, "Last-Modified": last_modified}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            unchanged = etag in (tag.strip() for tag in if_none_match.split(","))
+        else:
+            unchanged = request.headers.get("if-modified-since") == last_modified
+        if unchanged:
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+
+class MockIroncladServer:
+    """
+    Runs the mock API in a child process
+
+    A separate process keeps the mock's JSON encoding out of the measured
+    process (CPU, GIL and tracemalloc numbers stay clean).
+
+    Usage:
+        with MockIroncladServer(MockConfig(records=10_000)) as mock:
+            client = IroncladClient(mock.base_url, "token", "bench@example.com")
+    """
+
+    def __init__(self, config: MockConfig, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.host = host
+        self.port = port or _free_port(host)
+        self._process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "MockIroncladServer":
+        args = [sys.executable, "-m", "benchmarks.mock_ironclad", "--host", self.host, "--port", str(self.port)]
+        for key, value in self.config.to_dict().items():
+            args += [f"--{key.replace('_', '-')}", str(value)]
+        self._process = subprocess.Popen(args, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                with socket.create_connection((self.host, self.port), timeout=0.2):
+                    return self
+            except OSError:
+                if time.monotonic() > deadline or self._process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError("Mock Ironclad API failed to start")
+                time.sleep(0.05)
+
+    def stop(self) -> None:
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+    def __enter__(self) -> "MockIroncladServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def _free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mock Ironclad API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    defaults = MockConfig()
+    for key, value in defaults.to_dict().items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = MockConfig(**{key: getattr(args, key) for key in defaults.to_dict()})
+    print(f"Mock Ironclad API on http://{args.host}:{args.port} ({config.records:,} records)", file=sys.stderr)
+    uvicorn.run(MockIroncladAPI(config).app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
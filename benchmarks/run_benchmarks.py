@@ -0,0 +1,338 @@
+"""
+Offline benchmark suite for the Ironclad MCP server
+
+Runs against the local mock API (benchmarks/mock_ironclad.py), so results
+are repeatable and need no credentials. Measures:
+- scan: fetch_all_records throughput per dataset size
+- memory: tracemalloc peak while scanning
+- tools: end-to-end call_tool latency per tool (mock upstream over HTTP)
+- renderers: call_tool cost with an in-process canned client (formatting only)
+
+Usage:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 1000 100000 1000000 --latency-ms 50
+    python -m benchmarks.run_benchmarks --output bench_results.json
+    python -m benchmarks.run_benchmarks --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+from ironclad_mcp.ironclad_client import IroncladClient  # noqa: E402
+
+from .mock_ironclad import MockConfig, MockIroncladServer, SyntheticDataset  # noqa: E402
+
+BENCH_TOKEN = "bench-token"
+BENCH_USER = "bench@example.com"
+PAGE_SIZE = 100
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(samples_ms: List[float]) -> Dict:
+    return {
+        "n": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 4),
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p95_ms": round(percentile(samples_ms, 95), 4),
+        "max_ms": round(max(samples_ms), 4),
+    }
+
+
+# ========== Scan Throughput & Memory ==========
+
+async def _scan(base_url: str) -> List[Dict]:
+    async with IroncladClient(base_url, BENCH_TOKEN, BENCH_USER) as client:
+        return await client.fetch_all_records()
+
+
+def bench_scan(base_url: str, size: int) -> Dict:
+    start = time.perf_counter()
+    records = asyncio.run(_scan(base_url))
+    elapsed = time.perf_counter() - start
+    return {
+        "dataset_size": size,
+        "records": len(records),
+        "pages": (len(records) + PAGE_SIZE - 1) // PAGE_SIZE,
+        "seconds": round(elapsed, 3),
+        "records_per_second": round(len(records) / elapsed, 1) if elapsed else None,
+        "complete": len(records) == size,
+    }
+
+
+def bench_memory(base_url: str, size: int) -> Dict:
+    tracemalloc.start()
+    try:
+        records = asyncio.run(_scan(base_url))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "dataset_size": size,
+        "records": len(records),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+        "peak_bytes_per_record": round(peak / len(records), 1) if records else None,
+    }
+
+
+# ========== Tool Latency ==========
+
+def tool_cases(dataset: SyntheticDataset) -> List[tuple]:
+    """(tool name, arguments) pairs covering every tool"""
+    records = dataset.config.records
+    return [
+        ("search_contracts", {"query": "Zoom", "limit": 20}),
+        ("search_contracts", {"record_type": "procurementAgreement", "limit": 100}),
+        ("search_contracts", {"practice_area": "Revenue", "counterparty": "Zoom", "limit": 20}),
+        ("search_contracts", {
+            "record_type": "procurementAgreement",
+            "date_field": "effectiveDate",
+            "date_from": "2025-01-01",
+            "date_to": "2025-12-31",
+            "limit": 20,
+        }),
+        ("count_contracts", {"record_type": "plusAgreement"}),
+        ("count_contracts", {
+            "record_type": "procurementAgreement",
+            "date_field": "effectiveDate",
+            "date_from": "2024-01-01",
+            "date_to": "2024-12-31",
+        }),
+        ("get_contract_details", {"record_id": "IC-7"}),
+        ("get_contract_attachments", {"record_id": "IC-7"}),
+        ("search_workflows", {"stage": "Review", "limit": 20}),
+        ("get_workflow_details", {"workflow_id": f"IC-{records + 5}"}),
+        ("get_contract_family", {"record_id": f"IC-{min(records, 600)}"}),
+        ("upcoming_renewals", {"record_type": "procurementAgreement", "days": 90}),
+    ]
+
+
+def _install_client(client) -> None:
+    """Point the MCP tool handlers at a benchmark client"""
+    from ironclad_mcp import server
+    from ironclad_mcp.request_context import current_user_email
+
+    current_user_email.set(BENCH_USER)
+    server._user_clients[BENCH_USER] = client
+    if hasattr(client, "add_scan_listener"):
+        client.add_scan_listener(server._hierarchy_indexes[BENCH_USER])
+        client.add_scan_listener(server._renewal_calendars[BENCH_USER])
+        client.add_scan_listener(server._record_indexes[BENCH_USER])
+
+
+def _case_label(name: str, arguments: Dict) -> str:
+    return f"{name}({', '.join(f'{k}={v}' for k, v in arguments.items())})"
+
+
+async def _time_tools(cases: List[tuple], iterations: int, timer: Callable[[], float]) -> Dict:
+    from ironclad_mcp import server
+
+    results = {}
+    for name, arguments in cases:
+        first_start = timer()
+        result = await server.call_tool(name, arguments)
+        first_call_ms = (timer() - first_start) * 1000
+
+        samples = []
+        for _ in range(iterations):
+            start = timer()
+            result = await server.call_tool(name, arguments)
+            samples.append((timer() - start) * 1000)
+
+        summary = summarize(samples)
+        summary["first_call_ms"] = round(first_call_ms, 3)
+        summary["response_chars"] = len(result[0].text) if result else 0
+        summary["error"] = result[0].text.startswith("❌") if result else False
+        results[_case_label(name, arguments)] = summary
+    return results
+
+
+def bench_tools(base_url: str, dataset: SyntheticDataset, iterations: int) -> Dict:
+    async def run():
+        async with IroncladClient(base_url, BENCH_TOKEN, BENCH_USER) as client:
+            _install_client(client)
+            return await _time_tools(tool_cases(dataset), iterations, time.perf_counter)
+
+    return asyncio.run(run())
+
+
+# ========== Renderer Cost ==========
+
+class CannedClient:
+    """In-process stand-in for IroncladClient that answers from the synthetic dataset"""
+
+    def __init__(self, dataset: SyntheticDataset, page_size: int = 100):
+        self.dataset = dataset
+        self.records = [dataset.record(i) for i in range(min(page_size, dataset.config.records))]
+        self.workflows = [dataset.workflow(i) for i in range(min(page_size, dataset.config.workflows))]
+
+    async def search_records(self, page_size: int = 100, **kwargs) -> Dict:
+        return {"total": self.dataset.config.records, "records": self.records[:page_size]}
+
+    async def count_records(self, **kwargs) -> int:
+        return self.dataset.config.records
+
+    async def get_record(self, record_id: str) -> Dict:
+        return self.dataset.record(self.dataset.record_index(record_id) or 0)
+
+    async def get_record_attachments(self, record_id: str) -> Dict:
+        return (await self.get_record(record_id)).get("attachments", {})
+
+    async def fetch_all_records(self, **kwargs) -> List[Dict]:
+        return self.records
+
+    async def search_workflows(self, page_size: int = 100, **kwargs) -> Dict:
+        return {"total": self.dataset.config.workflows, "workflows": self.workflows[:page_size]}
+
+    async def get_workflow(self, workflow_id: str) -> Dict:
+        return self.dataset.workflow(self.dataset.workflow_index(workflow_id) or 0)
+
+
+def bench_renderers(dataset: SyntheticDataset, iterations: int) -> Dict:
+    async def run():
+        _install_client(CannedClient(dataset))
+        return await _time_tools(tool_cases(dataset), iterations, time.perf_counter)
+
+    results = asyncio.run(run())
+    # Renderer cost is small; report microseconds
+    return {
+        label: {
+            "mean_us": round(summary["mean_ms"] * 1000, 1),
+            "p95_us": round(summary["p95_ms"] * 1000, 1),
+            "response_chars": summary["response_chars"],
+        }
+        for label, summary in results.items()
+    }
+
+
+# ========== Results ==========
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(prefix: str, value, out: Dict[str, float]) -> None:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else str(key), item, out)
+    elif isinstance(value, list):
+        for item in value:
+            key = item.get("dataset_size", "?") if isinstance(item, dict) else "?"
+            _flatten(f"{prefix}[{key}]", item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+
+def compare(old_path: Path, new_path: Path) -> None:
+    """Print every numeric metric present in both results files with its change"""
+    old_metrics: Dict[str, float] = {}
+    new_metrics: Dict[str, float] = {}
+    _flatten("", json.loads(old_path.read_text())["results"], old_metrics)
+    _flatten("", json.loads(new_path.read_text())["results"], new_metrics)
+
+    print(f"{'metric':<90} {'old':>12} {'new':>12} {'change':>9}")
+    for key in sorted(old_metrics.keys() & new_metrics.keys()):
+        old, new = old_metrics[key], new_metrics[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{key:<90} {old:>12} {new:>12} {change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Ironclad MCP server")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000],
+                        help="Dataset sizes for scan/memory benchmarks (1k to 1M)")
+    parser.add_argument("--tool-records", type=int, default=5_000,
+                        help="Dataset size used for tool latency benchmarks")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mock upstream latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Mock upstream latency jitter")
+    parser.add_argument("--error-429-rate", type=float, default=0.0, help="Share of mock requests answered with 429")
+    parser.add_argument("--extra-properties", type=int, default=0, help="Padding properties per record")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed iterations per tool")
+    parser.add_argument("--only", nargs="+", choices=["scan", "memory", "tools", "renderers"],
+                        help="Run a subset of the suite")
+    parser.add_argument("--output", type=Path, help="Write results JSON to this file")
+    parser.add_argument("--compare", type=Path, nargs=2, metavar=("OLD", "NEW"),
+                        help="Compare two results files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    selected = set(args.only or ["scan", "memory", "tools", "renderers"])
+    mock_options = {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_429_rate": args.error_429_rate,
+        "extra_properties": args.extra_properties,
+    }
+    results: Dict = {}
+
+    if selected & {"scan", "memory"}:
+        for size in args.sizes:
+            with MockIroncladServer(MockConfig(records=size, **mock_options)) as mock:
+                if "scan" in selected:
+                    row = bench_scan(mock.base_url, size)
+                    results.setdefault("scan", []).append(row)
+                    print(f"scan   {size:>9,} records: {row['seconds']:>8.2f}s  {row['records_per_second']:>10,.0f} rec/s", file=sys.stderr)
+                if "memory" in selected:
+                    row = bench_memory(mock.base_url, size)
+                    results.setdefault("memory", []).append(row)
+                    print(f"memory {size:>9,} records: {row['peak_mb']:>8.2f} MB peak", file=sys.stderr)
+
+    tool_config = MockConfig(records=args.tool_records, **mock_options)
+    dataset = SyntheticDataset(tool_config)
+
+    if "tools" in selected:
+        with MockIroncladServer(tool_config) as mock:
+            results["tools"] = bench_tools(mock.base_url, dataset, args.iterations)
+        for label, summary in results["tools"].items():
+            print(f"tool   {label:<70} p50 {summary['p50_ms']:>9.2f} ms  p95 {summary['p95_ms']:>9.2f} ms", file=sys.stderr)
+
+    if "renderers" in selected:
+        results["renderers"] = bench_renderers(dataset, args.iterations)
+        for label, summary in results["renderers"].items():
+            print(f"render {label:<70} {summary['mean_us']:>9.1f} µs", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": {**vars(args), "output": str(args.output) if args.output else None, "compare": None},
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
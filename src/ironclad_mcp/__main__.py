@@ -1,7 +1,7 @@
 """
 Entry point for running ironclad_mcp as a module
 """
-from .server import main
+from .startup import main
 
 if __name__ == "__main__":
     main()
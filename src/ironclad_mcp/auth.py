@@ -2,23 +2,38 @@
 OAuth authentication for Ironclad API
 """
 import os
-import httpx
 from typing import Optional, Dict
 from datetime import datetime, timedelta
 
+from .metrics import OAUTH_TOKEN_REQUESTS
+from .token_cache import TokenCache
+
 
 class IroncladOAuthClient:
     """Handles OAuth token management for Ironclad API"""
     
-    def __init__(self, base_url: str, client_id: str, client_secret: str):
+    def __init__(
+        self,
+        base_url: str,
+        client_id: str,
+        client_secret: str,
+        token_cache: Optional[TokenCache] = None
+    ):
         self.base_url = base_url
         self.client_id = client_id
         self.client_secret = client_secret
         self.token_url = f"{base_url}/oauth/token"
+        self.token_cache = token_cache
         
         # Token cache
         self._access_token: Optional[str] = None
         self._token_expires_at: Optional[datetime] = None
+        
+        # Reuse a token persisted by a previous process
+        if token_cache:
+            cached = token_cache.load(base_url)
+            if cached:
+                self._access_token, self._token_expires_at = cached
     
     async def get_access_token(self) -> str:
         """
@@ -36,6 +51,8 @@ class IroncladOAuthClient:
     
     async def _request_new_token(self) -> str:
         """Request a new access token using client credentials grant"""
+        import httpx
+        
         async with httpx.AsyncClient() as client:
             response = await client.post(
                 self.token_url,
@@ -52,16 +69,21 @@ class IroncladOAuthClient:
             )
             
             if response.status_code != 200:
+                OAUTH_TOKEN_REQUESTS.inc(result="error")
                 raise Exception(
                     f"Failed to obtain OAuth token: {response.status_code} - {response.text}"
                 )
             
             token_data = response.json()
+            OAUTH_TOKEN_REQUESTS.inc(result="success")
             
             self._access_token = token_data["access_token"]
             expires_in = token_data.get("expires_in", 21600)  # Default 6 hours
             self._token_expires_at = datetime.now() + timedelta(seconds=expires_in)
             
+            if self.token_cache:
+                self.token_cache.store(self.base_url, self._access_token, self._token_expires_at)
+            
             return self._access_token
 
 
@@ -0,0 +1,285 @@
+"""
+Circuit breaker and last-known-good responses for the Ironclad API
+
+When Ironclad fails (5xx responses, connection errors, timeouts) or slows
+down, every tool call used to wait out its timeouts and then fail. The
+breaker watches the outcome of recent upstream requests. When too many of
+them fail, or take too long, it opens: requests then fail at once with
+CircuitOpen instead of adding load to an API that is already struggling.
+After a cool-down one probe request is let through; success closes the
+breaker, failure opens it for another cool-down.
+
+GET requests that cannot be answered, because the breaker is open or the
+request itself failed, are served the last good response to the same URL
+for the same user, if one is kept (in memory, least recently used dropped
+first, and seeded from the on-disk cache of records and workflows, see
+http_cache). Tool responses built from such data say how old it is (see
+collect_stale_reads), and the request is repeated in the background once
+the breaker lets requests through again, so later calls get fresh data.
+
+Configured through the environment:
+- IRONCLAD_BREAKER_WINDOW: recent requests the breaker judges by (default 20)
+- IRONCLAD_BREAKER_MIN_REQUESTS: requests in the window before it can open (default 10)
+- IRONCLAD_BREAKER_ERROR_RATIO: share of failed requests that opens it (default 0.5)
+- IRONCLAD_BREAKER_SLOW_RATIO: share of slow requests that opens it (default 0.5)
+- IRONCLAD_BREAKER_SLOW_SECONDS: latency above which a request counts as slow (default 10)
+- IRONCLAD_BREAKER_OPEN_SECONDS: cool-down before a probe request (default 30)
+- IRONCLAD_STALE_CACHE_MB: memory for last good responses (default 64)
+- IRONCLAD_STALE_MAX_AGE_SECONDS: oldest response that is still served (default 86400)
+"""
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+import httpx
+
+from .metrics import UPSTREAM_CIRCUIT_STATE, UPSTREAM_CIRCUIT_TRIPS
+
+logger = logging.getLogger(__name__)
+
+BREAKER_WINDOW = int(os.getenv("IRONCLAD_BREAKER_WINDOW", "20"))
+BREAKER_MIN_REQUESTS = int(os.getenv("IRONCLAD_BREAKER_MIN_REQUESTS", "10"))
+BREAKER_ERROR_RATIO = float(os.getenv("IRONCLAD_BREAKER_ERROR_RATIO", "0.5"))
+BREAKER_SLOW_RATIO = float(os.getenv("IRONCLAD_BREAKER_SLOW_RATIO", "0.5"))
+BREAKER_SLOW_SECONDS = float(os.getenv("IRONCLAD_BREAKER_SLOW_SECONDS", "10"))
+BREAKER_OPEN_SECONDS = float(os.getenv("IRONCLAD_BREAKER_OPEN_SECONDS", "30"))
+STALE_CACHE_MB = int(os.getenv("IRONCLAD_STALE_CACHE_MB", "64"))
+STALE_MAX_AGE_SECONDS = int(os.getenv("IRONCLAD_STALE_MAX_AGE_SECONDS", "86400"))
+
+# Breaker states, and their value in the state gauge
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Request outcomes
+OK = "ok"
+SLOW = "slow"
+ERROR = "error"
+
+
+class CircuitOpen(Exception):
+    """Upstream requests are paused while the breaker is open"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Ironclad API requests are paused after repeated failures")
+        self.retry_after = retry_after
+
+    def retry_after_header(self) -> str:
+        """Value for a Retry-After header (whole seconds, at least 1)"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class CircuitBreaker:
+    """
+    Opens after too many failed or slow requests among the last `window`
+
+    Requests that were abandoned (cancelled, or cut short by the call's own
+    deadline) say nothing about Ironclad and are not counted.
+    """
+
+    def __init__(
+        self,
+        window: int = BREAKER_WINDOW,
+        min_requests: int = BREAKER_MIN_REQUESTS,
+        error_ratio: float = BREAKER_ERROR_RATIO,
+        slow_ratio: float = BREAKER_SLOW_RATIO,
+        slow_seconds: float = BREAKER_SLOW_SECONDS,
+        open_seconds: float = BREAKER_OPEN_SECONDS
+    ):
+        self.min_requests = max(1, min_requests)
+        self.error_ratio = error_ratio
+        self.slow_ratio = slow_ratio
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes: Deque[str] = deque(maxlen=max(window, self.min_requests))
+        self._opened_at = 0.0
+        self._probing = False
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"Ironclad API circuit breaker {self.state} -> {state}")
+        self.state = state
+        UPSTREAM_CIRCUIT_STATE.set(_STATE_VALUES[state])
+
+    def _open(self, reason: str) -> None:
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        UPSTREAM_CIRCUIT_TRIPS.inc(reason=reason)
+        self._set_state(OPEN)
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a probe through (0 unless it is open)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def classify(self, status_code: int, seconds: float) -> str:
+        """Outcome of a request that got a response"""
+        if status_code >= 500:
+            return ERROR
+        return SLOW if seconds > self.slow_seconds else OK
+
+    def before_request(self) -> bool:
+        """
+        Check that a request may be sent now
+
+        Returns:
+            True if the request is the probe of a half-open breaker
+
+        Raises:
+            CircuitOpen: While the breaker is open, or its probe is still out
+        """
+        if self.state == OPEN:
+            left = self.retry_after()
+            if left > 0:
+                raise CircuitOpen(left)
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                raise CircuitOpen(1.0)
+            self._probing = True
+            return True
+        return False
+
+    def record(self, outcome: Optional[str], probe: bool = False) -> None:
+        """
+        Count the outcome of a request
+
+        Args:
+            outcome: OK, SLOW or ERROR, or None if the request was abandoned
+            probe: Whether it was the probe of a half-open breaker
+        """
+        if probe:
+            self._probing = False
+            if outcome == OK:
+                self._set_state(CLOSED)
+            elif outcome is not None:
+                self._open("probe")
+            return
+        if self.state != CLOSED or outcome is None:
+            return
+        self._outcomes.append(outcome)
+        if len(self._outcomes) < self.min_requests:
+            return
+        if self._outcomes.count(ERROR) >= self.error_ratio * len(self._outcomes):
+            self._open("errors")
+        elif self._outcomes.count(SLOW) >= self.slow_ratio * len(self._outcomes):
+            self._open("latency")
+
+
+class LastKnownGood:
+    """
+    Most recent successful JSON response per (user, URL), within a memory budget
+
+    Entries are dropped least recently used first, and are not served once
+    older than `max_age_seconds`.
+    """
+
+    def __init__(self, max_bytes: int = STALE_CACHE_MB * 1024 * 1024, max_age_seconds: int = STALE_MAX_AGE_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        # (user, url) -> (time.time() fetched, status, headers, body)
+        self._entries: "OrderedDict[Tuple[Optional[str], str], Tuple[float, int, Dict[str, str], bytes]]" = OrderedDict()
+        self._bytes = 0
+
+    def _drop(self, key: Tuple[Optional[str], str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[3])
+
+    def put(self, user: Optional[str], url: str, response: httpx.Response, fetched_at: Optional[float] = None) -> None:
+        """
+        Keep a successful response (anything but JSON, or too big to keep, is ignored)
+
+        Args:
+            user: User the response was fetched for
+            url: Request URL
+            response: The response
+            fetched_at: time.time() Ironclad sent it, if not just now (e.g. for a response from disk)
+        """
+        content_type = response.headers.get("content-type", "")
+        if "json" not in content_type or len(response.content) > self.max_bytes // 8:
+            return
+        key = (user, url)
+        self._drop(key)
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        self._entries[key] = (fetched_at, response.status_code, {"content-type": content_type}, response.content)
+        self._bytes += len(response.content)
+        while self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def get(self, user: Optional[str], url: str) -> Optional[Tuple[float, int, Dict[str, str], bytes]]:
+        """
+        The last good response to `url` for `user`
+
+        Returns:
+            (age in seconds, status, headers, body), or None if there is none young enough
+        """
+        entry = self._entries.get((user, url))
+        if entry is None:
+            return None
+        age = time.time() - entry[0]
+        if age > self.max_age_seconds:
+            self._drop((user, url))
+            return None
+        self._entries.move_to_end((user, url))
+        return age, entry[1], entry[2], entry[3]
+
+
+class StaleReads:
+    """Stale responses a tool call was served"""
+
+    def __init__(self):
+        self.count = 0
+        # Age of the oldest one, in seconds
+        self.oldest: Optional[float] = None
+
+    def note(self, age: float) -> None:
+        self.count += 1
+        self.oldest = age if self.oldest is None else max(self.oldest, age)
+
+    def notice(self) -> str:
+        """Warning to put above a response built from stale data ('' if there was none)"""
+        if self.oldest is None:
+            return ""
+        return (
+            f"⚠️ Ironclad is not responding normally, so this answer uses cached data up to "
+            f"{format_age(self.oldest)} old. It is being refreshed in the background.\n\n"
+        )
+
+
+# Stale reads of the current tool call (None outside a tool call)
+stale_reads: ContextVar[Optional[StaleReads]] = ContextVar("stale_reads", default=None)
+
+
+@contextmanager
+def collect_stale_reads() -> Iterator[StaleReads]:
+    """Record the stale responses served to requests made in the block"""
+    reads = StaleReads()
+    token = stale_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        stale_reads.reset(token)
+
+
+def format_age(seconds: float) -> str:
+    """Rough age for people: '40 seconds', '12 minutes', '3 hours', '2 days'"""
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            count = int(seconds // size)
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    count = int(seconds)
+    return f"{count} second{'s' if count != 1 else ''}"
+
+
+# Shared by every IroncladClient in the process: they all talk to the same API
+breaker = CircuitBreaker()
+last_known_good = LastKnownGood()
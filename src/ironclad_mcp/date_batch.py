@@ -0,0 +1,272 @@
+"""
+Batch date parsing, range filtering and period bucketing
+
+Date-filtered scans used to parse every record's date with
+DateParser.parse_date (strip, suffix check, fromisoformat, regex fallback)
+inside a Python loop. Here a page's date strings are converted into a
+NumPy datetime64 array in one call. Range checks and month, quarter or year
+buckets are then array operations. Values NumPy cannot read on its own, such
+as non-UTC offsets or odd formats, go through DateParser one by one.
+
+NumPy is optional. Without it, every function falls back to the per-record
+DateParser path and gives the same results.
+
+All datetime64 values are naive UTC with second precision.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from .date_utils import DateParser
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERIODS = ("month", "quarter", "year")
+
+
+def extract_date_strings(records: Sequence[Dict], date_field: str) -> List[Optional[str]]:
+    """Raw value of a date property for each record (None where it is missing)"""
+    values = []
+    for record in records:
+        prop = record.get("properties", {}).get(date_field)
+        value = prop.get("value") if isinstance(prop, dict) else prop
+        values.append(value if isinstance(value, str) and value else None)
+    return values
+
+
+def _to_datetime64(value: Optional[str]):
+    """Slow path for one value: DateParser, converted to naive UTC"""
+    try:
+        parsed = DateParser.parse_date(value)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Error parsing date for record: {e}")
+        return np.datetime64("NaT", "s")
+    if parsed is None:
+        return np.datetime64("NaT", "s")
+    return np.datetime64(parsed.astimezone(timezone.utc).replace(tzinfo=None), "s")
+
+
+def parse_dates(values: Sequence[Optional[str]]):
+    """
+    Parse date strings into a datetime64[s] array (NaT where missing or unparseable)
+
+    ISO dates and UTC timestamps ('Z' or '+00:00') are converted in one call;
+    other offsets and formats fall back to DateParser.
+
+    Args:
+        values: Date strings (None for missing)
+
+    Returns:
+        numpy.ndarray of datetime64[s], aligned with `values`
+
+    Raises:
+        RuntimeError: If NumPy is not installed
+    """
+    if np is None:
+        raise RuntimeError("parse_dates requires numpy")
+    if not len(values):
+        return np.array([], dtype="datetime64[s]")
+
+    text = np.char.strip(np.array([value or "" for value in values], dtype=str))
+    text = np.char.replace(np.char.replace(text, "+00:00", ""), "Z", "")
+    # Left for DateParser: non-UTC offsets ('+05:30', '-08:00' after the
+    # time) and anything that does not start like an ISO date
+    slow = (np.char.find(text, "+") >= 0) | (np.char.rfind(text, "-") > 7)
+    slow |= (text != "") & ~_iso_shaped(text)
+    try:
+        dates = np.where(slow, "", text).astype("datetime64[s]")
+    except ValueError:
+        # ISO-shaped but invalid (e.g. '2025-02-30'): parse element by element
+        dates = np.empty(len(text), dtype="datetime64[s]")
+        for i, value in enumerate(text):
+            try:
+                dates[i] = "NaT" if slow[i] else np.datetime64(value, "s")
+            except ValueError:
+                slow[i] = True
+    for i in np.flatnonzero(slow):
+        dates[i] = _to_datetime64(values[i])
+    return dates
+
+
+def _iso_shaped(text):
+    """Boolean array: which strings start with 'YYYY-MM-DD', optionally followed by 'T' or a space"""
+    width = text.dtype.itemsize // 4
+    if width < 10:
+        return np.zeros(len(text), dtype=bool)
+    # One row of UCS-4 code points per string
+    codes = text.view(np.uint32).reshape(len(text), width)
+    digits = codes[:, [0, 1, 2, 3, 5, 6, 8, 9]]
+    shaped = ((digits >= ord("0")) & (digits <= ord("9"))).all(axis=1)
+    shaped &= (codes[:, 4] == ord("-")) & (codes[:, 7] == ord("-"))
+    if width > 10:
+        shaped &= np.isin(codes[:, 10], (0, ord("T"), ord(" ")))
+    return shaped
+
+
+def _naive_utc(value: datetime):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(value, "s")
+
+
+def date_range_mask(dates, date_from: Optional[datetime], date_to: Optional[datetime]):
+    """Boolean array: which dates fall within [date_from, date_to] (NaT never does)"""
+    mask = ~np.isnat(dates)
+    if date_from is not None:
+        mask &= dates >= _naive_utc(date_from)
+    if date_to is not None:
+        mask &= dates <= _naive_utc(date_to)
+    return mask
+
+
+class PageDates:
+    """
+    The dates of one page of records, parsed once
+
+    Used to filter the page by a date range and, in scans ordered by the
+    date, to check that the pages really are in order and tell whether the
+    scan has moved past the range.
+    """
+
+    def __init__(self, records: List[Dict], date_field: str):
+        self.records = records
+        values = extract_date_strings(records, date_field)
+        if np is not None:
+            self._dates = parse_dates(values)
+            present = self._dates[~np.isnat(self._dates)]
+            self.earliest = _aware(present.min()) if len(present) else None
+            self.latest = _aware(present.max()) if len(present) else None
+            self.ends_undated = bool(len(values)) and bool(np.isnat(self._dates[-1]))
+            self._ascending = bool(np.all(present[:-1] <= present[1:]))
+            self._descending = bool(np.all(present[:-1] >= present[1:]))
+            return
+
+        self._dates = []
+        for value in values:
+            try:
+                self._dates.append(DateParser.parse_date(value) if value else None)
+            except ValueError as e:
+                logger.warning(f"Error parsing date for record: {e}")
+                self._dates.append(None)
+        present = [value for value in self._dates if value is not None]
+        self.earliest = min(present) if present else None
+        self.latest = max(present) if present else None
+        self.ends_undated = bool(self._dates) and self._dates[-1] is None
+        self._ascending = all(a <= b for a, b in zip(present, present[1:]))
+        self._descending = all(a >= b for a, b in zip(present, present[1:]))
+
+    def in_range(self, date_from: Optional[datetime], date_to: Optional[datetime]) -> List[Dict]:
+        """Records whose date falls within [date_from, date_to], in page order"""
+        if np is not None:
+            mask = date_range_mask(self._dates, date_from, date_to)
+            return [self.records[i] for i in np.flatnonzero(mask)]
+        return [
+            record
+            for record, value in zip(self.records, self._dates)
+            if value is not None
+            and (date_from is None or value >= date_from)
+            and (date_to is None or value <= date_to)
+        ]
+
+    def follows(self, previous: Optional["PageDates"], descending: bool) -> bool:
+        """
+        Whether this page's dates continue a scan sorted by the date
+
+        True if they are in order within the page, and none is out of order
+        with the page before (`previous`, None for the first page read).
+        """
+        if not (self._descending if descending else self._ascending):
+            return False
+        if previous is None or self.earliest is None or previous.earliest is None:
+            return True
+        if descending:
+            return self.latest <= previous.earliest
+        return self.earliest >= previous.latest
+
+    def past_range(self, date_from: Optional[datetime], date_to: Optional[datetime], descending: bool) -> bool:
+        """
+        Whether a scan sorted by this date has moved beyond [date_from, date_to]
+
+        Every later page is then outside the range too: its dates are all
+        earlier (descending) or later (ascending) than this page's.
+        """
+        if descending:
+            return date_from is not None and self.earliest is not None and self.earliest < date_from
+        return date_to is not None and self.latest is not None and self.latest > date_to
+
+
+def _aware(value) -> datetime:
+    """datetime64 to a timezone-aware UTC datetime"""
+    return value.astype("datetime64[s]").item().replace(tzinfo=timezone.utc)
+
+
+def filter_records_by_date(
+    records: List[Dict],
+    date_field: str,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime]
+) -> List[Dict]:
+    """
+    Keep the records whose date property falls within [date_from, date_to]
+
+    Args:
+        records: Records as returned by the Records API
+        date_field: Date property to filter on (e.g., 'effectiveDate')
+        date_from: Start of the range (inclusive)
+        date_to: End of the range (inclusive)
+
+    Returns:
+        Matching records, in their original order
+    """
+    return PageDates(records, date_field).in_range(date_from, date_to)
+
+
+def _period_label(value: datetime, period: str) -> str:
+    if period == "year":
+        return f"{value.year:04d}"
+    if period == "quarter":
+        return f"{value.year:04d}-Q{(value.month - 1) // 3 + 1}"
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def period_labels(values: Sequence[Any], period: str) -> List[Optional[str]]:
+    """
+    Bucket label of each date: '2025-03' (month), '2025-Q1' (quarter) or '2025' (year)
+
+    Args:
+        values: Date strings or datetimes (None for missing)
+        period: One of 'month', 'quarter', 'year'
+
+    Returns:
+        Labels aligned with `values` (None where the date is missing or unparseable)
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}'. Use one of: {', '.join(PERIODS)}")
+    strings = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+
+    if np is None:
+        labels = []
+        for value in strings:
+            try:
+                parsed = DateParser.parse_date(value) if value else None
+            except ValueError:
+                parsed = None
+            labels.append(_period_label(parsed.astimezone(timezone.utc), period) if parsed else None)
+        return labels
+
+    dates = parse_dates(strings)
+    missing = np.isnat(dates)
+    months = dates.astype("datetime64[M]").astype("int64")
+    years = (months // 12 + 1970).astype(str)
+    if period == "year":
+        labels = years
+    elif period == "quarter":
+        labels = np.char.add(np.char.add(years, "-Q"), (months % 12 // 3 + 1).astype(str))
+    else:
+        labels = np.char.add(np.char.add(years, "-"), np.char.zfill((months % 12 + 1).astype(str), 2))
+    return [None if gap else label for label, gap in zip(labels.tolist(), missing.tolist())]
@@ -1,8 +1,9 @@
 """
 Date parsing utilities for consistent timezone-aware datetime handling
 """
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional, Tuple
+import calendar
 import re
 
 
@@ -90,10 +91,25 @@ class DateParser:
             date_to_obj = date_to_obj.replace(hour=23, minute=59, second=59)
         
         return date_from_obj, date_to_obj
-
-
-
-
-
-
+    
+    @staticmethod
+    def add_months(start: date, months: int) -> date:
+        """
+        Add a number of calendar months to a date
+        
+        The day is clamped to the last day of the target month, so
+        2025-01-31 + 1 month is 2025-02-28.
+        
+        Args:
+            start: Date (or datetime) to start from
+            months: Number of months to add (may be negative)
+        
+        Returns:
+            Shifted date of the same type as start
+        """
+        month_index = start.month - 1 + months
+        year = start.year + month_index // 12
+        month = month_index % 12 + 1
+        day = min(start.day, calendar.monthrange(year, month)[1])
+        return start.replace(year=year, month=month, day=day)
 
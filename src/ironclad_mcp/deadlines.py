@@ -0,0 +1,69 @@
+"""
+Per-call time budgets
+
+Every tool call runs under a deadline, carried in a contextvar so it reaches
+each upstream request and scan loop the call starts without being passed
+around. Upstream request timeouts are shortened to the time left, and scans
+stop before a batch that would overrun it, returning what they have so far
+(see IroncladClient.iter_record_pages).
+
+Configured through the environment:
+- IRONCLAD_TOOL_BUDGET_SECONDS: default budget of a tool call (default 120);
+  a call can ask for less or more with its budget_seconds argument
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+TOOL_BUDGET_SECONDS = float(os.getenv("IRONCLAD_TOOL_BUDGET_SECONDS", "120"))
+
+# time.monotonic() by which the current tool call must finish (None = no deadline)
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The current call's time budget ran out"""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float], detached: bool = False) -> Iterator[None]:
+    """
+    Run the block under a deadline `seconds` from now
+
+    A scope nested in another can only shorten the deadline, never extend it,
+    unless it is detached.
+
+    Args:
+        seconds: Time budget (None = keep the enclosing deadline, if any)
+        detached: Ignore the enclosing deadline (for background work that
+            outlives the call that started it)
+    """
+    deadline = None if detached else current_deadline.get()
+    if seconds is not None:
+        own = time.monotonic() + seconds
+        deadline = own if deadline is None else min(deadline, own)
+    token = current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (None if there is none; negative once passed)"""
+    deadline = current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired(reserve: float = 0.0) -> bool:
+    """Whether fewer than `reserve` seconds are left before the current deadline"""
+    left = remaining()
+    return left is not None and left <= reserve
+
+
+def clamp_timeouts(timeouts: Dict[str, Optional[float]], limit: float) -> Dict[str, float]:
+    """httpx timeout settings (connect/read/write/pool) capped at `limit` seconds"""
+    timeouts = timeouts or dict.fromkeys(("connect", "read", "write", "pool"))
+    return {key: limit if value is None else min(value, limit) for key, value in timeouts.items()}
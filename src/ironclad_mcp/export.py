@@ -0,0 +1,514 @@
+"""
+Streaming export of contract records to NDJSON, CSV and Parquet
+
+Bulk extracts used to mean holding every record of a scan in memory and
+formatting it as markdown. An export streams the scan to a file instead:
+each page is flattened, projected onto the requested fields and written
+straight out (Parquet buffers one row group at a time), so memory use stays
+flat however large the extract is. The file is written under a temporary
+name and renamed when complete, so readers never see half an export.
+
+Parquet needs the optional pyarrow package, and zstd compression of NDJSON
+and CSV needs zstandard (`pip install 'ironclad-mcp[export]'`).
+
+Also available from the command line as `ironclad-mcp-export`.
+
+Configured through the environment:
+- IRONCLAD_EXPORT_DIR: directory the export_contracts tool writes to (default ./exports)
+- IRONCLAD_EXPORT_ROW_GROUP_SIZE: rows per Parquet row group (default 10000)
+- IRONCLAD_EXPORT_TIMEOUT_SECONDS: longest an export scans before stopping (default 1800)
+"""
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from . import tracing
+from .date_batch import filter_records_by_date
+from .date_utils import DateParser
+from .ironclad_client import FilterExpression, IroncladClient, ScanStats, parse_filter
+from .result_sets import RECORD_ATTRIBUTES, flatten_record
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = Path(os.getenv("IRONCLAD_EXPORT_DIR", "exports"))
+ROW_GROUP_SIZE = int(os.getenv("IRONCLAD_EXPORT_ROW_GROUP_SIZE", "10000"))
+EXPORT_TIMEOUT_SECONDS = float(os.getenv("IRONCLAD_EXPORT_TIMEOUT_SECONDS", "1800"))
+
+FORMATS = ("ndjson", "csv", "parquet")
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+# File name suffixes; Parquet compresses inside the file, so it keeps its own
+_FORMAT_SUFFIXES = {"ndjson": ".ndjson", "csv": ".csv", "parquet": ".parquet"}
+_COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+@dataclass
+class ExportResult:
+    """Summary of a finished export"""
+
+    path: Path
+    format: str
+    compression: str
+    # Rows written (after date filtering and max_rows)
+    rows: int = 0
+    # Records the scan fetched, and how many the server-side filters matched
+    scanned: int = 0
+    total: int = 0
+    # False if the scan stopped early (timeout), so the file is partial
+    complete: bool = True
+    columns: List[str] = field(default_factory=list)
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+def export_filename(record_type: Optional[str], format: str, compression: str = "none") -> str:
+    """Default file name, e.g. 'contracts-plusAgreement-20250101-120000.csv.gz'"""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return f"contracts-{record_type or 'all'}-{stamp}{output_suffix(format, compression)}"
+
+
+def user_export_path(user_email: Optional[str], filename: str) -> Path:
+    """
+    Where the export_contracts tool writes a user's export: EXPORT_DIR/<user>/<filename>
+
+    The user comes from a client-supplied header, so it is reduced to a safe
+    directory name first.
+
+    Raises:
+        ValueError: If the path would still land outside EXPORT_DIR
+    """
+    directory = re.sub(r"[^A-Za-z0-9@._-]", "_", user_email or "local")
+    if directory.startswith("."):
+        directory = "_" + directory
+    user_dir = EXPORT_DIR.resolve() / directory
+    path = (user_dir / filename).resolve()
+    if path.parent != user_dir:
+        raise ValueError("export path must stay in the user's export directory")
+    return path
+
+
+def output_suffix(format: str, compression: str = "none") -> str:
+    """File name suffix for a format and compression"""
+    if format == "parquet":
+        return _FORMAT_SUFFIXES[format]
+    return _FORMAT_SUFFIXES[format] + _COMPRESSION_SUFFIXES[compression]
+
+
+def _project(
+    flat: Dict,
+    fields: Optional[List[str]],
+    resolve_field: Callable[[str], str] = lambda field: field
+) -> Dict:
+    """
+    Attributes and property values of a flattened record as one flat row
+
+    With `fields`, only those columns are kept, in that order and under the
+    requested names. A property can be named by the prefix before its ID
+    suffix, like in result sets, or by whatever `resolve_field` maps.
+    """
+    props = flat["properties"]
+    if fields is None:
+        row = {key: flat.get(key) for key in RECORD_ATTRIBUTES}
+        for key, value in props.items():
+            row.setdefault(key, value)
+        return row
+
+    row = {}
+    for name in fields:
+        key = resolve_field(name)
+        if key in RECORD_ATTRIBUTES:
+            row[name] = flat.get(key)
+        elif key in props:
+            row[name] = props[key]
+        else:
+            row[name] = next((v for prop, v in props.items() if prop.startswith(key) and v not in (None, "")), None)
+    return row
+
+
+def _tabular(row: Dict) -> Dict:
+    """
+    Expand nested values into 'key.subkey' columns
+
+    Monetary amounts keep the amount under the property's own column and add
+    a 'key.currency' column, so projected fields keep their names.
+    """
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            if "amount" in value:
+                value = dict(value)
+                flat[key] = value.pop("amount")
+            for subkey, subvalue in value.items():
+                flat[f"{key}.{subkey}"] = subvalue
+        else:
+            flat[key] = value
+    return flat
+
+
+def _open_text(path: Path, compression: str) -> TextIO:
+    """Open a text stream for writing, compressed on the fly"""
+    if compression == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression requires the 'zstandard' package; use gzip instead")
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+class _NdjsonWriter:
+    """One JSON object per line; every row keeps all of its columns"""
+
+    def __init__(self, path: Path, compression: str):
+        self._stream = _open_text(path, compression)
+        # Ordered set of the columns seen so far
+        self._columns: Dict[str, None] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    def write_rows(self, rows: List[Dict]) -> None:
+        for row in rows:
+            self._columns.update(dict.fromkeys(row))
+            self._stream.write(json.dumps(row, default=str, ensure_ascii=False))
+            self._stream.write("\n")
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class _CsvWriter:
+    """
+    CSV with its header taken from the first page
+
+    Columns that only appear after the header was written are dropped;
+    pass fields to get a stable schema.
+    """
+
+    def __init__(self, path: Path, compression: str):
+        self._stream = _open_text(path, compression)
+        self.columns: List[str] = []
+        self._writer: Optional[csv.DictWriter] = None
+        self._dropped: set = set()
+
+    def write_rows(self, rows: List[Dict]) -> None:
+        rows = [_tabular(row) for row in rows]
+        if self._writer is None:
+            self.columns = list(dict.fromkeys(key for row in rows for key in row))
+            self._writer = csv.DictWriter(self._stream, fieldnames=self.columns, extrasaction="ignore")
+            self._writer.writeheader()
+        for row in rows:
+            extra = row.keys() - set(self.columns)
+            if extra - self._dropped:
+                logger.warning(f"CSV export: dropping columns not in the header: {sorted(extra - self._dropped)}")
+                self._dropped |= extra
+            self._writer.writerow({key: _csv_value(value) for key, value in row.items()})
+
+    def close(self) -> None:
+        if self._writer is None:
+            csv.DictWriter(self._stream, fieldnames=self.columns).writeheader()
+        self._stream.close()
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    return value
+
+
+class _ParquetWriter:
+    """
+    Parquet written one row group at a time
+
+    The schema is taken from the first row group's columns and values:
+    columns holding only numbers become float64, only booleans become bool,
+    anything else string.
+    """
+
+    def __init__(self, path: Path, compression: str, row_group_size: int = ROW_GROUP_SIZE):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("Parquet export requires the 'pyarrow' package; use ndjson or csv instead")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._path = path
+        self._compression = None if compression == "none" else compression
+        self.columns: List[str] = []
+        self.row_group_size = max(1, row_group_size)
+        self._buffer: List[Dict] = []
+        self._schema = None
+        self._writer = None
+
+    def write_rows(self, rows: List[Dict]) -> None:
+        self._buffer.extend(_tabular(row) for row in rows)
+        while len(self._buffer) >= self.row_group_size:
+            self._flush(self._buffer[:self.row_group_size])
+            del self._buffer[:self.row_group_size]
+
+    def _infer_schema(self, rows: List[Dict]):
+        pa = self._pa
+        self.columns = list(dict.fromkeys(key for row in rows for key in row))
+        fields = []
+        for column in self.columns:
+            values = [row.get(column) for row in rows if row.get(column) not in (None, "")]
+            if values and all(isinstance(v, bool) for v in values):
+                fields.append(pa.field(column, pa.bool_()))
+            elif values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                fields.append(pa.field(column, pa.float64()))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        return pa.schema(fields)
+
+    def _flush(self, rows: List[Dict]) -> None:
+        if self._schema is None:
+            self._schema = self._infer_schema(rows)
+            self._writer = self._pq.ParquetWriter(str(self._path), self._schema, compression=self._compression or "snappy")
+        columns = {}
+        for schema_field in self._schema:
+            columns[schema_field.name] = [_parquet_value(row.get(schema_field.name), schema_field.type, self._pa) for row in rows]
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self) -> None:
+        if self._buffer or self._writer is None:
+            self._flush(self._buffer)
+            self._buffer = []
+        self._writer.close()
+
+
+def _parquet_value(value: Any, type_, pa) -> Any:
+    """Coerce a value to its column's type (None if it does not fit)"""
+    if value is None or value == "":
+        return None
+    if type_ == pa.float64():
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if type_ == pa.bool_():
+        return value if isinstance(value, bool) else None
+    if isinstance(value, list):
+        return json.dumps(value, default=str, ensure_ascii=False)
+    return str(value)
+
+
+_WRITERS = {"ndjson": _NdjsonWriter, "csv": _CsvWriter, "parquet": _ParquetWriter}
+
+
+async def export_records(
+    client: IroncladClient,
+    path: Path,
+    format: str = "csv",
+    compression: str = "none",
+    fields: Optional[List[str]] = None,
+    record_type: Optional[str] = None,
+    query: Optional[str] = None,
+    counterparty: Optional[str] = None,
+    filter_expr: Optional[FilterExpression] = None,
+    date_field: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    max_rows: Optional[int] = None,
+    concurrency: int = 1,
+    timeout_seconds: Optional[float] = EXPORT_TIMEOUT_SECONDS,
+    resolve_field: Callable[[str], str] = lambda field: field
+) -> ExportResult:
+    """
+    Stream the records matching the filters into a file, page by page
+
+    Args:
+        client: Ironclad client
+        path: File to write (replaced if it exists)
+        format: 'ndjson', 'csv' or 'parquet'
+        compression: 'none', 'gzip' or 'zstd'
+        fields: Columns to keep, in order (attribute names or property keys; None = all)
+        record_type: Record type filter
+        query: Name keyword filter
+        counterparty: Counterparty name filter
+        filter_expr: Structured server-side filter
+        date_field: Date property to filter on client-side
+        date_from: Start date (YYYY-MM-DD)
+        date_to: End date (YYYY-MM-DD)
+        max_rows: Stop after writing this many rows
+        concurrency: Pages requested at once
+        timeout_seconds: Stop scanning after this long (None = no limit)
+        resolve_field: Maps a requested field name to its property key
+
+    Returns:
+        ExportResult describing the written file
+
+    Raises:
+        ValueError: If the format or compression is unknown or needs a package that is not installed
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format '{format}'. Use one of: {', '.join(FORMATS)}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}'. Use one of: {', '.join(COMPRESSIONS)}")
+
+    range_from = range_to = None
+    if date_field and (date_from or date_to):
+        try:
+            range_from, range_to = DateParser.parse_date_range(date_from, date_to)
+        except ValueError as e:
+            raise ValueError(f"Date parsing error: {e}")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.partial")
+    result = ExportResult(path=path, format=format, compression=compression)
+    stats = ScanStats()
+    start = time.perf_counter()
+
+    with tracing.span("export records") as span:
+        span.set_attribute("export.format", format)
+        writer = _WRITERS[format](partial, compression)
+        try:
+            pages = client.iter_record_pages(
+                record_type=record_type,
+                query=query,
+                counterparty=counterparty,
+                concurrency=concurrency,
+                filter_expr=filter_expr,
+                timeout_seconds=timeout_seconds,
+                stats=stats
+            )
+            # Closed on every exit, so the scan's quota is given back right away
+            async with aclosing(pages):
+                async for records in pages:
+                    if range_from and range_to:
+                        records = filter_records_by_date(records, date_field, range_from, range_to)
+                    if max_rows is not None:
+                        records = records[:max_rows - result.rows]
+                    rows = [_project(flatten_record(record), fields, resolve_field) for record in records]
+                    # Formatting and compression are CPU-bound; keep them off the event loop
+                    await asyncio.to_thread(writer.write_rows, rows)
+                    result.rows += len(rows)
+                    if max_rows is not None and result.rows >= max_rows:
+                        break
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            try:
+                writer.close()
+            except Exception:
+                pass
+            partial.unlink(missing_ok=True)
+            raise
+        os.replace(partial, path)
+
+        result.columns = writer.columns
+        result.scanned = stats.records
+        result.total = stats.total
+        result.complete = stats.complete
+        result.bytes = path.stat().st_size
+        result.seconds = time.perf_counter() - start
+        span.set_attribute("export.rows", result.rows)
+
+    logger.info(
+        f"Exported {result.rows} rows ({result.scanned}/{result.total} scanned) to {path} "
+        f"as {format}/{compression}: {result.bytes} bytes in {result.seconds:.1f}s"
+    )
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point for `ironclad-mcp-export`"""
+    parser = argparse.ArgumentParser(
+        prog="ironclad-mcp-export",
+        description="Export Ironclad contract records to NDJSON, CSV or Parquet"
+    )
+    parser.add_argument("--record-type", help="Record type API name (e.g. 'procurementAgreement')")
+    parser.add_argument("--query", help="Keywords from the contract name")
+    parser.add_argument("--counterparty", help="Counterparty name")
+    parser.add_argument("--filter", help="Structured filter as JSON (same grammar as the MCP tools)")
+    parser.add_argument("--date-field", help="Date property to filter on (e.g. 'agreementEffectiveDate')")
+    parser.add_argument("--date-from", help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--date-to", help="End date (YYYY-MM-DD)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="none")
+    parser.add_argument("--fields", help="Comma-separated columns to keep, in order (default: all)")
+    parser.add_argument("--max-rows", type=int, help="Stop after this many rows")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages requested at once (default 4)")
+    parser.add_argument("--timeout", type=float, default=EXPORT_TIMEOUT_SECONDS, help="Longest scan in seconds")
+    parser.add_argument("--output", "-o", help="Output file (default: a timestamped name in the current directory)")
+    parser.add_argument(
+        "--user-email",
+        default=os.getenv("IRONCLAD_USER_EMAIL"),
+        help="Ironclad user to export as (default: IRONCLAD_USER_EMAIL)"
+    )
+    args = parser.parse_args(argv)
+    if not args.user_email:
+        parser.error("--user-email or IRONCLAD_USER_EMAIL is required")
+    try:
+        filter_expr = parse_filter(json.loads(args.filter)) if args.filter else None
+    except ValueError as e:
+        parser.error(f"--filter: {e}")
+
+    from .startup import CredentialPrefetch
+    from .structured_logging import configure_logging
+
+    configure_logging(stream=sys.stderr)
+    output = Path(args.output or export_filename(args.record_type, args.format, args.compression))
+    fields = [name.strip() for name in args.fields.split(",") if name.strip()] if args.fields else None
+
+    async def run() -> ExportResult:
+        prefetch = CredentialPrefetch().start()
+        client = IroncladClient(
+            prefetch.base_url,
+            await prefetch.wait_for_token(),
+            args.user_email,
+            token_provider=prefetch.get_access_token
+        )
+        async with client:
+            return await export_records(
+                client,
+                output,
+                format=args.format,
+                compression=args.compression,
+                fields=fields,
+                record_type=args.record_type,
+                query=args.query,
+                counterparty=args.counterparty,
+                filter_expr=filter_expr,
+                date_field=args.date_field,
+                date_from=args.date_from,
+                date_to=args.date_to,
+                max_rows=args.max_rows,
+                concurrency=args.concurrency,
+                timeout_seconds=args.timeout
+            )
+
+    try:
+        result = asyncio.run(run())
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Wrote {result.rows:,} rows ({len(result.columns)} columns, {result.bytes:,} bytes) to {result.path}")
+    if not result.complete:
+        print(
+            f"⚠️ The scan stopped after {result.scanned:,} of {result.total:,} records; the export is partial",
+            file=sys.stderr
+        )
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 """
 GCP Secret Manager integration for Ironclad OAuth credentials
 """
-from google.cloud import secretmanager
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
 
 
 class GCPSecretProvider:
@@ -13,8 +16,11 @@ class GCPSecretProvider:
         if not self.project_id:
             raise ValueError("GCP_PROJECT_ID environment variable must be set")
         
+        # Imported here: the Secret Manager client library takes ~250ms to import
+        from google.cloud import secretmanager
+        
         self.client = secretmanager.SecretManagerServiceClient()
-        print(f"✅ GCP Secret Manager client initialized for project: {self.project_id}")
+        logger.info(f"GCP Secret Manager client initialized for project: {self.project_id}")
     
     def get_secret(self, secret_id: str, version: str = "latest") -> str:
         """Get a secret value from GCP Secret Manager"""
@@ -28,8 +34,12 @@ class GCPSecretProvider:
     
     def get_oauth_credentials(self) -> dict:
         """Get Ironclad OAuth credentials from GCP Secret Manager"""
-        client_id = self.get_secret("ironclad-oauth-client-id")
-        client_secret = self.get_secret("ironclad-oauth-client-secret")
+        # Fetch both secrets concurrently (the client is thread-safe)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            client_id_future = pool.submit(self.get_secret, "ironclad-oauth-client-id")
+            client_secret_future = pool.submit(self.get_secret, "ironclad-oauth-client-secret")
+            client_id = client_id_future.result()
+            client_secret = client_secret_future.result()
         
         return {
             "client_id": client_id,
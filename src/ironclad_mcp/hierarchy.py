@@ -0,0 +1,165 @@
+"""
+Parent/child contract hierarchy index
+
+Affiliate Plus Agreements, Order Forms, SOWs and MSA Sales Orders point at
+their governing contract through the `parentRecordID` property. Walking a
+family through the API costs one search per level, so this index keeps an
+adjacency map (parent -> children) that is filled in as scans page through
+records and lets a whole family tree be answered with one local traversal.
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from .scan_index import ScanIndex
+
+logger = logging.getLogger(__name__)
+
+PARENT_FIELD = "parentRecordID"
+
+
+def _normalize_ref(ref: str) -> str:
+    """Normalize a record reference (IC-ID or UUID) for use as a map key"""
+    ref = ref.strip()
+    if ref.upper().startswith("IC-"):
+        return ref.upper()
+    return ref
+
+
+class ContractHierarchyIndex(ScanIndex):
+    """In-memory adjacency index of contract families keyed by record ID"""
+
+    def __init__(self):
+        super().__init__()
+        # Record ID -> lightweight summary of the record
+        self._nodes: Dict[str, Dict] = {}
+        # Ironclad ID (IC-xxxxx) -> record ID
+        self._aliases: Dict[str, str] = {}
+        # Record ID -> raw parent reference (IC-ID or UUID, normalized)
+        self._parents: Dict[str, str] = {}
+        # Parent reference (IC-ID or UUID, normalized) -> child record IDs
+        self._children: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    # ========== Index Maintenance ==========
+
+    def add_records(self, records: List[Dict]) -> None:
+        """
+        Add or refresh records in the index
+
+        Args:
+            records: Records as returned by the Records API
+        """
+        for record in records:
+            record_id = record.get("id")
+            if not record_id:
+                continue
+
+            props = record.get("properties", {})
+            counterparty = props.get("counterpartyName", {})
+            self._nodes[record_id] = {
+                "id": record_id,
+                "ironcladId": record.get("ironcladId"),
+                "name": record.get("name"),
+                "type": record.get("type"),
+                "counterparty": counterparty.get("value") if isinstance(counterparty, dict) else None,
+            }
+            if record.get("ironcladId"):
+                self._aliases[_normalize_ref(record["ironcladId"])] = record_id
+
+            # Drop any stale edge before re-linking (parent may have changed)
+            old_parent = self._parents.pop(record_id, None)
+            if old_parent is not None:
+                self._children[old_parent].discard(record_id)
+
+            parent_prop = props.get(PARENT_FIELD, {})
+            parent_ref = parent_prop.get("value") if isinstance(parent_prop, dict) else None
+            if isinstance(parent_ref, str) and parent_ref.strip():
+                parent_ref = _normalize_ref(parent_ref)
+                self._parents[record_id] = parent_ref
+                self._children[parent_ref].add(record_id)
+
+    def on_scan_page(self, records: List[Dict]) -> None:
+        self.add_records(records)
+
+    # ========== Lookups ==========
+
+    def resolve(self, ref: str) -> Optional[str]:
+        """Resolve an IC-ID or UUID to a known record ID"""
+        ref = _normalize_ref(ref)
+        if ref in self._nodes:
+            return ref
+        return self._aliases.get(ref)
+
+    def get_node(self, record_id: str) -> Optional[Dict]:
+        """Summary of an indexed record (id, ironcladId, name, type, counterparty)"""
+        return self._nodes.get(record_id)
+
+    def get_parent_ref(self, record_id: str) -> Optional[str]:
+        """Raw parent reference of a record, or None if it has no parent"""
+        return self._parents.get(record_id)
+
+    def find_root(self, ref: str) -> Optional[str]:
+        """
+        Walk parent pointers up to the top-most known ancestor
+
+        Args:
+            ref: IC-ID or UUID of any family member
+
+        Returns:
+            Record ID of the root, or None if the record is not indexed
+        """
+        current = self.resolve(ref)
+        if current is None:
+            return None
+
+        seen = {current}
+        while True:
+            parent = self.resolve(self._parents.get(current, "") or "")
+            if parent is None or parent in seen:
+                return current
+            seen.add(parent)
+            current = parent
+
+    def _child_ids(self, record_id: str) -> Set[str]:
+        """Children linked by either the parent's UUID or its IC-ID"""
+        children = set(self._children.get(record_id, ()))
+        ironclad_id = self._nodes[record_id].get("ironcladId")
+        if ironclad_id:
+            children |= self._children.get(_normalize_ref(ironclad_id), set())
+        return children
+
+    def get_family(self, ref: str) -> Optional[Dict]:
+        """
+        Return the full family tree containing a record
+
+        Args:
+            ref: IC-ID or UUID of any family member
+
+        Returns:
+            Nested dict for the root record, each node carrying a 'children'
+            list (grandchildren included), or None if the record is not indexed
+        """
+        root_id = self.find_root(ref)
+        if root_id is None:
+            return None
+
+        seen: Set[str] = set()
+
+        def build(record_id: str) -> Dict:
+            seen.add(record_id)
+            node = dict(self._nodes[record_id])
+            children = [
+                build(child_id)
+                for child_id in sorted(
+                    self._child_ids(record_id),
+                    key=lambda cid: self._nodes[cid].get("ironcladId") or cid
+                )
+                if child_id not in seen
+            ]
+            node["children"] = children
+            return node
+
+        return build(root_id)
@@ -0,0 +1,317 @@
+"""
+On-disk HTTP cache for single records and workflows
+
+get_record and get_workflow download the full JSON of a record or workflow,
+which can be large for records with hundreds of properties and clauses, and
+the same ones are looked up again and again. Their responses are kept on
+local disk, compressed, keyed by the impersonated user and the URL (so one
+user never reads another's copy), and they survive restarts.
+
+Entries hold full contract data, so they are encrypted with Fernet (like the
+OAuth token cache; both need the `cache` extra) and kept in a directory only
+the server's user can read.
+The cache is off unless a key is configured, or when the directory belongs
+to another user.
+
+A cached response is used without asking Ironclad while it is fresh. With no
+validators, freshness is estimated from the record's lastUpdated: a record
+untouched for a long time is unlikely to change in the next few minutes. It
+stays fresh for a tenth of the time since it last changed, capped at
+IRONCLAD_HTTP_CACHE_MAX_FRESH_SECONDS (the heuristic RFC 9111 suggests for
+Last-Modified). When the response carried an ETag or Last-Modified header,
+it is revalidated with If-None-Match / If-Modified-Since instead, and a 304
+answer costs no body. Cached entries are also the last good data served
+while Ironclad is down (see circuit_breaker), including right after a
+restart.
+
+Configured through the environment:
+- IRONCLAD_HTTP_CACHE_KEY: Fernet key entries are encrypted with (default:
+  IRONCLAD_TOKEN_CACHE_KEY; no key = no cache)
+- IRONCLAD_HTTP_CACHE_DIR: where responses are kept (default:
+  $XDG_CACHE_HOME/ironclad-mcp/http, i.e. ~/.cache/ironclad-mcp/http)
+- IRONCLAD_HTTP_CACHE_MB: disk space for responses, least recently used
+  dropped first (default 256, 0 = no cache)
+- IRONCLAD_HTTP_CACHE_MAX_FRESH_SECONDS: longest a response without
+  validators is used without asking Ironclad (default 300)
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import stat
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR = Path(os.getenv(
+    "IRONCLAD_HTTP_CACHE_DIR",
+    os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "ironclad-mcp", "http")
+))
+HTTP_CACHE_KEY = os.getenv("IRONCLAD_HTTP_CACHE_KEY") or os.getenv("IRONCLAD_TOKEN_CACHE_KEY")
+HTTP_CACHE_MB = int(os.getenv("IRONCLAD_HTTP_CACHE_MB", "256"))
+HTTP_CACHE_MAX_FRESH_SECONDS = int(os.getenv("IRONCLAD_HTTP_CACHE_MAX_FRESH_SECONDS", "300"))
+
+# Share of the time since the last change a response stays fresh
+HEURISTIC_FRACTION = 0.1
+# Saves between checks of the cache's size on disk
+_PRUNE_EVERY = 64
+
+
+@dataclass
+class CachedResponse:
+    """A response kept on disk"""
+
+    url: str
+    status_code: int
+    content_type: str
+    body: bytes
+    # time.time() it was downloaded, and last confirmed unchanged
+    stored_at: float
+    validated_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # Seconds after validated_at it can be used without asking Ironclad
+    fresh_for: float = 0.0
+
+    @property
+    def age(self) -> float:
+        """Seconds since Ironclad last confirmed it"""
+        return time.time() - self.validated_at
+
+    def is_fresh(self) -> bool:
+        return self.age < self.fresh_for
+
+    def validators(self) -> Dict[str, str]:
+        """Headers that make a request conditional on the response having changed"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            self.status_code,
+            headers={"content-type": self.content_type},
+            content=self.body,
+            request=request
+        )
+
+
+def heuristic_freshness(body: bytes, now: float, max_fresh_seconds: float) -> float:
+    """
+    Seconds a response without validators can be used, from its lastUpdated
+
+    Returns:
+        A tenth of the time since lastUpdated, capped at max_fresh_seconds
+        (0 if the body has no parseable lastUpdated)
+    """
+    try:
+        last_updated = json.loads(body).get("lastUpdated")
+        changed_at = datetime.fromisoformat(last_updated.replace("Z", "+00:00")).timestamp()
+    except (ValueError, AttributeError, TypeError):
+        return 0.0
+    return max(0.0, min(max_fresh_seconds, (now - changed_at) * HEURISTIC_FRACTION))
+
+
+class HttpCache:
+    """
+    Responses on local disk, one encrypted file each: gzip of a JSON metadata line, then the body
+
+    Methods block on file I/O; call them through asyncio.to_thread.
+    """
+
+    def __init__(
+        self,
+        directory: Path = HTTP_CACHE_DIR,
+        max_bytes: int = HTTP_CACHE_MB * 1024 * 1024,
+        max_fresh_seconds: float = HTTP_CACHE_MAX_FRESH_SECONDS,
+        key: Optional[str] = HTTP_CACHE_KEY
+    ):
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+        self.max_fresh_seconds = max_fresh_seconds
+        self._saves = 0
+        self._fernet = None
+        if max_bytes > 0:
+            self._fernet = self._make_fernet(key)
+        # Whether the directory is known to be private (None = not checked yet)
+        self._directory_ok: Optional[bool] = None
+
+    @staticmethod
+    def _make_fernet(key: Optional[str]):
+        if not key:
+            logger.info("HTTP cache disabled: set IRONCLAD_HTTP_CACHE_KEY to enable it")
+            return None
+        try:
+            # cryptography is only needed when the cache is enabled
+            from cryptography.fernet import Fernet
+
+            return Fernet(key.encode() if isinstance(key, str) else key)
+        except ImportError:
+            logger.warning(
+                "HTTP cache requires the 'cryptography' package (pip install 'ironclad-mcp[cache]'); HTTP cache disabled"
+            )
+        except ValueError as e:
+            logger.warning(f"Invalid HTTP cache key ({e}); HTTP cache disabled")
+        return None
+
+    @property
+    def enabled(self) -> bool:
+        return self._fernet is not None and self._directory_ok is not False
+
+    def _check_directory(self) -> bool:
+        """
+        Create the directory, or check an existing one belongs to this user
+
+        A directory owned by someone else (or a symlink) disables the cache;
+        one of ours that others can read is made private.
+        """
+        if self._directory_ok is None:
+            try:
+                self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+                info = os.lstat(self.directory)
+                if not stat.S_ISDIR(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()):
+                    logger.error(f"HTTP cache directory {self.directory} is not a directory owned by this user; HTTP cache disabled")
+                    self._directory_ok = False
+                else:
+                    if info.st_mode & 0o077:
+                        os.chmod(self.directory, 0o700)
+                    self._directory_ok = True
+            except OSError as e:
+                logger.error(f"HTTP cache directory {self.directory} is unusable ({e}); HTTP cache disabled")
+                self._directory_ok = False
+        return self._directory_ok
+
+    def _path(self, user_email: Optional[str], url: str) -> Path:
+        key = hashlib.sha256(f"{user_email or ''}\0{url}".encode()).hexdigest()[:40]
+        return self.directory / f"{key}.bin"
+
+    def load(self, user_email: Optional[str], url: str) -> Optional[CachedResponse]:
+        """
+        The response kept for `url` as seen by `user_email`, if any
+
+        Returns:
+            CachedResponse, or None
+        """
+        if not self.enabled or not self._check_directory():
+            return None
+        from cryptography.fernet import InvalidToken
+
+        path = self._path(user_email, url)
+        try:
+            meta_line, _, body = gzip.decompress(self._fernet.decrypt(path.read_bytes())).partition(b"\n")
+            meta = json.loads(meta_line)
+            # Reads count as use, for least-recently-used pruning
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError, InvalidToken) as e:
+            # e.g. an entry written with another key
+            logger.warning(f"Dropping unreadable HTTP cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        if meta.get("url") != url:
+            return None
+        return CachedResponse(
+            url=url,
+            status_code=meta["status_code"],
+            content_type=meta["content_type"],
+            body=body,
+            stored_at=meta["stored_at"],
+            validated_at=meta["validated_at"],
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            fresh_for=meta.get("fresh_for", 0.0),
+        )
+
+    def save(self, user_email: Optional[str], response: httpx.Response) -> Optional[CachedResponse]:
+        """
+        Keep a successful response (anything but JSON is ignored)
+
+        Returns:
+            The entry written, or None if the response was not kept
+        """
+        content_type = response.headers.get("content-type", "")
+        if not self.enabled or "json" not in content_type:
+            return None
+        now = time.time()
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        entry = CachedResponse(
+            url=str(response.request.url),
+            status_code=response.status_code,
+            content_type=content_type,
+            body=response.content,
+            stored_at=now,
+            validated_at=now,
+            etag=etag,
+            last_modified=last_modified,
+            # Validators make revalidation cheap, so only guess without them
+            fresh_for=0.0 if etag or last_modified else heuristic_freshness(
+                response.content, now, self.max_fresh_seconds
+            ),
+        )
+        self._write(user_email, entry)
+        return entry
+
+    def revalidated(self, user_email: Optional[str], entry: CachedResponse, response: httpx.Response) -> None:
+        """Record a 304 for `entry`, taking any new validators from the response"""
+        entry.validated_at = time.time()
+        entry.etag = response.headers.get("etag", entry.etag)
+        entry.last_modified = response.headers.get("last-modified", entry.last_modified)
+        self._write(user_email, entry)
+
+    def _write(self, user_email: Optional[str], entry: CachedResponse) -> None:
+        if not self._check_directory():
+            return
+        path = self._path(user_email, entry.url)
+        meta = {
+            "url": entry.url,
+            "status_code": entry.status_code,
+            "content_type": entry.content_type,
+            "stored_at": entry.stored_at,
+            "validated_at": entry.validated_at,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "fresh_for": entry.fresh_for,
+        }
+        plain = json.dumps(meta, separators=(",", ":")).encode() + b"\n" + entry.body
+        encrypted = self._fernet.encrypt(gzip.compress(plain, compresslevel=6))
+        partial = path.with_suffix(".partial")
+        try:
+            fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(encrypted)
+            os.replace(partial, path)
+        except OSError as e:
+            logger.warning(f"Could not write HTTP cache entry {path.name}: {e}")
+            return
+
+        self._saves += 1
+        if self._saves % _PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        """Delete the least recently used entries until the cache fits in max_bytes"""
+        try:
+            entries = []
+            for path in self.directory.glob("*.bin"):
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
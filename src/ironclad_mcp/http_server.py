@@ -1,59 +1,122 @@
 """
 Ironclad MCP HTTP Server
-Streamable HTTP transport for multi-user deployment
+SSE transport for multi-user deployment
+
+Every user's upstream work is held to per-user quotas (see user_quotas and
+upstream_scheduler). While a user is out of Ironclad requests, their tool
+calls are answered with 429 and a Retry-After header instead of being queued.
 """
 
 import asyncio
+import contextlib
 import json
 import logging
 import os
 import sys
-from typing import Any, Dict, Optional
+import uuid
 
-from mcp.server import Server
 from mcp.server.sse import SseServerTransport
 from starlette.applications import Starlette
 from starlette.requests import Request
 from starlette.responses import Response
-from starlette.routing import Route
-
-# Import MCP tools from server.py
-from .server import create_server
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('/tmp/ironclad-mcp-http.log')
-    ]
+from starlette.routing import Mount, Route
+
+# MCP tools are defined once in server.py and shared by every connection
+from .server import app as mcp_app
+from .circuit_breaker import breaker
+from .metrics import ACTIVE_SSE_SESSIONS, CONTENT_TYPE, REGISTRY, USER_QUOTA_REJECTIONS, monitor_event_loop_lag
+from .request_context import current_session_id, current_user_email
+from .server import drop_session_state
+from .structured_logging import configure_logging
+from .user_quotas import PAGES_PER_MINUTE, QuotaExceeded, quotas
+
+# Configure logging (JSON lines, written off the event loop by a background thread)
+configure_logging(
+    stream=sys.stdout,
+    log_file=os.getenv("IRONCLAD_LOG_FILE", "/tmp/ironclad-mcp-http.log")
 )
 logger = logging.getLogger(__name__)
 
 
 class IroncladMCPHTTPServer:
     """HTTP/SSE server for Ironclad MCP"""
-    
+
     def __init__(self):
+        # Clients open a stream on /sse and POST their messages to /messages/
+        self.sse = SseServerTransport("/messages/")
         self.app = Starlette(
             routes=[
                 Route("/sse", self.handle_sse, methods=["GET"]),
+                Mount("/messages/", app=self.handle_message),
                 Route("/health", self.handle_health, methods=["GET"]),
-            ]
+                Route("/metrics", self.handle_metrics, methods=["GET"]),
+            ],
+            lifespan=self.lifespan
         )
-    
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self, app: Starlette):
+        """Run the event loop lag monitor for the lifetime of the server"""
+        lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+        try:
+            yield
+        finally:
+            lag_monitor.cancel()
+
     async def handle_health(self, request: Request) -> Response:
         """Health check endpoint"""
         return Response(
             content=json.dumps({
                 "status": "healthy",
                 "service": "ironclad-mcp",
-                "version": "1.0.0"
+                "version": "1.0.0",
+                "active_sessions": int(ACTIVE_SSE_SESSIONS.value()),
+                "upstream_circuit": breaker.state
             }),
             media_type="application/json"
         )
-    
+
+    async def handle_metrics(self, request: Request) -> Response:
+        """Prometheus metrics endpoint"""
+        return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+    async def handle_message(self, scope, receive, send) -> None:
+        """Pass a client message to its MCP session, unless it is a tool call its user has no quota for"""
+        request = Request(scope, receive)
+        # Clients send their X-User-Email with every request; without it the
+        # quota is still enforced, by the tool call itself
+        user_email = request.headers.get("X-User-Email")
+        retry_after = quotas.page_retry_after(user_email) if user_email else 0.0
+        if retry_after > quotas.max_wait_seconds:
+            body = await request.body()
+            if _is_tool_call(body):
+                USER_QUOTA_REJECTIONS.inc(quota=PAGES_PER_MINUTE)
+                refused = QuotaExceeded(
+                    PAGES_PER_MINUTE,
+                    retry_after,
+                    f"Quota of {quotas.pages_per_minute} Ironclad API requests per minute used up"
+                )
+                logger.warning(f"Refusing tool call of {user_email}: {refused}")
+                response = Response(
+                    content=str(refused),
+                    status_code=429,
+                    headers={"Retry-After": refused.retry_after_header()}
+                )
+                return await response(scope, receive, send)
+
+            # The body has been read; hand it to the transport again
+            replayed = False
+
+            async def receive_body():
+                nonlocal replayed
+                if replayed:
+                    return await receive()
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+
+            receive = receive_body
+        await self.sse.handle_post_message(scope, receive, send)
+
     async def handle_sse(self, request: Request) -> Response:
         """Handle SSE connection for MCP"""
         # Get user email from headers (required for user attribution)
@@ -64,38 +127,42 @@ class IroncladMCPHTTPServer:
                 content="Missing X-User-Email header",
                 status_code=400
             )
-        
+
         logger.info(f"New SSE connection from user: {user_email}")
-        
-        # Set user email in environment for this request
-        os.environ["IRONCLAD_USER_EMAIL"] = user_email
-        
-        # Create MCP server instance
-        server = create_server()
-        
-        # Create SSE transport
-        sse = SseServerTransport("/messages")
-        
-        async def handle_connection(read_stream, write_stream):
-            """Handle the MCP connection"""
-            try:
-                async with server.run(
-                    read_stream=read_stream,
-                    write_stream=write_stream,
-                    initialization_options=server._initialization_options or {}
-                ):
-                    logger.info(f"MCP server running for user: {user_email}")
-                    # Keep connection alive
-                    await asyncio.Event().wait()
-            except Exception as e:
-                logger.error(f"Error in MCP connection for {user_email}: {e}", exc_info=True)
-                raise
-        
-        # Handle the SSE connection
-        return await sse.handle_sse(
-            request=request,
-            handle_connection=handle_connection
-        )
+
+        # Every task of this MCP session inherits the user from the context,
+        # so concurrent sessions of different users never see each other's email
+        current_user_email.set(user_email)
+        session_id = uuid.uuid4().hex
+        current_session_id.set(session_id)
+
+        ACTIVE_SSE_SESSIONS.inc()
+        try:
+            async with self.sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+                await mcp_app.run(
+                    read_stream,
+                    write_stream,
+                    mcp_app.create_initialization_options()
+                )
+        except Exception as e:
+            logger.error(f"Error in MCP connection for {user_email}: {e}", exc_info=True)
+            raise
+        finally:
+            ACTIVE_SSE_SESSIONS.dec()
+            drop_session_state((user_email, session_id))
+            logger.info(f"SSE connection closed for user: {user_email}")
+
+        return Response()
+
+
+def _is_tool_call(body: bytes) -> bool:
+    """Whether a JSON-RPC message (or batch) calls a tool"""
+    try:
+        message = json.loads(body)
+    except ValueError:
+        return False
+    messages = message if isinstance(message, list) else [message]
+    return any(isinstance(m, dict) and m.get("method") == "tools/call" for m in messages)
 
 
 def create_app() -> Starlette:
@@ -108,36 +175,42 @@ def create_app() -> Starlette:
 app = create_app()
 
 
-if __name__ == "__main__":
+def main():
+    """Entry point for the HTTP server"""
     import uvicorn
-    
+
     # Get configuration from environment
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
-    
+
     logger.info(f"Starting Ironclad MCP HTTP server on {host}:{port}")
-    
-    # Verify required environment variables
-    required_vars = [
-        "GCP_PROJECT_ID",
-        "GOOGLE_APPLICATION_CREDENTIALS",
-        "IRONCLAD_BASE_URL"
-    ]
-    
+
+    # Verify required environment variables (Secret Manager settings are not
+    # needed when the OAuth credentials are given directly, e.g. for a mock API)
+    required_vars = ["IRONCLAD_BASE_URL"]
+    if not (os.getenv("IRONCLAD_OAUTH_CLIENT_ID") and os.getenv("IRONCLAD_OAUTH_CLIENT_SECRET")):
+        required_vars += ["GCP_PROJECT_ID", "GOOGLE_APPLICATION_CREDENTIALS"]
+
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     if missing_vars:
         logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
         sys.exit(1)
-    
+
     logger.info("Environment configuration validated")
     logger.info(f"GCP Project: {os.getenv('GCP_PROJECT_ID')}")
     logger.info(f"Ironclad URL: {os.getenv('IRONCLAD_BASE_URL')}")
-    
+
     # Run the server
     uvicorn.run(
         app,
         host=host,
         port=port,
-        log_level="info",
-        access_log=True
+        log_level=os.getenv("LOG_LEVEL", "info").lower(),
+        access_log=os.getenv("ACCESS_LOG", "true").lower() != "false",
+        # Keep uvicorn's loggers on the queue handler configured above
+        log_config=None
     )
+
+
+if __name__ == "__main__":
+    main()
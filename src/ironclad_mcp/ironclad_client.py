@@ -3,16 +3,454 @@ Ironclad API Client with pagination, date filtering, and search capabilities
 """
 import asyncio
 import logging
+import time
+from contextlib import aclosing
+from contextvars import ContextVar
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlencode
 
 import httpx
 
+from . import circuit_breaker, deadlines, tracing, upstream_scheduler, user_quotas
+from .date_batch import PageDates
 from .date_utils import DateParser
+from .http_cache import HttpCache
+from .metrics import (
+    HTTP_CACHE_REVALIDATIONS,
+    SCAN_EARLY_STOPS,
+    SCAN_PAGES,
+    SCAN_RESUMES,
+    SCAN_UNORDERED,
+    STALE_RESPONSES,
+    UPSTREAM_DURATION,
+    UPSTREAM_RESPONSES,
+    record_cache_lookup,
+)
+from .scan_checkpoints import ScanCheckpoint, ScanCheckpointStore, scan_fingerprint
 
 logger = logging.getLogger(__name__)
 
+API_PREFIX = "/public/api/v1/"
+
+# Set while a request is repeated in the background to replace a stale response
+_refreshing: ContextVar[bool] = ContextVar("_refreshing", default=False)
+# Response extension holding the age, in seconds, of a stale response
+STALE_AGE = "ironclad_stale_age"
+# Request headers that make a GET conditional
+_CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since")
+
+
+def endpoint_template(path: str) -> str:
+    """
+    Collapse IDs in an API path so it can be used as a metric label
+    
+    '/public/api/v1/records/IC-123/attachments/abc' -> 'records/{id}/attachments/{id}'
+    """
+    path = path.split(API_PREFIX, 1)[-1].strip("/")
+    # Collections and IDs alternate: records/{id}/attachments/{id}
+    return "/".join("{id}" if i % 2 else part for i, part in enumerate(path.split("/")))
+
+
+class InstrumentedAsyncClient(httpx.AsyncClient):
+    """
+    httpx client that records metrics and a tracing span for every request
+    
+    Latency covers the full response body, since requests are not streamed.
+    Transport errors (timeouts, connection failures) are counted as status
+    'error', and requests abandoned because the tool call was cancelled as
+    'cancelled'.
+    
+    Under a call deadline (see deadlines), request timeouts are shortened to
+    the time left, and a request that would start after it, or times out
+    because of it, raises DeadlineExceeded.
+    
+    Requests wait for a slot from the process-wide upstream scheduler, in
+    the priority class of the context they are made in (see
+    upstream_scheduler); latency is measured from when the slot is granted.
+    Each request first spends a page of the impersonated user's quota (see
+    user_quotas), raising QuotaExceeded when it is used up.
+    
+    Outcomes feed the process-wide circuit breaker. A GET that cannot be
+    answered, because the breaker is open or the request failed, gets the
+    last good response to the same URL instead, if one is kept, and is
+    repeated in the background (see circuit_breaker).
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Background refreshes of stale responses, by (user, URL)
+        self._refreshes: Dict[Tuple[Optional[str], str], asyncio.Task] = {}
+    
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        user = request.headers.get("X-As-User-Email")
+        breaker = circuit_breaker.breaker
+        try:
+            probe = breaker.before_request()
+        except circuit_breaker.CircuitOpen:
+            UPSTREAM_RESPONSES.inc(
+                status="circuit_open",
+                method=request.method,
+                endpoint=endpoint_template(request.url.path)
+            )
+            stale = self._stale_response(request, user, "circuit_open")
+            if stale is None:
+                raise
+            return stale
+        
+        outcome = None
+        try:
+            try:
+                await user_quotas.quotas.take_page(user)
+                async with upstream_scheduler.scheduler.slot(upstream_scheduler.current_priority.get(), user):
+                    response = await self._send_instrumented(request, **kwargs)
+            except httpx.TransportError:
+                # Timeouts caused by the call's own deadline were raised as DeadlineExceeded
+                outcome = circuit_breaker.ERROR
+                stale = self._stale_response(request, user, "upstream_error")
+                if stale is None:
+                    raise
+                return stale
+            
+            seconds = response.elapsed.total_seconds() if response.is_closed else 0.0
+            outcome = breaker.classify(response.status_code, seconds)
+            if outcome == circuit_breaker.ERROR:
+                stale = self._stale_response(request, user, "upstream_error")
+                if stale is not None:
+                    return stale
+            elif response.is_success and request.method == "GET":
+                circuit_breaker.last_known_good.put(user, str(request.url), response)
+            return response
+        finally:
+            breaker.record(outcome, probe)
+    
+    def _stale_response(self, request: httpx.Request, user: Optional[str], reason: str) -> Optional[httpx.Response]:
+        """The last good response to a GET, if one is kept, with a refresh scheduled behind it"""
+        if request.method != "GET" or _refreshing.get():
+            return None
+        kept = circuit_breaker.last_known_good.get(user, str(request.url))
+        if kept is None:
+            return None
+        age, status_code, headers, content = kept
+        logger.warning(f"Serving {endpoint_template(request.url.path)} from a response {age:.0f}s old ({reason})")
+        STALE_RESPONSES.inc(reason=reason)
+        reads = circuit_breaker.stale_reads.get()
+        if reads is not None:
+            reads.note(age)
+        self._schedule_refresh(request, user)
+        return httpx.Response(
+            status_code,
+            headers=headers,
+            content=content,
+            request=request,
+            extensions={STALE_AGE: age}
+        )
+    
+    def _schedule_refresh(self, request: httpx.Request, user: Optional[str]) -> None:
+        """Repeat a GET in the background once the breaker lets requests through"""
+        key = (user, str(request.url))
+        if key in self._refreshes:
+            return
+        
+        async def refresh():
+            # At least a second, so a failing request is not repeated straight away
+            await asyncio.sleep(max(1.0, circuit_breaker.breaker.retry_after()))
+            _refreshing.set(True)
+            background = upstream_scheduler.upstream_priority(upstream_scheduler.BACKGROUND)
+            with deadlines.deadline_scope(None, detached=True), background:
+                try:
+                    # Unconditional, so the refresh brings a full response to keep
+                    headers = {k: v for k, v in request.headers.items() if k.lower() not in _CONDITIONAL_HEADERS}
+                    await self.send(self.build_request("GET", request.url, headers=headers))
+                except Exception as e:
+                    logger.info(f"Background refresh of {endpoint_template(request.url.path)} failed: {e}")
+        
+        task = asyncio.create_task(refresh())
+        self._refreshes[key] = task
+        task.add_done_callback(lambda _: self._refreshes.pop(key, None))
+    
+    async def _send_instrumented(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        left = deadlines.remaining()
+        if left is not None:
+            if left <= 0:
+                raise deadlines.DeadlineExceeded(f"Time budget spent before {request.method} {request.url.path}")
+            request.extensions["timeout"] = deadlines.clamp_timeouts(request.extensions.get("timeout"), left)
+        
+        endpoint = endpoint_template(request.url.path)
+        labels = {"method": request.method, "endpoint": endpoint}
+        span = tracing.start_span(
+            f"{request.method} {endpoint}",
+            kind=tracing.KIND_CLIENT,
+            **{"http.method": request.method, "http.route": endpoint}
+        )
+        start = time.perf_counter()
+        try:
+            response = await super().send(request, **kwargs)
+        except asyncio.CancelledError as e:
+            UPSTREAM_RESPONSES.inc(status="cancelled", **labels)
+            span.end(error=e)
+            raise
+        except Exception as e:
+            UPSTREAM_RESPONSES.inc(status="error", **labels)
+            span.end(error=e)
+            if isinstance(e, httpx.TimeoutException) and deadlines.expired():
+                raise deadlines.DeadlineExceeded(f"Time budget spent during {request.method} {endpoint}") from e
+            raise
+        
+        UPSTREAM_DURATION.observe(time.perf_counter() - start, **labels)
+        UPSTREAM_RESPONSES.inc(status=str(response.status_code), **labels)
+        span.set_attribute("http.status_code", response.status_code)
+        if response.is_stream_consumed:
+            span.set_attribute("http.response.body.size", len(response.content))
+        span.end()
+        return response
+
+
+class ScanListener:
+    """
+    Receives records as full scans page through them
+
+    Local indexes subclass this and register with
+    IroncladClient.add_scan_listener() so they are built as a side effect of
+    scans that are already happening, instead of issuing their own queries.
+    """
+    
+    def on_scan_page(self, records: List[Dict]) -> None:
+        """Called with every page of records fetched by a scan (before date filtering)"""
+    
+    def on_scan_complete(self, scope: Dict, complete: bool) -> None:
+        """
+        Called when a scan finishes
+        
+        Args:
+            scope: The scan's server-side filters (record_type, query, counterparty, status_filter, filter)
+            complete: False if the scan stopped early (e.g. timeout)
+        """
+
+
+class ScanStats:
+    """
+    Progress of a scan, filled in by IroncladClient.iter_record_pages
+
+    Attributes:
+        total: Records the server-side filters match
+        pages: Pages fetched so far
+        records: Records fetched so far (before date filtering)
+        complete: False if the scan ran out of time before reading every page
+        stop_reason: Why the scan stopped before the last page ('timeout',
+            'deadline', 'quota', 'limit', 'past date range' or 'cancelled'),
+            None if it read every page
+        resumed_from: Page a checkpointed scan resumed at (0 if it started fresh)
+    
+    Pages and records count from the start of the scan, including those read
+    by the calls a resumed scan continues.
+    """
+    
+    def __init__(self):
+        self.total = 0
+        self.pages = 0
+        self.records = 0
+        self.complete = True
+        self.stop_reason: Optional[str] = None
+        self.resumed_from = 0
+
+
+# ========== Filter Expressions ==========
+
+def _escape_filter_value(value: Any) -> str:
+    """Quote a value for a filter expression, escaping backslashes and quotes"""
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+class FilterExpression:
+    """
+    Node of a Records/Workflows API filter expression
+
+    Expressions compose with &, | and ~ (or the And/Or/Not classes) and
+    serialize to Ironclad's filter syntax, e.g.
+    (And(Contains([counterpartyName], "Zoom"), Not(Equals([step], "Sign"))))
+    """
+
+    def serialize(self) -> str:
+        """The expression without the outer parentheses the API requires"""
+        raise NotImplementedError
+
+    def to_param(self) -> str:
+        """The expression as the value of the 'filter' query parameter"""
+        return f"({self.serialize()})"
+
+    def __and__(self, other: "FilterExpression") -> "FilterExpression":
+        return And(self, other)
+
+    def __or__(self, other: "FilterExpression") -> "FilterExpression":
+        return Or(self, other)
+
+    def __invert__(self) -> "FilterExpression":
+        return Not(self)
+
+    def __repr__(self) -> str:
+        return self.serialize()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FilterExpression) and self.serialize() == other.serialize()
+
+    def __hash__(self) -> int:
+        return hash(self.serialize())
+
+
+class _FieldTerm(FilterExpression):
+    op = ""
+
+    def __init__(self, field: str, value: Any):
+        if not isinstance(field, str) or not field.strip() or any(c in field for c in '[]"'):
+            raise ValueError(f"Invalid filter field name: {field!r}")
+        if value is None:
+            raise ValueError(f"{self.op} filter on '{field}' needs a value")
+        self.field = field.strip()
+        self.value = value
+
+    def serialize(self) -> str:
+        return f"{self.op}([{self.field}], {_escape_filter_value(self.value)})"
+
+
+class Equals(_FieldTerm):
+    """Property equals the value exactly"""
+
+    op = "Equals"
+
+
+class Contains(_FieldTerm):
+    """Property contains the value (case-insensitive)"""
+
+    op = "Contains"
+
+
+class _Compound(FilterExpression):
+    op = ""
+
+    def __init__(self, *operands: FilterExpression):
+        if not operands:
+            raise ValueError(f"{self.op} filter needs at least one operand")
+        flattened: List[FilterExpression] = []
+        for operand in operands:
+            if not isinstance(operand, FilterExpression):
+                raise TypeError(f"{self.op} operands must be filter expressions, got {type(operand).__name__}")
+            # And(And(a, b), c) -> And(a, b, c)
+            flattened.extend(operand.operands if type(operand) is type(self) else [operand])
+        self.operands = flattened
+
+    def serialize(self) -> str:
+        if len(self.operands) == 1:
+            return self.operands[0].serialize()
+        return f"{self.op}({', '.join(operand.serialize() for operand in self.operands)})"
+
+
+class And(_Compound):
+    """All operands match"""
+
+    op = "And"
+
+
+class Or(_Compound):
+    """At least one operand matches"""
+
+    op = "Or"
+
+
+class Not(FilterExpression):
+    """The operand does not match"""
+
+    def __init__(self, operand: FilterExpression):
+        if not isinstance(operand, FilterExpression):
+            raise TypeError(f"Not operand must be a filter expression, got {type(operand).__name__}")
+        self.operand = operand
+
+    def serialize(self) -> str:
+        return f"Not({self.operand.serialize()})"
+
+
+class In(FilterExpression):
+    """Property equals any of the values (sent as an Or of Equals terms)"""
+
+    def __init__(self, field: str, values: List[Any]):
+        if isinstance(values, (str, bytes)) or not values:
+            raise ValueError(f"In filter on '{field}' needs a non-empty list of values")
+        # Drop duplicates but keep the caller's order
+        self.terms = [Equals(field, value) for value in dict.fromkeys(values)]
+        self.field = self.terms[0].field
+
+    def serialize(self) -> str:
+        return Or(*self.terms).serialize()
+
+
+# Leaf operators accepted by parse_filter: {"field": ..., "<op>": value}
+_LEAF_OPERATORS = {"equals": Equals, "contains": Contains, "in": In}
+
+
+def parse_filter(spec: Any) -> FilterExpression:
+    """
+    Build a filter expression from its JSON form (as passed to MCP tools)
+
+    Grammar:
+        {"and": [spec, ...]} | {"or": [spec, ...]} | {"not": spec}
+        {"field": "<property key>", "equals" | "contains": "<value>"}
+        {"field": "<property key>", "in": ["<value>", ...]}
+
+    Args:
+        spec: Decoded JSON filter
+
+    Returns:
+        The filter expression
+
+    Raises:
+        ValueError: If the filter is malformed
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Filter must be an object, got {type(spec).__name__}")
+
+    if "field" in spec:
+        operators = [key for key in spec if key in _LEAF_OPERATORS]
+        unknown = set(spec) - {"field"} - set(_LEAF_OPERATORS)
+        if len(operators) != 1 or unknown:
+            raise ValueError(
+                f"Filter on field needs exactly one of {', '.join(_LEAF_OPERATORS)}; got keys {sorted(spec)}"
+            )
+        return _LEAF_OPERATORS[operators[0]](spec["field"], spec[operators[0]])
+
+    if len(spec) != 1:
+        raise ValueError(f"Filter must have one of 'and', 'or', 'not' or 'field'; got keys {sorted(spec)}")
+    (op, operand), = spec.items()
+    if op == "not":
+        return Not(parse_filter(operand))
+    if op in ("and", "or"):
+        if not isinstance(operand, list) or not operand:
+            raise ValueError(f"'{op}' needs a non-empty list of filters")
+        operands = [parse_filter(item) for item in operand]
+        return And(*operands) if op == "and" else Or(*operands)
+    raise ValueError(f"Unknown filter operator '{op}'")
+
+
+def combine_filters(*expressions: Optional[FilterExpression]) -> Optional[str]:
+    """AND together the given expressions (skipping None) as a 'filter' parameter value"""
+    present = [expression for expression in expressions if expression is not None]
+    if not present:
+        return None
+    return And(*present).to_param()
+
+
+class BearerTokenAuth(httpx.Auth):
+    """Sets the Authorization header of each request from a token provider"""
+    
+    def __init__(self, token_provider: Callable[[], Awaitable[str]]):
+        self.token_provider = token_provider
+    
+    async def async_auth_flow(self, request: httpx.Request) -> AsyncIterator[httpx.Request]:
+        request.headers["Authorization"] = f"Bearer {await self.token_provider()}"
+        yield request
+
 
 class IroncladClient:
     """Client for interacting with Ironclad API"""
@@ -22,7 +460,8 @@ class IroncladClient:
         base_url: str,
         access_token: str,
         user_email: str,
-        timeout: int = 120
+        timeout: int = 120,
+        token_provider: Optional[Callable[[], Awaitable[str]]] = None
     ):
         """
         Initialize the Ironclad client
@@ -32,19 +471,30 @@ class IroncladClient:
             access_token: OAuth access token
             user_email: Email address for user impersonation (X-As-User-Email header)
             timeout: Request timeout in seconds
+            token_provider: Returns a current access token; asked before every
+                request, so tokens are renewed before they expire (without it,
+                `access_token` is sent for the life of the client)
         """
         self.base_url = base_url.rstrip('/')
         self.access_token = access_token
         self.user_email = user_email
         self.timeout = timeout
-        self.client = httpx.AsyncClient(
+        headers = {
+            "Content-Type": "application/json",
+            "X-As-User-Email": user_email
+        }
+        if token_provider is None:
+            headers["Authorization"] = f"Bearer {access_token}"
+        self.client = InstrumentedAsyncClient(
             timeout=httpx.Timeout(timeout),
-            headers={
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json",
-                "X-As-User-Email": user_email
-            }
+            headers=headers,
+            auth=BearerTokenAuth(token_provider) if token_provider else None
         )
+        self.scan_listeners: List[ScanListener] = []
+        # Where timed-out fetch_all_records scans are checkpointed (None = not resumable)
+        self.checkpoints: Optional[ScanCheckpointStore] = None
+        # On-disk cache of get_record and get_workflow responses (None = no cache)
+        self.http_cache: Optional[HttpCache] = None
     
     async def __aenter__(self):
         """Async context manager entry"""
@@ -58,6 +508,66 @@ class IroncladClient:
         """Close the HTTP client"""
         await self.client.aclose()
     
+    def add_scan_listener(self, listener: ScanListener) -> None:
+        """Register a listener that sees every page fetched by fetch_all_records"""
+        if listener not in self.scan_listeners:
+            self.scan_listeners.append(listener)
+    
+    def _notify_scan_page(self, records: List[Dict]) -> None:
+        for listener in self.scan_listeners:
+            try:
+                listener.on_scan_page(records)
+            except Exception as e:
+                logger.warning(f"Scan listener {type(listener).__name__} failed: {e}")
+    
+    def _notify_scan_complete(self, scope: Dict, complete: bool) -> None:
+        for listener in self.scan_listeners:
+            try:
+                listener.on_scan_complete(scope, complete)
+            except Exception as e:
+                logger.warning(f"Scan listener {type(listener).__name__} failed: {e}")
+    
+    async def _get_cached(self, url: str) -> httpx.Response:
+        """
+        GET a single record or workflow through the client's HTTP cache, if it has one
+        
+        A fresh cached response is returned without a request. Otherwise the
+        request carries the cached response's validators, and a 304 is
+        answered from the cache (see http_cache).
+        """
+        cache = self.http_cache
+        if cache is None or not cache.enabled:
+            return await self.client.get(url)
+        
+        request = self.client.build_request("GET", url)
+        key = str(request.url)
+        entry = await asyncio.to_thread(cache.load, self.user_email, key)
+        if entry is not None:
+            if entry.is_fresh():
+                record_cache_lookup("http", True)
+                return entry.to_response(request)
+            # The last good data to serve if Ironclad is down, also after a restart
+            circuit_breaker.last_known_good.put(
+                self.user_email, key, entry.to_response(request), fetched_at=entry.validated_at
+            )
+            request.headers.update(entry.validators())
+        
+        response = await self.client.send(request)
+        if STALE_AGE in response.extensions:
+            # Served from the last good data while Ironclad is down: nothing new to keep
+            return response
+        if response.status_code == 304 and entry is not None:
+            HTTP_CACHE_REVALIDATIONS.inc(result="not_modified")
+            record_cache_lookup("http", True)
+            await asyncio.to_thread(cache.revalidated, self.user_email, entry, response)
+            return entry.to_response(request)
+        if entry is not None and entry.validators():
+            HTTP_CACHE_REVALIDATIONS.inc(result="modified")
+        record_cache_lookup("http", False)
+        if response.is_success:
+            await asyncio.to_thread(cache.save, self.user_email, response)
+        return response
+    
     async def search_records(
         self,
         query: Optional[str] = None,
@@ -66,14 +576,18 @@ class IroncladClient:
         status_filter: Optional[str] = None,
         parent_record_id: Optional[str] = None,
         page_size: int = 100,
-        page: int = 0
+        page: int = 0,
+        filter_expr: Optional[FilterExpression] = None,
+        sort_field: Optional[str] = None,
+        sort_direction: str = "ASC"
     ) -> Dict:
         """
         Search for records using Ironclad's Records API
         
         Per Ironclad Support (Jan 2026):
         - Use 'types' query param for record type filtering
-        - Use 'filter' param with syntax: (Equals([field], "value"))
+        - Use 'filter' param with syntax: (Equals([field], "value")); built
+          from FilterExpression nodes so values are always escaped
         - Use 'page' and 'pageSize' for pagination (max pageSize: 100)
         - Date filtering NOT supported - must filter client-side
         
@@ -85,6 +599,9 @@ class IroncladClient:
             parent_record_id: Search for child contracts with this parent ID
             page_size: Number of results per page (max 100)
             page: Page number (0-indexed)
+            filter_expr: Additional filter on any property, ANDed with the above
+            sort_field: Attribute or property key to sort by (API default order if None)
+            sort_direction: 'ASC' or 'DESC'
         
         Returns:
             Dict with 'total' (count) and 'records' (list)
@@ -101,28 +618,29 @@ class IroncladClient:
         if record_type:
             params["types"] = record_type
         
-        # Build filter expressions (must wrap entire expression in parentheses)
+        if sort_field:
+            params["sortField"] = sort_field
+            params["sortDirection"] = sort_direction.upper()
+        
+        # Build filter expressions (combined with AND, wrapped in parentheses)
         filters = []
         
         if parent_record_id:
-            filters.append(f'Equals([parentRecordID], "{parent_record_id}")')
+            filters.append(Equals("parentRecordID", parent_record_id))
         
         if query:
-            filters.append(f'Contains([name], "{query}")')
+            filters.append(Contains("name", query))
         
         if counterparty:
             # Use Contains for partial matching (case-insensitive per Ironclad)
-            filters.append(f'Contains([counterpartyName], "{counterparty}")')
+            filters.append(Contains("counterpartyName", counterparty))
         
         if status_filter:
-            filters.append(f'Equals([workflowStatus], "{status_filter}")')
+            filters.append(Equals("workflowStatus", status_filter))
         
-        # Combine filters with AND and wrap in parentheses
-        if filters:
-            if len(filters) == 1:
-                params["filter"] = f'({filters[0]})'
-            else:
-                params["filter"] = f'(And({", ".join(filters)}))'
+        filter_param = combine_filters(*filters, filter_expr)
+        if filter_param:
+            params["filter"] = filter_param
         
         try:
             response = await self.client.get(url, params=params)
@@ -151,7 +669,7 @@ class IroncladClient:
         url = f"{self.base_url}/public/api/v1/records/{record_id}"
         
         try:
-            response = await self.client.get(url)
+            response = await self._get_cached(url)
             response.raise_for_status()
             return response.json()
         except httpx.HTTPError as e:
@@ -163,7 +681,8 @@ class IroncladClient:
         query: Optional[str] = None,
         record_type: Optional[str] = None,
         counterparty: Optional[str] = None,
-        status_filter: Optional[str] = None
+        status_filter: Optional[str] = None,
+        filter_expr: Optional[FilterExpression] = None
     ) -> int:
         """
         Count records matching search criteria (fast, no date filtering)
@@ -173,6 +692,7 @@ class IroncladClient:
             record_type: Type of record (e.g., 'plusAgreement')
             counterparty: Counterparty company name
             status_filter: Workflow status filter (e.g., 'Active')
+            filter_expr: Additional filter on any property
         
         Returns:
             Total count of matching records
@@ -183,10 +703,184 @@ class IroncladClient:
             counterparty=counterparty,
             status_filter=status_filter,
             page_size=1,
-            page=0
+            page=0,
+            filter_expr=filter_expr
         )
         return result.get("total", 0)
     
+    async def iter_record_pages(
+        self,
+        record_type: Optional[str] = None,
+        query: Optional[str] = None,
+        counterparty: Optional[str] = None,
+        status_filter: Optional[str] = None,
+        progress_callback=None,
+        concurrency: int = 1,
+        filter_expr: Optional[FilterExpression] = None,
+        timeout_seconds: Optional[float] = 120,
+        stats: Optional[ScanStats] = None,
+        sort_field: Optional[str] = None,
+        sort_direction: Optional[str] = None,
+        start_page: int = 0
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Page through every record matching the server-side filters
+        
+        Pages are yielded in order as they arrive, so callers that stream
+        them elsewhere (e.g. exports) hold one window of pages at a time.
+        Scan listeners see every page, and are told the scan finished when
+        the iteration runs to the end (a scan that starts past page 0 is
+        never reported complete, since listeners missed its first pages).
+        While it runs, the scan counts against the user's concurrent-scan
+        quota (see user_quotas); it stops early, like on a deadline, if the
+        user's pages-per-minute quota runs out mid-scan.
+        
+        Args:
+            record_type: Type of record to fetch
+            query: Free-text search query
+            counterparty: Counterparty company name
+            status_filter: Workflow status filter
+            progress_callback: Optional callback function for progress updates
+            concurrency: Pages requested at once after the first page (1 = sequential)
+            filter_expr: Additional server-side filter on any property
+            timeout_seconds: Stop early after this long (None = no limit); the
+                scan also stops before a batch that would overrun the call's deadline
+            stats: Optional ScanStats to fill in with the scan's progress
+            sort_field: Attribute or property to order the scan by
+            sort_direction: 'ASC' or 'DESC'
+            start_page: Page to start at, to resume a scan that stopped there
+        
+        Yields:
+            Lists of records, one per API page
+        """
+        # Counts against the user's concurrent-scan quota until the iteration ends
+        async with user_quotas.quotas.scan_slot(self.user_email):
+            stats = stats if stats is not None else ScanStats()
+            page = start_page
+            page_size = 100  # Maximum allowed by API per Ironclad
+            start_time = datetime.now()
+            stats.resumed_from = start_page
+            # Scan pages queue behind interactive and browsing requests
+            priority = max(upstream_scheduler.current_priority.get(), upstream_scheduler.BULK)
+            
+            async def fetch_page(number: int) -> Dict:
+                with upstream_scheduler.upstream_priority(priority):
+                    return await self.search_records(
+                        query=query,
+                        record_type=record_type,
+                        counterparty=counterparty,
+                        status_filter=status_filter,
+                        page_size=page_size,
+                        page=number,
+                        filter_expr=filter_expr,
+                        sort_field=sort_field,
+                        sort_direction=sort_direction
+                    )
+            
+            # Get total count first (with the first page to read)
+            batch_start = time.monotonic()
+            first_batch = await fetch_page(start_page)
+            
+            # Time of one round trip, until a full batch has been timed
+            batch_seconds = time.monotonic() - batch_start
+            total_records = first_batch.get("total", 0)
+            stats.total = total_records
+            logger.info(f"Total records to scan: {total_records}")
+            
+            if progress_callback:
+                progress_callback(f"Total records to scan: {total_records}")
+            
+            # Process first batch
+            records = first_batch.get("records", [])
+            self._notify_scan_page(records)
+            page += 1
+            stats.pages, stats.records = page, start_page * page_size + len(records)
+            yield records
+            
+            # Calculate total pages needed
+            total_pages = (total_records + page_size - 1) // page_size
+            
+            # Fetch remaining batches, up to `concurrency` pages at a time
+            concurrency = max(1, concurrency)
+            last_progress = start_page * page_size
+            while page < total_pages:
+                # Check timeout
+                elapsed = (datetime.now() - start_time).total_seconds()
+                records_scanned = page * page_size
+                if timeout_seconds is not None and elapsed > timeout_seconds:
+                    logger.warning(f"Timeout after {elapsed:.1f}s. Scanned {records_scanned}/{total_records} records.")
+                    if progress_callback:
+                        progress_callback(
+                            f"⚠️ Timeout after {elapsed:.1f}s. Scanned {records_scanned}/{total_records} records."
+                        )
+                    stats.complete = False
+                    stats.stop_reason = "timeout"
+                    break
+                
+                # Leave the rest of the call's budget when another batch would not fit in it
+                if deadlines.expired(reserve=batch_seconds):
+                    logger.info(f"Time budget spent after {elapsed:.1f}s. Scanned {records_scanned}/{total_records} records.")
+                    stats.complete = False
+                    stats.stop_reason = "deadline"
+                    break
+                
+                # Progress update
+                if progress_callback and records_scanned - last_progress >= 1000:
+                    progress_callback(f"Scanned {records_scanned}/{total_records} records ({elapsed:.1f}s)...")
+                    last_progress = records_scanned
+                
+                # Fetch next batches
+                batch_start = time.monotonic()
+                batches = await asyncio.gather(*(
+                    fetch_page(batch_page) for batch_page in range(page, min(page + concurrency, total_pages))
+                ), return_exceptions=True)
+                batch_seconds = time.monotonic() - batch_start
+                
+                exhausted = False
+                for batch in batches:
+                    if isinstance(batch, deadlines.DeadlineExceeded):
+                        # Keep the pages that arrived before the deadline
+                        logger.info(f"Time budget spent mid-batch. Scanned {page * page_size}/{total_records} records.")
+                        stats.complete = False
+                        stats.stop_reason = "deadline"
+                        exhausted = True
+                        break
+                    if isinstance(batch, user_quotas.QuotaExceeded):
+                        logger.info(f"User quota used up mid-batch. Scanned {page * page_size}/{total_records} records.")
+                        stats.complete = False
+                        stats.stop_reason = "quota"
+                        exhausted = True
+                        break
+                    if isinstance(batch, BaseException):
+                        raise batch
+                    records = batch.get("records", [])
+                    if not records:
+                        exhausted = True
+                        break
+                    self._notify_scan_page(records)
+                    page += 1
+                    stats.pages, stats.records = page, stats.records + len(records)
+                    yield records
+                if exhausted:
+                    break
+                
+                # Small delay to avoid overwhelming API
+                await asyncio.sleep(0.05)
+            
+            logger.info(f"Fetched {stats.records} total records in {(datetime.now() - start_time).total_seconds():.1f}s")
+            SCAN_PAGES.observe(page - start_page, complete=str(stats.complete).lower())
+            
+            self._notify_scan_complete(
+                {
+                    "record_type": record_type,
+                    "query": query,
+                    "counterparty": counterparty,
+                    "status_filter": status_filter,
+                    "filter": filter_expr
+                },
+                stats.complete and start_page == 0
+            )
+    
     async def fetch_all_records(
         self,
         record_type: Optional[str] = None,
@@ -196,7 +890,14 @@ class IroncladClient:
         date_field: Optional[str] = None,
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
-        progress_callback=None
+        progress_callback=None,
+        concurrency: int = 1,
+        filter_expr: Optional[FilterExpression] = None,
+        limit: Optional[int] = None,
+        date_order: Optional[str] = None,
+        stats: Optional[ScanStats] = None,
+        resumable: bool = True,
+        timeout_seconds: Optional[float] = 120
     ) -> List[Dict]:
         """
         Fetch ALL records and filter by date client-side (SLOW for large datasets)
@@ -204,6 +905,17 @@ class IroncladClient:
         This method is necessary because Ironclad's API doesn't support
         server-side date filtering on the /records endpoint.
         
+        Two things end a scan before the last page: `limit` matches have been
+        collected, or, with `date_order`, the pages (requested sorted by
+        date_field) have moved past the date range, so no later page can
+        match. The order is checked on every page: once a page is out of
+        order, neither applies and every page is read.
+        
+        A scan that times out, or runs out of the call's time budget or the
+        user's request quota, is checkpointed (see scan_checkpoints) when the client has a checkpoint
+        store, and the same call made again resumes from the page it stopped
+        at, merging the matches collected before.
+        
         Args:
             record_type: Type of record to fetch
             query: Free-text search query
@@ -213,9 +925,18 @@ class IroncladClient:
             date_from: Start date in YYYY-MM-DD format
             date_to: End date in YYYY-MM-DD format
             progress_callback: Optional callback function for progress updates
+            concurrency: Pages requested at once after the first page (1 = sequential)
+            filter_expr: Additional server-side filter on any property
+            limit: Stop once this many matching records have been collected
+            date_order: 'ASC' or 'DESC' to scan in date_field order and stop past the range
+            stats: Optional ScanStats to fill in (see stop_reason)
+            resumable: Checkpoint on timeout and resume from a checkpoint; pass
+                False for scans run only to feed scan listeners
+            timeout_seconds: Stop early after this long (None = no limit)
         
         Returns:
-            List of records matching the criteria
+            List of records matching the criteria (at most `limit`; in date
+            order with date_order, otherwise in API order)
         """
         # Parse dates if provided (using consistent date parser)
         date_from_obj = None
@@ -227,106 +948,132 @@ class IroncladClient:
                 logger.info(f"Date filtering: {date_field} from {date_from_obj} to {date_to_obj}")
             except ValueError as e:
                 raise ValueError(f"Date parsing error: {e}")
+        date_filtering = bool(date_field and date_from_obj and date_to_obj)
+        date_order = date_order.upper() if date_filtering and date_order else None
+        stats = stats if stats is not None else ScanStats()
         
-        # Fetch all records in batches
-        all_records = []
-        page = 0
-        page_size = 100  # Maximum allowed by API per Ironclad
-        start_time = datetime.now()
-        timeout_seconds = 120  # 2 minute timeout
+        checkpoints = self.checkpoints if resumable else None
+        fingerprint = None
+        checkpoint = None
+        if checkpoints is not None:
+            fingerprint = scan_fingerprint(self.user_email, {
+                "record_type": record_type,
+                "query": query,
+                "counterparty": counterparty,
+                "status_filter": status_filter,
+                "filter": filter_expr.to_param() if filter_expr is not None else None,
+                "date_field": date_field if date_filtering else None,
+                "date_from": date_from_obj.isoformat() if date_filtering else None,
+                "date_to": date_to_obj.isoformat() if date_filtering else None,
+                "date_order": date_order,
+            })
+            checkpoint = await asyncio.to_thread(checkpoints.load, fingerprint)
+            if checkpoint is not None:
+                # Page boundaries only line up if nothing was added or removed since
+                total = await self.count_records(
+                    query=query,
+                    record_type=record_type,
+                    counterparty=counterparty,
+                    status_filter=status_filter,
+                    filter_expr=filter_expr
+                )
+                if total != checkpoint.total:
+                    logger.info(f"Scan checkpoint {fingerprint} is stale ({checkpoint.total} -> {total} records), starting over")
+                    await asyncio.to_thread(checkpoints.discard, fingerprint)
+                    checkpoint = None
+                else:
+                    logger.info(
+                        f"Resuming scan from page {checkpoint.next_page} with {len(checkpoint.matches)} saved matches"
+                    )
+                    SCAN_RESUMES.inc()
         
-        # Get total count first
-        first_batch = await self.search_records(
-            query=query,
+        # Fetch all records in batches, filtering each page as it arrives
+        matches = list(checkpoint.matches) if checkpoint else []
+        seen_dated = checkpoint.seen_dated if checkpoint else False
+        # Whether every page so far came back in date_order (see below)
+        ordered = True
+        previous_dates: Optional[PageDates] = None
+        pages = self.iter_record_pages(
             record_type=record_type,
+            query=query,
             counterparty=counterparty,
             status_filter=status_filter,
-            page_size=page_size,
-            page=0
+            progress_callback=progress_callback,
+            concurrency=concurrency,
+            filter_expr=filter_expr,
+            timeout_seconds=timeout_seconds,
+            stats=stats,
+            sort_field=date_field if date_order else None,
+            sort_direction=date_order,
+            start_page=checkpoint.next_page if checkpoint else 0
         )
         
-        total_records = first_batch.get("total", 0)
-        logger.info(f"Total records to scan: {total_records}")
-        
-        if progress_callback:
-            progress_callback(f"Total records to scan: {total_records}")
-        
-        # Process first batch
-        records = first_batch.get("records", [])
-        all_records.extend(records)
-        page += 1
-        
-        # Calculate total pages needed
-        total_pages = (total_records + page_size - 1) // page_size
-        
-        # Fetch remaining batches
-        while page < total_pages:
-            # Check timeout
-            elapsed = (datetime.now() - start_time).total_seconds()
-            records_scanned = page * page_size
-            if elapsed > timeout_seconds:
-                logger.warning(f"Timeout after {elapsed:.1f}s. Scanned {records_scanned}/{total_records} records.")
-                if progress_callback:
-                    progress_callback(
-                        f"⚠️ Timeout after {elapsed:.1f}s. Scanned {records_scanned}/{total_records} records. "
-                        f"Found {len(all_records)} so far."
-                    )
-                break
-            
-            # Progress update
-            if progress_callback and records_scanned % 1000 == 0:
-                progress_callback(f"Scanned {records_scanned}/{total_records} records ({elapsed:.1f}s)...")
-            
-            # Fetch next batch
-            batch = await self.search_records(
-                query=query,
-                record_type=record_type,
-                counterparty=counterparty,
-                status_filter=status_filter,
-                page_size=page_size,
-                page=page
+        def progress() -> ScanCheckpoint:
+            return ScanCheckpoint(
+                fingerprint=fingerprint,
+                next_page=stats.pages,
+                total=stats.total,
+                seen_dated=seen_dated,
+                matches=matches
             )
-            
-            records = batch.get("records", [])
-            if not records:
-                break
-            
-            all_records.extend(records)
-            page += 1
-            
-            # Small delay to avoid overwhelming API
-            await asyncio.sleep(0.05)
-        
-        logger.info(f"Fetched {len(all_records)} total records in {(datetime.now() - start_time).total_seconds():.1f}s")
-        
-        # Filter by date if specified
-        if date_field and date_from_obj and date_to_obj:
-            filtered = []
-            for record in all_records:
-                # Get the date field value from properties (per Ironclad API structure)
-                props = record.get("properties", {})
-                date_field_obj = props.get(date_field, {})
-                date_value = date_field_obj.get("value") if isinstance(date_field_obj, dict) else None
-                
-                if not date_value:
-                    continue
-                
-                try:
-                    # Parse the date from the record (using consistent date parser)
-                    record_date = DateParser.parse_date(date_value)
-                    
-                    # Check if date is in range
-                    if date_from_obj <= record_date <= date_to_obj:
-                        filtered.append(record)
-                except Exception as e:
-                    logger.warning(f"Error parsing date for record: {e}")
-                    continue
-            
-            logger.info(f"Date filtering: {len(filtered)}/{len(all_records)} records match date range")
-            return filtered
         
-        return all_records
-    
+        try:
+            async with aclosing(pages):
+                async for records in pages:
+                    if not date_filtering:
+                        matches.extend(records)
+                    else:
+                        page_dates = PageDates(records, date_field)
+                        matches.extend(page_dates.in_range(date_from_obj, date_to_obj))
+                        if date_order and ordered:
+                            # Stopping early is only safe while the pages really are
+                            # sorted by the date: if Ironclad ignores the sort for this
+                            # field, scan every page rather than drop matches
+                            descending = date_order == "DESC"
+                            if not page_dates.follows(previous_dates, descending):
+                                ordered = False
+                                logger.warning(f"Pages are not sorted by {date_field}; scanning every page")
+                                SCAN_UNORDERED.inc()
+                        if date_order and ordered:
+                            previous_dates = page_dates
+                            # Undated records sort together at one end, so once they
+                            # follow dated ones no dated record is left
+                            seen_dated = seen_dated or page_dates.earliest is not None
+                            if (seen_dated and page_dates.ends_undated) or page_dates.past_range(
+                                date_from_obj, date_to_obj, descending=descending
+                            ):
+                                stats.stop_reason = "past date range"
+                                break
+                    # Unsorted, the first `limit` matches are not the first in date order
+                    if limit is not None and len(matches) >= limit and (ordered or not date_order):
+                        stats.stop_reason = "limit"
+                        break
+        except asyncio.CancelledError:
+            # The tool call was abandoned: stop here, but keep the progress for a
+            # retry (saved off the cancelled task, which cannot await any more)
+            stats.complete = False
+            stats.stop_reason = "cancelled"
+            logger.info(f"Scan cancelled after {stats.pages} pages ({stats.records}/{stats.total} records)")
+            SCAN_EARLY_STOPS.inc(reason="cancelled")
+            if checkpoints is not None and stats.pages > stats.resumed_from:
+                asyncio.get_running_loop().run_in_executor(None, checkpoints.save, progress())
+            raise
+        
+        if checkpoints is not None:
+            if stats.stop_reason in ("timeout", "deadline", "quota"):
+                await asyncio.to_thread(checkpoints.save, progress())
+            elif checkpoint is not None:
+                await asyncio.to_thread(checkpoints.discard, fingerprint)
+        
+        if stats.stop_reason is not None:
+            logger.info(
+                f"Stopped scan after {stats.pages} pages ({stats.records}/{stats.total} records): {stats.stop_reason}"
+            )
+            SCAN_EARLY_STOPS.inc(reason=stats.stop_reason.replace(" ", "_"))
+        if date_filtering:
+            logger.info(f"Date filtering: {len(matches)}/{stats.records} records match date range")
+        return matches[:limit] if limit is not None else matches
+
     async def get_record_attachments(self, record_id: str) -> Dict:
         """
         Get attachments for a record
@@ -370,7 +1117,8 @@ class IroncladClient:
         counterparty: Optional[str] = None,
         stage: Optional[str] = None,
         page: int = 0,
-        page_size: int = 100
+        page_size: int = 100,
+        filter_expr: Optional[FilterExpression] = None
     ) -> Dict:
         """
         Search for workflows (in-progress contracts)
@@ -382,6 +1130,7 @@ class IroncladClient:
             stage: Filter by workflow stage (e.g., 'review', 'sign', 'draft')
             page: Page number (0-indexed)
             page_size: Number of results per page (max 100)
+            filter_expr: Additional filter on any field, ANDed with the above
         
         Returns:
             Dict with 'total' count and 'workflows' list
@@ -397,19 +1146,17 @@ class IroncladClient:
         if record_type:
             params["types"] = record_type
         if query:
-            filters.append(f'Contains([name], "{query}")')
+            filters.append(Contains("name", query))
         if counterparty:
-            filters.append(f'Contains([counterpartyName], "{counterparty}")')
+            filters.append(Contains("counterpartyName", counterparty))
         if stage:
             # Stage filter - use exact match for stage name
             # API uses 'step' field (e.g., 'Sign', 'Review', 'Draft')
-            filters.append(f'Equals([step], "{stage}")')
+            filters.append(Equals("step", stage))
         
-        if filters:
-            if len(filters) == 1:
-                params["filter"] = f'({filters[0]})'
-            else:
-                params["filter"] = f'(And({", ".join(filters)}))'
+        filter_param = combine_filters(*filters, filter_expr)
+        if filter_param:
+            params["filter"] = filter_param
         
         try:
             response = await self.client.get(url, params=params)
@@ -433,61 +1180,51 @@ class IroncladClient:
         Returns:
             Dict containing workflow data
         """
-        import sys
-        print(f"\n🔍 get_workflow called with: {workflow_id}", file=sys.stderr, flush=True)
-        
-        # If it looks like an Ironclad ID (IC-xxxxx), we need to get it directly
-        # The API should accept ironcladId directly in the path
-        if workflow_id.upper().startswith("IC-"):
-            # Try using ironcladId directly
-            url = f"{self.base_url}/public/api/v1/workflows/{workflow_id}"
-            print(f"   Using IC- ID path: {url}", file=sys.stderr, flush=True)
-        else:
-            # Use UUID directly
-            url = f"{self.base_url}/public/api/v1/workflows/{workflow_id}"
-            print(f"   Using UUID path: {url}", file=sys.stderr, flush=True)
+        logger.debug("get_workflow called with %s", workflow_id)
+        
+        # Ironclad IDs (IC-xxxxx) and UUIDs are both accepted directly in the path
+        url = f"{self.base_url}/public/api/v1/workflows/{workflow_id}"
         
         try:
-            print(f"   Making request...", file=sys.stderr, flush=True)
-            response = await self.client.get(url)
-            print(f"   Response status: {response.status_code}", file=sys.stderr, flush=True)
+            response = await self._get_cached(url)
             response.raise_for_status()
             data = response.json()
-            print(f"   ✅ Success! Got workflow: {data.get('ironcladId', data.get('id'))}", file=sys.stderr, flush=True)
+            logger.debug("Got workflow %s (status %s)", data.get('ironcladId', data.get('id')), response.status_code)
             return data
         except httpx.HTTPError as e:
-            print(f"   ❌ HTTP Error: {e}", file=sys.stderr, flush=True)
-            # If direct lookup fails and it's an IC- ID, try searching
-            if workflow_id.upper().startswith("IC-"):
-                print(f"   Direct lookup failed, trying search...", file=sys.stderr, flush=True)
-                logger.info(f"Direct lookup failed for {workflow_id}, trying search...")
+            # If direct lookup fails and it's an IC- ID, try searching (a failed
+            # connection would fail the search as well)
+            if isinstance(e, httpx.HTTPStatusError) and workflow_id.upper().startswith("IC-"):
+                logger.info(f"Direct lookup failed for {workflow_id} ({e}), trying search...")
                 try:
                     # Search by filtering on ironcladId field
                     search_url = f"{self.base_url}/public/api/v1/workflows"
                     params = {
-                        "filter": f'(Equals([ironcladId], "{workflow_id}"))',
+                        "filter": Equals("ironcladId", workflow_id).to_param(),
                         "pageSize": 1
                     }
-                    print(f"   Search params: {params}", file=sys.stderr, flush=True)
                     search_response = await self.client.get(search_url, params=params)
                     search_response.raise_for_status()
                     data = search_response.json()
                     workflows = data.get("list", [])
-                    print(f"   Search found {len(workflows)} workflow(s)", file=sys.stderr, flush=True)
+                    logger.debug("Workflow search for %s found %d workflow(s)", workflow_id, len(workflows))
                     if workflows:
                         # Found it via search, now get full details with the UUID
-                        uuid = workflows[0].get("id")
-                        print(f"   Fetching by UUID: {uuid}", file=sys.stderr, flush=True)
-                        return await self.get_workflow(uuid)
+                        return await self.get_workflow(workflows[0].get("id"))
                     else:
-                        print(f"   ❌ No workflows found in search", file=sys.stderr, flush=True)
                         raise ValueError(f"Workflow {workflow_id} not found in search")
+                except (
+                    deadlines.DeadlineExceeded,
+                    user_quotas.QuotaExceeded,
+                    circuit_breaker.CircuitOpen,
+                    httpx.TransportError
+                ):
+                    # Not a missing workflow: the caller reports these as they are
+                    raise
                 except Exception as search_error:
-                    print(f"   ❌ Search failed: {search_error}", file=sys.stderr, flush=True)
                     logger.error(f"Search also failed: {search_error}")
                     raise ValueError(f"Workflow {workflow_id} not found (search failed: {search_error})")
             else:
-                print(f"   ❌ Non-IC ID failed, re-raising error", file=sys.stderr, flush=True)
                 logger.error(f"Error getting workflow: {e}")
                 raise
     
@@ -495,7 +1232,8 @@ class IroncladClient:
         self,
         query: Optional[str] = None,
         record_type: Optional[str] = None,
-        counterparty: Optional[str] = None
+        counterparty: Optional[str] = None,
+        filter_expr: Optional[FilterExpression] = None
     ) -> int:
         """
         Count workflows matching criteria
@@ -504,6 +1242,7 @@ class IroncladClient:
             query: Search query
             record_type: Filter by workflow type
             counterparty: Filter by counterparty
+            filter_expr: Additional filter on any field
         
         Returns:
             Total count of matching workflows
@@ -513,6 +1252,7 @@ class IroncladClient:
             record_type=record_type,
             counterparty=counterparty,
             page=0,
-            page_size=1  # We only need the count
+            page_size=1,  # We only need the count
+            filter_expr=filter_expr
         )
         return result.get("total", 0)
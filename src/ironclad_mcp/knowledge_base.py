@@ -0,0 +1,274 @@
+"""
+Knowledge base registry
+
+Loads the knowledge_base/ files once, validates them, and keeps both the
+parsed data (for lookups from tool code) and the ready-to-send resource
+payloads in memory. Files are re-read only when their mtime changes, so
+resource reads are memory returns instead of open/parse/serialize cycles.
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OVERVIEW_FILE = "SHOPIFY_IRONCLAD_KNOWLEDGE_BASE.md"
+RECORD_TYPES_FILE = "record_types.json"
+CRITICAL_FIELDS_FILE = "critical_fields.json"
+
+OVERVIEW_DISCLAIMER = """
+> **IMPORTANT**: This knowledge base is a CONTEXT GUIDE ONLY.
+> It documents critical fields and common search patterns but is NOT exhaustive.
+> Many additional fields exist for each record type beyond those listed here.
+> Use this to understand organization and search strategies, not as a complete field dictionary.
+
+---
+
+"""
+
+
+def _build_overview(content: str) -> Tuple[str, str]:
+    payload = content + OVERVIEW_DISCLAIMER if not content.startswith(">") else content
+    return content, payload
+
+
+def _record_type_lookups(data: Dict) -> Tuple[Dict[str, Dict], Dict[str, List[str]]]:
+    """Record types by lowercased key and API value, and API values by lowercased practice area"""
+    record_types: Dict[str, Dict] = {}
+    practice_areas: Dict[str, List[str]] = {}
+    for area_name, area in data.get("practiceAreas", {}).items():
+        if not isinstance(area, dict) or not isinstance(area.get("recordTypes", {}), dict):
+            raise ValueError(f"practice area '{area_name}' must be an object with a 'recordTypes' object")
+        api_values = []
+        for key, info in area.get("recordTypes", {}).items():
+            if not isinstance(info, dict) or not isinstance(info.get("apiValue", key), str):
+                raise ValueError(f"record type '{key}' must be an object with a string 'apiValue'")
+            api_value = info.get("apiValue", key)
+            entry = {**info, "apiValue": api_value, "practiceArea": area_name}
+            record_types[key.lower()] = entry
+            record_types[api_value.lower()] = entry
+            api_values.append(api_value)
+        practice_areas[area_name.lower()] = api_values
+    return record_types, practice_areas
+
+
+def _field_lookups(data: Dict) -> Dict[str, Dict]:
+    """Critical field definitions by key and by API field name"""
+    fields: Dict[str, Dict] = {}
+    for category, group in data.items():
+        if not category.endswith("Fields") or not isinstance(group, dict):
+            continue
+        for key, info in group.items():
+            if not isinstance(info, dict) or not isinstance(info.get("apiField", ""), str):
+                raise ValueError(f"field '{key}' in '{category}' must be an object with a string 'apiField'")
+            entry = {**info, "key": key, "category": category}
+            fields[key] = entry
+            if info.get("apiField"):
+                fields[info["apiField"]] = entry
+    return fields
+
+
+def _build_json(
+    required_key: Optional[str],
+    disclaimer: str,
+    lookups: Optional[Callable[[Dict], Any]] = None
+) -> Callable[[str], Tuple[Any, str]]:
+    """
+    Builder that validates a JSON file and adds the metadata disclaimer to its payload
+
+    `lookups` builds the file's lookup tables; it runs here too, so a file
+    with a malformed entry is rejected on load rather than when the tables
+    are rebuilt.
+    """
+
+    def build(content: str) -> Tuple[Any, str]:
+        data = json.loads(content)
+        if not isinstance(data, dict):
+            raise ValueError("top-level value must be an object")
+        if required_key and not isinstance(data.get(required_key), dict):
+            raise ValueError(f"missing '{required_key}' object")
+        if not isinstance(data.get("metadata", {}), dict):
+            raise ValueError("'metadata' must be an object")
+        if lookups is not None:
+            lookups(data)
+
+        # Leave the parsed data untouched for lookups; only the payload gets the disclaimer
+        payload = dict(data)
+        payload["metadata"] = {**data.get("metadata", {}), "disclaimer": disclaimer}
+        return data, json.dumps(payload, indent=2)
+
+    return build
+
+
+# Resource URI -> (file name, builder, payload when the file is missing)
+RESOURCES: Dict[str, Tuple[str, Callable[[str], Tuple[Any, str]], str]] = {
+    "knowledge://shopify-ironclad/overview": (
+        OVERVIEW_FILE,
+        _build_overview,
+        "Knowledge base file not found. Please ensure knowledge_base directory exists."
+    ),
+    "knowledge://shopify-ironclad/record-types": (
+        RECORD_TYPES_FILE,
+        _build_json(
+            "practiceAreas",
+            "Context guide only - not an exhaustive list of all record types or document types",
+            _record_type_lookups
+        ),
+        json.dumps({"error": "Record types file not found"})
+    ),
+    "knowledge://shopify-ironclad/critical-fields": (
+        CRITICAL_FIELDS_FILE,
+        _build_json(
+            "universalFields",
+            "Context guide only - many additional fields exist per record type beyond those documented here",
+            _field_lookups
+        ),
+        json.dumps({"error": "Critical fields file not found"})
+    ),
+}
+
+
+class KnowledgeBaseRegistry:
+    """In-memory, mtime-refreshed view of the knowledge_base directory"""
+
+    def __init__(self, base_dir: Path, check_interval: float = 2.0):
+        """
+        Load every knowledge base file
+
+        Args:
+            base_dir: Directory containing the knowledge base files
+            check_interval: Minimum seconds between mtime checks of the files
+        """
+        self.base_dir = Path(base_dir)
+        self.check_interval = check_interval
+        self._last_check = 0.0
+
+        # URI -> {"mtime", "data", "payload"}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Lookup tables derived from the parsed JSON files
+        self._record_types: Dict[str, Dict] = {}
+        self._practice_areas: Dict[str, List[str]] = {}
+        self._fields: Dict[str, Dict] = {}
+
+        for uri in RESOURCES:
+            self._load(uri)
+        self._rebuild_lookups()
+        self._last_check = time.monotonic()
+
+    # ========== Loading ==========
+
+    def _mtime(self, file_name: str) -> Optional[float]:
+        try:
+            return os.stat(self.base_dir / file_name).st_mtime
+        except OSError:
+            return None
+
+    def _load(self, uri: str) -> None:
+        file_name, build, missing_payload = RESOURCES[uri]
+        mtime = self._mtime(file_name)
+
+        if mtime is None:
+            self._entries[uri] = {"mtime": None, "data": None, "payload": missing_payload}
+            return
+
+        try:
+            content = (self.base_dir / file_name).read_text(encoding="utf-8")
+            data, payload = build(content)
+        except (OSError, ValueError) as e:
+            previous = self._entries.get(uri)
+            if previous and previous["data"] is not None:
+                # Keep serving the last good version while the file is being edited
+                logger.warning(f"Invalid knowledge base file {file_name}, keeping previous version: {e}")
+                previous["mtime"] = mtime
+                return
+            logger.error(f"Invalid knowledge base file {file_name}: {e}")
+            self._entries[uri] = {"mtime": mtime, "data": None, "payload": missing_payload}
+            return
+
+        self._entries[uri] = {"mtime": mtime, "data": data, "payload": payload}
+        logger.info(f"Loaded knowledge base file {file_name}")
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Reload any file whose mtime changed since it was loaded
+
+        Args:
+            force: Check mtimes even if check_interval has not elapsed
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        changed = False
+        for uri, (file_name, _, _) in RESOURCES.items():
+            if self._mtime(file_name) != self._entries[uri]["mtime"]:
+                self._load(uri)
+                changed = True
+        if changed:
+            self._rebuild_lookups()
+
+    def _rebuild_lookups(self) -> None:
+        # The files were checked by their builders, so these do not raise
+        record_data = self._entries["knowledge://shopify-ironclad/record-types"]["data"] or {}
+        record_types, practice_areas = _record_type_lookups(record_data)
+        field_data = self._entries["knowledge://shopify-ironclad/critical-fields"]["data"] or {}
+        fields = _field_lookups(field_data)
+
+        self._record_types = record_types
+        self._practice_areas = practice_areas
+        self._fields = fields
+
+    # ========== Resources ==========
+
+    def get_resource(self, uri: str) -> Optional[str]:
+        """
+        Ready-to-send payload for a resource URI
+
+        Returns:
+            Resource text, or None if the URI is unknown
+        """
+        self.refresh()
+        entry = self._entries.get(uri)
+        return entry["payload"] if entry else None
+
+    # ========== Lookups ==========
+
+    def get_record_type(self, record_type: str) -> Optional[Dict]:
+        """
+        Look up a record type by key or API value (case-insensitive)
+
+        Returns:
+            Record type definition with 'apiValue' and 'practiceArea', or None
+        """
+        self.refresh()
+        return self._record_types.get(record_type.lower())
+
+    def get_practice_areas(self) -> List[str]:
+        """Names of the documented practice areas"""
+        self.refresh()
+        record_data = self._entries["knowledge://shopify-ironclad/record-types"]["data"] or {}
+        return list(record_data.get("practiceAreas", {}))
+
+    def get_practice_area_types(self, practice_area: str) -> List[str]:
+        """
+        API values of every record type in a practice area (case-insensitive)
+
+        Returns:
+            List of record type API values, empty if the practice area is unknown
+        """
+        self.refresh()
+        return list(self._practice_areas.get(practice_area.lower(), []))
+
+    def get_field(self, field: str) -> Optional[Dict]:
+        """
+        Look up a critical field definition by key (e.g. 'renewalTermMonths') or API field name
+
+        Returns:
+            Field definition with 'key' and 'category', or None
+        """
+        self.refresh()
+        return self._fields.get(field)
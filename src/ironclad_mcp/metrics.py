@@ -0,0 +1,327 @@
+"""
+Prometheus metrics for the Ironclad MCP server
+
+A small in-process registry rendered in the Prometheus text exposition
+format by the HTTP server's /metrics route. It only implements what the
+server needs (counters, gauges and histograms with labels), which keeps
+prometheus_client out of the dependency list; metrics are recorded in the
+stdio server too, they are just never scraped there.
+"""
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+# Prometheus client defaults, extended for scans that run for minutes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (no labels)"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def value(self) -> float:
+        return self._value
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self._value)}"]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts, sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Every metric defined in the process, in definition order"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ========== Metric Definitions ==========
+
+TOOL_CALLS = Counter(
+    "ironclad_mcp_tool_calls_total",
+    "MCP tool calls",
+    ["tool"]
+)
+TOOL_ERRORS = Counter(
+    "ironclad_mcp_tool_errors_total",
+    "MCP tool calls that failed, by exception type",
+    ["tool", "error"]
+)
+TOOL_CANCELLATIONS = Counter(
+    "ironclad_mcp_tool_cancellations_total",
+    "MCP tool calls abandoned by the client (notifications/cancelled or a closed connection)",
+    ["tool"]
+)
+TOOL_DURATION = Histogram(
+    "ironclad_mcp_tool_duration_seconds",
+    "MCP tool call latency, including upstream requests and rendering",
+    ["tool"]
+)
+
+UPSTREAM_DURATION = Histogram(
+    "ironclad_upstream_request_duration_seconds",
+    "Ironclad API request latency (until the body is read)",
+    ["method", "endpoint"]
+)
+UPSTREAM_RESPONSES = Counter(
+    "ironclad_upstream_responses_total",
+    "Ironclad API responses by status code (429 = rate limited, 'error' = transport error, 'cancelled' = abandoned, "
+    "'circuit_open' = not sent while the circuit breaker was open)",
+    ["method", "endpoint", "status"]
+)
+UPSTREAM_QUEUE_WAIT = Histogram(
+    "ironclad_upstream_queue_wait_seconds",
+    "Time an Ironclad API request waited for a slot in the upstream scheduler, by priority class",
+    ["priority"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+UPSTREAM_QUEUED = Gauge(
+    "ironclad_upstream_queued_requests",
+    "Ironclad API requests waiting for a slot in the upstream scheduler"
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "ironclad_upstream_in_flight_requests",
+    "Ironclad API requests holding a slot in the upstream scheduler"
+)
+USER_QUOTA_WAIT = Histogram(
+    "ironclad_user_quota_wait_seconds",
+    "Time a user's request waited for a per-user quota, by quota",
+    ["quota"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+USER_QUOTA_REJECTIONS = Counter(
+    "ironclad_user_quota_rejections_total",
+    "Requests refused because a user's quota was used up, by quota",
+    ["quota"]
+)
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "ironclad_upstream_circuit_state",
+    "State of the Ironclad API circuit breaker (0 = closed, 1 = half-open, 2 = open)"
+)
+UPSTREAM_CIRCUIT_TRIPS = Counter(
+    "ironclad_upstream_circuit_trips_total",
+    "Times the Ironclad API circuit breaker opened, by cause (errors, latency, probe)",
+    ["reason"]
+)
+STALE_RESPONSES = Counter(
+    "ironclad_stale_responses_total",
+    "Ironclad API requests answered with the last good response, by cause (circuit_open, upstream_error)",
+    ["reason"]
+)
+
+SCAN_PAGES = Histogram(
+    "ironclad_scan_pages",
+    "Pages fetched per full scan (fetch_all_records)",
+    ["complete"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000)
+)
+
+SCAN_EARLY_STOPS = Counter(
+    "ironclad_scan_early_stops_total",
+    "Scans that stopped before the last page: enough matches (limit), past the date range, timeout, deadline, quota or cancelled",
+    ["reason"]
+)
+
+SCAN_UNORDERED = Counter(
+    "ironclad_scan_unordered_total",
+    "Date-ordered scans whose pages did not come back sorted by the date, so every page was read"
+)
+
+SCAN_RESUMES = Counter(
+    "ironclad_scan_resumes_total",
+    "Scans resumed from the checkpoint of an earlier scan that timed out"
+)
+
+HTTP_CACHE_REVALIDATIONS = Counter(
+    "ironclad_http_cache_revalidations_total",
+    "Conditional requests for cached records and workflows, by result (not_modified = 304, modified = new body)",
+    ["result"]
+)
+
+CACHE_LOOKUPS = Counter(
+    "ironclad_mcp_cache_lookups_total",
+    "Cache lookups by cache and result (hit ratio = hit / (hit + miss))",
+    ["cache", "result"]
+)
+
+QUERY_PLANS = Counter(
+    "ironclad_mcp_query_plans_total",
+    "Strategies chosen by the query planner for searches and counts",
+    ["strategy"]
+)
+
+ACTIVE_SSE_SESSIONS = Gauge(
+    "ironclad_mcp_active_sse_sessions",
+    "Open MCP SSE sessions"
+)
+
+OAUTH_TOKEN_REQUESTS = Counter(
+    "ironclad_oauth_token_requests_total",
+    "OAuth access token requests (initial and refreshes), by result",
+    ["result"]
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "ironclad_mcp_event_loop_lag_seconds",
+    "Delay of a periodic event loop wake-up beyond its scheduled time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache hit or miss"""
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """
+    Measure event loop lag until cancelled
+
+    Sleeps for `interval` and records how much later than scheduled the loop
+    woke up; anything blocking the loop shows up as lag.
+    """
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, time.monotonic() - start - interval))
@@ -0,0 +1,163 @@
+"""
+Concurrent search across several record types
+
+Questions like "all Revenue contracts with Zoom" span several record types,
+and the Records API takes one type per request. Every type is queried at
+once, each already sorted by the requested key, and the per-type streams are
+combined with a k-way merge on a heap. Pages of a type are only fetched when
+the merge consumes that far into it, and never beyond the first
+(page + 1) * page_size records, so deep types cost one request.
+"""
+import asyncio
+import heapq
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .ironclad_client import FilterExpression, IroncladClient
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 100
+
+
+def record_sort_value(record: Dict, field: str) -> Any:
+    """Value of a record attribute (e.g. 'name') or property used for sorting"""
+    if field in record:
+        value = record[field]
+    else:
+        prop = record.get("properties", {}).get(field)
+        value = prop.get("value") if isinstance(prop, dict) else prop
+    if isinstance(value, dict):
+        # Monetary amounts: {"amount": ..., "currency": ...}
+        value = value.get("amount")
+    return value
+
+
+class _SortKey:
+    """Orders values ascending or descending, with missing values always last"""
+
+    __slots__ = ("missing", "value", "descending")
+
+    def __init__(self, value: Any, descending: bool):
+        self.missing = value is None or value == ""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            self.value: Tuple = (0, value)
+        else:
+            self.value = (1, str(value).lower() if not self.missing else "")
+        self.descending = descending
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _SortKey) and (self.missing, self.value) == (other.missing, other.value)
+
+    def __lt__(self, other: "_SortKey") -> bool:
+        if self.missing != other.missing:
+            return other.missing
+        if self.descending:
+            return other.value < self.value
+        return self.value < other.value
+
+
+class _TypeStream:
+    """Sorted results of one record type, fetched a page at a time"""
+
+    def __init__(self, client: IroncladClient, record_type: Optional[str], page_size: int, search_args: Dict):
+        self.client = client
+        self.record_type = record_type
+        self.page_size = page_size
+        self.search_args = search_args
+        self.buffer: Deque[Dict] = deque()
+        self.total = 0
+        self.next_page = 0
+        self.requests = 0
+        self.exhausted = False
+
+    async def fill(self) -> None:
+        """Fetch the next page into the buffer"""
+        result = await self.client.search_records(
+            record_type=self.record_type,
+            page_size=self.page_size,
+            page=self.next_page,
+            **self.search_args
+        )
+        self.requests += 1
+        self.total = result.get("total", 0)
+        records = result.get("records", [])
+        self.buffer.extend(records)
+        self.next_page += 1
+        if len(records) < self.page_size or self.next_page * self.page_size >= self.total:
+            self.exhausted = True
+
+
+async def search_record_types(
+    client: IroncladClient,
+    record_types: List[Optional[str]],
+    sort_by: str = "name",
+    descending: bool = False,
+    page: int = 0,
+    page_size: int = 20,
+    query: Optional[str] = None,
+    counterparty: Optional[str] = None,
+    filter_expr: Optional[FilterExpression] = None
+) -> Dict:
+    """
+    Search several record types concurrently and merge them into one sorted listing
+
+    Args:
+        client: Ironclad client
+        record_types: Record types to search (duplicates ignored; None = all types)
+        sort_by: Attribute or property key to order by (e.g. 'name', 'lastUpdated')
+        descending: Sort from highest to lowest
+        page: Page of the merged listing (0-indexed)
+        page_size: Records per merged page
+        query: Name keyword filter
+        counterparty: Counterparty name filter
+        filter_expr: Structured filter applied to every type
+
+    Returns:
+        Dict with 'total' (all types), 'totals' (per type), 'records' (the
+        requested page) and 'requests' (API requests made)
+    """
+    record_types = list(dict.fromkeys(record_types))
+    wanted = (page + 1) * page_size
+    search_args = {
+        "query": query,
+        "counterparty": counterparty,
+        "filter_expr": filter_expr,
+        "sort_field": sort_by,
+        "sort_direction": "DESC" if descending else "ASC",
+    }
+    streams = [
+        _TypeStream(client, record_type, min(MAX_PAGE_SIZE, wanted), search_args)
+        for record_type in record_types
+    ]
+    await asyncio.gather(*(stream.fill() for stream in streams))
+
+    # Heap of (sort key, stream index, record); the index breaks ties stably
+    heap: List[Tuple[_SortKey, int, Dict]] = []
+    for index, stream in enumerate(streams):
+        if stream.buffer:
+            record = stream.buffer.popleft()
+            heap.append((_SortKey(record_sort_value(record, sort_by), descending), index, record))
+    heapq.heapify(heap)
+
+    merged: List[Dict] = []
+    while heap and len(merged) < wanted:
+        _, index, record = heapq.heappop(heap)
+        merged.append(record)
+        stream = streams[index]
+        if not stream.buffer and not stream.exhausted:
+            await stream.fill()
+        if stream.buffer:
+            record = stream.buffer.popleft()
+            heapq.heappush(heap, (_SortKey(record_sort_value(record, sort_by), descending), index, record))
+
+    totals = {stream.record_type or "all types": stream.total for stream in streams}
+    requests = sum(stream.requests for stream in streams)
+    logger.info(f"Merged {len(record_types)} record types by {sort_by}: {requests} requests, totals {totals}")
+    return {
+        "total": sum(totals.values()),
+        "totals": totals,
+        "records": merged[page * page_size:wanted],
+        "requests": requests,
+    }
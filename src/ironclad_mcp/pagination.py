@@ -0,0 +1,217 @@
+"""
+Opaque cursor pagination with read-ahead
+
+Search tools return a continuation token instead of asking the caller to
+repeat their arguments with a page number. The token carries the original
+arguments, the next page position and a snapshot marker (the match count and
+time of the first page), and is signed so it cannot be edited or replayed by
+another user. When a page is returned, the next one is fetched in the
+background, so paging through a large result set costs one round trip of
+latency per page at most.
+
+Configured through the environment:
+- IRONCLAD_CURSOR_SECRET: signing key (set it when several replicas share
+  clients; otherwise a random key per process is used)
+- IRONCLAD_CURSOR_TTL_SECONDS: how long a cursor stays valid (default 3600)
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from . import tracing
+from .metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+CURSOR_TTL_SECONDS = int(os.getenv("IRONCLAD_CURSOR_TTL_SECONDS", "3600"))
+# Snapshot total of a search that only knows a lower bound (no change check)
+UNKNOWN_TOTAL = -1
+_SECRET = os.getenv("IRONCLAD_CURSOR_SECRET", "").encode() or secrets.token_bytes(32)
+
+
+@dataclass
+class Cursor:
+    """Decoded continuation token"""
+
+    tool: str
+    arguments: Dict[str, Any]
+    page: int
+    # Match count when the first page was served, and when that was
+    snapshot_total: int
+    snapshot_at: float
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(payload: bytes, user_email: Optional[str]) -> bytes:
+    message = (user_email or "").encode() + b"\0" + payload
+    return hmac.new(_SECRET, message, hashlib.sha256).digest()[:16]
+
+
+def encode_cursor(cursor: Cursor, user_email: Optional[str]) -> str:
+    """
+    Serialize and sign a cursor for the given user
+
+    Returns:
+        URL-safe token
+    """
+    payload = json.dumps({
+        "t": cursor.tool,
+        "a": cursor.arguments,
+        "p": cursor.page,
+        "n": cursor.snapshot_total,
+        "s": round(cursor.snapshot_at, 3),
+    }, separators=(",", ":"), sort_keys=True).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_signature(payload, user_email))}"
+
+
+def decode_cursor(token: str, tool: str, user_email: Optional[str]) -> Cursor:
+    """
+    Verify and decode a token returned by encode_cursor
+
+    Args:
+        token: Continuation token
+        tool: Tool the token is being passed to
+        user_email: User the token must have been issued to
+
+    Raises:
+        ValueError: If the token is malformed, tampered with, issued for another
+            tool or user, or expired
+    """
+    invalid = "Invalid cursor. Run the search again without a cursor to start over."
+    try:
+        encoded_payload, encoded_signature = token.strip().split(".")
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except (ValueError, AttributeError):
+        raise ValueError(invalid)
+    if not hmac.compare_digest(signature, _signature(payload, user_email)):
+        raise ValueError(invalid)
+
+    data = json.loads(payload)
+    if data["t"] != tool:
+        raise ValueError(f"This cursor belongs to {data['t']}, not {tool}.")
+    if time.time() - data["s"] > CURSOR_TTL_SECONDS:
+        raise ValueError("This cursor has expired. Run the search again without a cursor to start over.")
+    return Cursor(
+        tool=data["t"],
+        arguments=data["a"],
+        page=data["p"],
+        snapshot_total=data["n"],
+        snapshot_at=data["s"],
+    )
+
+
+def snapshot_note(cursor: Optional[Cursor], total: int) -> str:
+    """Warning to show when the result set changed since the first page, else ''"""
+    if cursor is None or cursor.snapshot_total == total or UNKNOWN_TOTAL in (cursor.snapshot_total, total):
+        return ""
+    delta = total - cursor.snapshot_total
+    change = f"{delta:,} added" if delta > 0 else f"{-delta:,} removed"
+    return (
+        f"⚠️ Matches changed since the first page ({cursor.snapshot_total:,} → {total:,}, {change}), "
+        "so some results may be repeated or skipped.\n\n"
+    )
+
+
+class PagePrefetcher:
+    """
+    Background fetches of the page a cursor points to
+
+    Entries are keyed by (user, token) and dropped after `ttl_seconds` or
+    when more than `max_entries` are pending, oldest first. Prefetches of a
+    session whose connection closed are cancelled (see cancel_session).
+    """
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: float = 120.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._pending: "OrderedDict[Tuple[Optional[str], str], Tuple[float, asyncio.Task]]" = OrderedDict()
+        # MCP session that scheduled each entry
+        self._sessions: Dict[Tuple[Optional[str], str], Any] = {}
+
+    def schedule(
+        self,
+        user_email: Optional[str],
+        token: str,
+        fetch: Callable[[], Awaitable[Any]],
+        session: Any = None
+    ) -> None:
+        """
+        Start fetching the page behind `token` (the task inherits the request context)
+
+        Args:
+            user_email: User the cursor was issued to
+            token: The cursor
+            fetch: Fetches the page
+            session: MCP session the prefetch belongs to (see cancel_session)
+        """
+        key = (user_email, token)
+        if key in self._pending:
+            return
+
+        async def run():
+            with tracing.span("prefetch page"):
+                return await fetch()
+
+        task = asyncio.create_task(run())
+        # Retrieve the exception so an unused failed prefetch is not reported
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._pending[key] = (time.monotonic(), task)
+        self._sessions[key] = session
+        while len(self._pending) > self.max_entries:
+            stale_key, (_, stale) = self._pending.popitem(last=False)
+            self._sessions.pop(stale_key, None)
+            stale.cancel()
+
+    def cancel_session(self, session: Any) -> int:
+        """
+        Cancel the prefetches of an MCP session that has ended
+
+        Returns:
+            Number of prefetches cancelled
+        """
+        keys = [key for key, owner in self._sessions.items() if owner == session]
+        for key in keys:
+            del self._sessions[key]
+            _, task = self._pending.pop(key)
+            task.cancel()
+        if keys:
+            logger.info(f"Cancelled {len(keys)} page prefetch(es) of a closed session")
+        return len(keys)
+
+    async def take(self, user_email: Optional[str], token: str) -> Optional[Any]:
+        """
+        Result of a prefetch of `token`, waiting for it if it is still running
+
+        Returns:
+            The prefetched result, or None if there is none (or it failed)
+        """
+        entry = self._pending.pop((user_email, token), None)
+        self._sessions.pop((user_email, token), None)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+            entry[1].cancel()
+            entry = None
+        record_cache_lookup("page_prefetch", entry is not None)
+        if entry is None:
+            return None
+        try:
+            return await entry[1]
+        except Exception as e:
+            logger.info(f"Prefetch failed, fetching the page again: {e}")
+            return None
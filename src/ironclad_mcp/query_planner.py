@@ -0,0 +1,383 @@
+"""
+Cost-based planning for contract searches and counts
+
+The Records API filters on type, name and counterparty, but not on dates, so
+the cost of a query depends entirely on its filters: one request without a
+date filter, a full scan of every matching record with one. The planner sits
+between the tools and IroncladClient and picks the cheapest way to answer:
+
+- server_filter: no date filter, one API request answers it
+- local_index: the record summary index holds a fresh, complete scan of the type
+- parallel_scan: a cheap count probe (pageSize=1) shows the scan is affordable,
+  so it is paged through newest first with several requests in flight,
+  stopping once it has enough matches or has passed the date range
+- refuse: the scan would be too large; the caller is told how to narrow it
+- multi_type_merge: several record types are queried concurrently and merged
+  in sort order (see multi_search)
+
+Configured through the environment:
+- IRONCLAD_PLANNER_MAX_SCAN_RECORDS: largest scan run automatically (default 10000)
+- IRONCLAD_SCAN_CONCURRENCY: pages requested at once by a scan (default 4)
+"""
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from . import tracing
+from .date_utils import DateParser
+from .ironclad_client import FilterExpression, IroncladClient, ScanStats
+from .metrics import QUERY_PLANS, record_cache_lookup
+from .multi_search import search_record_types
+from .record_index import RecordSummaryIndex, summarize_record
+
+logger = logging.getLogger(__name__)
+
+MAX_SCAN_RECORDS = int(os.getenv("IRONCLAD_PLANNER_MAX_SCAN_RECORDS", "10000"))
+SCAN_CONCURRENCY = int(os.getenv("IRONCLAD_SCAN_CONCURRENCY", "4"))
+PAGE_SIZE = 100
+
+SERVER_FILTER = "server_filter"
+LOCAL_INDEX = "local_index"
+PARALLEL_SCAN = "parallel_scan"
+REFUSE = "refuse"
+MULTI_TYPE = "multi_type_merge"
+
+# ScanStats.stop_reason -> wording in plan descriptions
+_STOP_REASONS = {
+    "limit": "enough matches for the page",
+    "past date range": "passed the date range",
+    "timeout": "timed out",
+    "deadline": "time budget spent",
+    "quota": "request quota used up",
+}
+
+
+@dataclass
+class QueryPlan:
+    """How a query will be answered and what it is expected to cost"""
+
+    strategy: str
+    reason: str
+    # Records the server-side filters match (None if not probed)
+    estimate: Optional[int] = None
+    # API requests the plan needs (0 for local_index)
+    requests: int = 0
+    concurrency: int = 1
+    suggestions: List[str] = field(default_factory=list)
+    # Pages a scan actually read, and why it stopped before the last one
+    pages_read: Optional[int] = None
+    stop_reason: Optional[str] = None
+
+    def describe(self) -> str:
+        """One-line summary for tool responses"""
+        text = f"_Plan: {self.strategy}"
+        if self.estimate is not None:
+            text += f" — {self.estimate:,} records matched server-side"
+        if self.strategy == PARALLEL_SCAN:
+            text += f", {self.requests:,} pages at {self.concurrency} concurrent requests"
+            if self.stop_reason and self.pages_read is not None:
+                text += f", stopped after {self.pages_read:,}: {_STOP_REASONS.get(self.stop_reason, self.stop_reason)}"
+        elif self.strategy != REFUSE:
+            text += f", {self.requests} API request(s)"
+        return text + f" ({self.reason})_"
+
+
+@dataclass
+class QueryResult:
+    """Outcome of an executed plan"""
+
+    plan: QueryPlan
+    # Number of matching records (exact for every strategy but refuse)
+    total: int = 0
+    # Record summaries (see record_index.summarize_record), at most `limit`
+    records: List[Dict] = field(default_factory=list)
+    # False if a scan stopped early (e.g. timeout), so the total is a lower bound
+    complete: bool = True
+    # False if a scan stopped once it had enough matches for the page, so the
+    # total is only a lower bound (the page itself is complete)
+    total_exact: bool = True
+    # Matches per record type (multi_type_merge only)
+    totals: Dict[str, int] = field(default_factory=dict)
+
+
+class QueryPlanner:
+    """Chooses and runs the cheapest strategy for a search or count"""
+
+    def __init__(
+        self,
+        client: IroncladClient,
+        record_index: RecordSummaryIndex,
+        index_ttl_seconds: int,
+        max_scan_records: int = MAX_SCAN_RECORDS,
+        scan_concurrency: int = SCAN_CONCURRENCY
+    ):
+        self.client = client
+        self.record_index = record_index
+        self.index_ttl_seconds = index_ttl_seconds
+        self.max_scan_records = max_scan_records
+        self.scan_concurrency = max(1, scan_concurrency)
+
+    async def plan(
+        self,
+        record_type: Optional[str] = None,
+        query: Optional[str] = None,
+        counterparty: Optional[str] = None,
+        date_field: Optional[str] = None,
+        has_date_range: bool = False,
+        filter_expr: Optional[FilterExpression] = None
+    ) -> QueryPlan:
+        """
+        Pick a strategy for the given filters
+
+        Args:
+            record_type: Record type filter
+            query: Name keyword filter
+            counterparty: Counterparty name filter
+            date_field: Date property to filter on client-side
+            has_date_range: Whether a date_from/date_to was given
+            filter_expr: Structured server-side filter
+
+        Returns:
+            The chosen QueryPlan
+        """
+        if not (date_field and has_date_range):
+            return QueryPlan(SERVER_FILTER, "no date filter, the API filters everything", requests=1)
+
+        # The index keeps summaries only, so it cannot evaluate structured filters
+        if filter_expr is None:
+            indexed = self.record_index.is_type_indexed(record_type, self.index_ttl_seconds)
+            record_cache_lookup("record_summary", indexed)
+            if indexed:
+                return QueryPlan(LOCAL_INDEX, "type was fully scanned recently")
+
+        # Cost probe: one record per page is enough to learn the match count
+        estimate = await self.client.count_records(
+            query=query,
+            record_type=record_type,
+            counterparty=counterparty,
+            filter_expr=filter_expr
+        )
+        pages = (estimate + PAGE_SIZE - 1) // PAGE_SIZE
+        if estimate == 0:
+            return QueryPlan(SERVER_FILTER, "nothing matches the other filters", estimate=0, requests=1)
+        if estimate > self.max_scan_records:
+            return QueryPlan(
+                REFUSE,
+                f"date filtering needs a scan of more than {self.max_scan_records:,} records",
+                estimate=estimate,
+                requests=1,
+                suggestions=self._narrowing_suggestions(record_type, query, counterparty)
+            )
+        return QueryPlan(
+            PARALLEL_SCAN,
+            "dates can only be filtered client-side",
+            estimate=estimate,
+            requests=pages,
+            concurrency=min(self.scan_concurrency, max(1, pages - 1))
+        )
+
+    def _narrowing_suggestions(
+        self,
+        record_type: Optional[str],
+        query: Optional[str],
+        counterparty: Optional[str]
+    ) -> List[str]:
+        suggestions = []
+        if not record_type:
+            suggestions.append("add a record_type (e.g. 'procurementAgreement')")
+        if not counterparty:
+            suggestions.append("add a counterparty")
+        if not query:
+            suggestions.append("add keywords from the contract name as query")
+        suggestions.append(
+            f"or ask an administrator to raise IRONCLAD_PLANNER_MAX_SCAN_RECORDS (currently {self.max_scan_records:,})"
+        )
+        return suggestions
+
+    async def run(
+        self,
+        record_type: Optional[str] = None,
+        query: Optional[str] = None,
+        counterparty: Optional[str] = None,
+        date_field: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: int = 20,
+        filter_expr: Optional[FilterExpression] = None,
+        page: int = 0
+    ) -> QueryResult:
+        """
+        Plan and execute a search
+
+        Args:
+            record_type: Record type filter
+            query: Name keyword filter
+            counterparty: Counterparty name filter
+            date_field: Date property to filter on (e.g. 'effectiveDate')
+            date_from: Start date (YYYY-MM-DD)
+            date_to: End date (YYYY-MM-DD)
+            limit: Maximum number of records to return (0 for a count)
+            filter_expr: Structured server-side filter, ANDed with the others
+            page: Page of `limit` records to return (0-indexed)
+
+        Returns:
+            QueryResult with the plan, the total and up to `limit` summaries
+        """
+        try:
+            range_from, range_to = DateParser.parse_date_range(date_from, date_to)
+        except ValueError as e:
+            raise ValueError(f"Date parsing error: {e}")
+        has_date_range = bool(range_from or range_to)
+
+        with tracing.span("plan query") as plan_span:
+            plan = await self.plan(record_type, query, counterparty, date_field, has_date_range, filter_expr)
+            plan_span.set_attribute("plan.strategy", plan.strategy)
+            if plan.estimate is not None:
+                plan_span.set_attribute("plan.estimate", plan.estimate)
+        QUERY_PLANS.inc(strategy=plan.strategy)
+        logger.info(f"Query plan: {plan.strategy} ({plan.reason}), estimate={plan.estimate}")
+
+        if plan.strategy == REFUSE:
+            return QueryResult(plan=plan, total=plan.estimate or 0)
+
+        if plan.strategy == SERVER_FILTER:
+            if plan.estimate == 0:
+                return QueryResult(plan=plan)
+            if limit <= PAGE_SIZE:
+                result = await self.client.search_records(
+                    query=query,
+                    record_type=record_type,
+                    counterparty=counterparty,
+                    page_size=max(1, limit),
+                    page=page,
+                    filter_expr=filter_expr
+                )
+                records = [summarize_record(record) for record in result.get("records", [])]
+                return QueryResult(plan=plan, total=result.get("total", 0), records=records[:limit])
+
+            # The API caps pages at PAGE_SIZE, so a larger page is assembled
+            # from the full-size API pages that cover its slice of the results
+            start = page * limit
+            api_page = start // PAGE_SIZE
+            records = []
+            total = 0
+            while True:
+                result = await self.client.search_records(
+                    query=query,
+                    record_type=record_type,
+                    counterparty=counterparty,
+                    page_size=PAGE_SIZE,
+                    page=api_page,
+                    filter_expr=filter_expr
+                )
+                total = result.get("total", 0)
+                batch = result.get("records", [])
+                records.extend(batch)
+                api_page += 1
+                if len(batch) < PAGE_SIZE or api_page * PAGE_SIZE >= min(start + limit, total):
+                    break
+            offset = start % PAGE_SIZE
+            records = [summarize_record(record) for record in records[offset:offset + limit]]
+            return QueryResult(plan=plan, total=total, records=records)
+
+        complete = total_exact = True
+        if plan.strategy == LOCAL_INDEX:
+            matches = self.record_index.search(
+                record_type=record_type,
+                query=query,
+                counterparty=counterparty,
+                date_field=date_field,
+                date_from=range_from,
+                date_to=range_to
+            )
+        else:
+            # Scan newest first, so the scan can stop once it has this page plus
+            # one more match, or once it is past the start of the range
+            stats = ScanStats()
+            records = await self.client.fetch_all_records(
+                record_type=record_type,
+                query=query,
+                counterparty=counterparty,
+                date_field=date_field,
+                date_from=date_from,
+                date_to=date_to,
+                concurrency=plan.concurrency,
+                filter_expr=filter_expr,
+                limit=(page + 1) * limit + 1 if limit else None,
+                date_order="DESC",
+                stats=stats
+            )
+            plan.pages_read = stats.pages
+            plan.stop_reason = stats.stop_reason
+            complete = stats.complete
+            total_exact = stats.stop_reason != "limit"
+            # Summaries only keep date-typed properties, and the sort below needs the date
+            matches = [summary for summary in map(summarize_record, records) if date_field in summary["dates"]]
+
+        # Strategies see records in different orders; list the most recent dates first
+        matches.sort(key=lambda summary: summary["dates"][date_field], reverse=True)
+        start = page * limit
+        return QueryResult(
+            plan=plan,
+            total=len(matches),
+            records=matches[start:start + limit],
+            complete=complete,
+            total_exact=total_exact
+        )
+
+    async def run_sorted(
+        self,
+        record_types: List[Optional[str]],
+        query: Optional[str] = None,
+        counterparty: Optional[str] = None,
+        sort_by: str = "name",
+        descending: bool = False,
+        page: int = 0,
+        limit: int = 20,
+        filter_expr: Optional[FilterExpression] = None
+    ) -> QueryResult:
+        """
+        Run a sorted, paginated search over one or more record types
+
+        Date filters are not supported here: they need a scan per type.
+
+        Args:
+            record_types: Record types to search (None = all types)
+            query: Name keyword filter
+            counterparty: Counterparty name filter
+            sort_by: Attribute or property key to order by
+            descending: Sort from highest to lowest
+            page: Page of the merged listing (0-indexed)
+            limit: Records per page
+            filter_expr: Structured server-side filter
+
+        Returns:
+            QueryResult with the requested page and per-type totals
+        """
+        result = await search_record_types(
+            self.client,
+            record_types,
+            sort_by=sort_by,
+            descending=descending,
+            page=page,
+            page_size=limit,
+            query=query,
+            counterparty=counterparty,
+            filter_expr=filter_expr
+        )
+        plan = QueryPlan(
+            MULTI_TYPE,
+            f"{len(result['totals'])} record type(s) queried concurrently, merged by {sort_by} "
+            f"{'descending' if descending else 'ascending'}",
+            estimate=result["total"],
+            requests=result["requests"],
+            concurrency=len(result["totals"])
+        )
+        QUERY_PLANS.inc(strategy=plan.strategy)
+        return QueryResult(
+            plan=plan,
+            total=result["total"],
+            records=[summarize_record(record) for record in result["records"]],
+            totals=result["totals"]
+        )
@@ -0,0 +1,134 @@
+"""
+Local index of record summaries for date-filtered searches
+
+The Records API cannot filter on dates, so a date-filtered search or count
+means paging through every record of the type. Every scan already pulls those
+pages, so this index keeps a small summary of each record (name, type,
+counterparty and its date-typed properties) and answers later date-filtered
+queries for a fully scanned type without touching the API.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .date_utils import DateParser
+from .scan_index import ScanIndex
+
+logger = logging.getLogger(__name__)
+
+
+def summarize_record(record: Dict) -> Dict:
+    """
+    Reduce a record to the fields search results show and filter on
+
+    Args:
+        record: Record as returned by the Records API
+
+    Returns:
+        Summary dict with id, ironcladId, name, type, counterparty and
+        dates (date property name -> timezone-aware datetime)
+    """
+    props = record.get("properties", {})
+    counterparty = props.get("counterpartyName", {})
+    dates: Dict[str, datetime] = {}
+    for key, prop in props.items():
+        if not isinstance(prop, dict) or prop.get("type") != "date" or not prop.get("value"):
+            continue
+        try:
+            dates[key] = DateParser.parse_date(prop["value"])
+        except (TypeError, ValueError):
+            continue
+    return {
+        "id": record.get("id"),
+        "ironcladId": record.get("ironcladId"),
+        "name": record.get("name"),
+        "type": record.get("type"),
+        "counterparty": counterparty.get("value") if isinstance(counterparty, dict) else None,
+        "dates": dates,
+    }
+
+
+def in_date_range(
+    summary: Dict,
+    date_field: str,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime]
+) -> bool:
+    """Check whether a summary's date property falls within [date_from, date_to]"""
+    value = summary["dates"].get(date_field)
+    if value is None:
+        return False
+    if date_from and value < date_from:
+        return False
+    if date_to and value > date_to:
+        return False
+    return True
+
+
+class RecordSummaryIndex(ScanIndex):
+    """Record summaries keyed by record ID, filled in by scans"""
+
+    def __init__(self):
+        super().__init__()
+        # Record ID -> summary
+        self._summaries: Dict[str, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def add_records(self, records: List[Dict]) -> None:
+        """
+        Add or refresh records in the index
+
+        Args:
+            records: Records as returned by the Records API
+        """
+        for record in records:
+            if record.get("id"):
+                self._summaries[record["id"]] = summarize_record(record)
+
+    def on_scan_page(self, records: List[Dict]) -> None:
+        self.add_records(records)
+
+    def search(
+        self,
+        record_type: Optional[str] = None,
+        query: Optional[str] = None,
+        counterparty: Optional[str] = None,
+        date_field: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> List[Dict]:
+        """
+        Summaries matching the same filters the Records API would apply
+
+        Name and counterparty matching is a case-insensitive substring match,
+        like the API's Contains(). Only meaningful for record types that
+        is_type_indexed() reports as covered.
+
+        Args:
+            record_type: Record type to restrict to
+            query: Text the record name must contain
+            counterparty: Text the counterparty name must contain
+            date_field: Date property to filter on
+            date_from: Start of the date range (inclusive)
+            date_to: End of the date range (inclusive)
+
+        Returns:
+            Matching summaries, in no particular order
+        """
+        query = query.lower() if query else None
+        counterparty = counterparty.lower() if counterparty else None
+
+        matches = []
+        for summary in self._summaries.values():
+            if record_type and summary["type"] != record_type:
+                continue
+            if query and query not in (summary["name"] or "").lower():
+                continue
+            if counterparty and counterparty not in (summary["counterparty"] or "").lower():
+                continue
+            if date_field and not in_date_range(summary, date_field, date_from, date_to):
+                continue
+            matches.append(summary)
+        return matches
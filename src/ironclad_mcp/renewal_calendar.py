@@ -0,0 +1,228 @@
+"""
+Precomputed renewal and expiration calendar
+
+Renewal questions depend on agreementEndDate_*, agreementRenewalDate,
+initialTermMonths_*, renewalTerm_* and the notice-for-non-renewal fields.
+This index computes each contract's current term end, next renewal and
+notice deadline once when a scan delivers the record, and keeps the results
+sorted by date so "what expires in the next 90 days" is a bisect slice.
+"""
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from .date_utils import DateParser
+from .scan_index import ScanIndex
+
+logger = logging.getLogger(__name__)
+
+EFFECTIVE_DATE_FIELD = "effectiveDate"
+RENEWAL_DATE_FIELD = "agreementRenewalDate"
+END_DATE_PREFIX = "agreementEndDate"
+INITIAL_TERM_PREFIX = "initialTermMonths"
+RENEWAL_TERM_PREFIX = "renewalTerm"
+# Procurement/partnership notice field, then the Revenue customer notice field
+NOTICE_PREFIXES = (
+    "noticeForNonRenewal",
+    "custom1d18db5e359541688df8a459b2555b6e",
+)
+
+# Calendar event -> entry field holding its date
+EVENTS = {
+    "expiration": "term_end",
+    "renewal": "next_renewal",
+    "notice_deadline": "notice_deadline",
+}
+
+# Guard against bad data (e.g. a 0.01 month renewal term) when rolling terms forward
+MAX_RENEWAL_ROLLS = 1200
+
+
+def _prop_value(props: Dict, key: str):
+    prop = props.get(key)
+    if isinstance(prop, dict):
+        return prop.get("value")
+    return None
+
+
+def _prefixed_value(props: Dict, prefix: str):
+    """Value of the first non-empty property whose key starts with prefix"""
+    if prefix in props:
+        value = _prop_value(props, prefix)
+        if value not in (None, ""):
+            return value
+    for key in props:
+        if key.startswith(prefix):
+            value = _prop_value(props, key)
+            if value not in (None, ""):
+                return value
+    return None
+
+
+def _as_date(value) -> Optional[date]:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = DateParser.parse_date(value)
+    except ValueError:
+        return None
+    return parsed.date() if parsed else None
+
+
+def _as_number(value) -> Optional[float]:
+    if isinstance(value, bool) or value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_calendar_entry(record: Dict, as_of: date) -> Optional[Dict]:
+    """
+    Compute the renewal calendar dates for one record
+
+    Args:
+        record: Record as returned by the Records API
+        as_of: Date the "next" renewal is computed relative to
+
+    Returns:
+        Calendar entry dict, or None if the record has no usable term dates
+    """
+    props = record.get("properties", {})
+
+    effective = _as_date(_prop_value(props, EFFECTIVE_DATE_FIELD))
+    end = _as_date(_prefixed_value(props, END_DATE_PREFIX))
+    renewal_date = _as_date(_prop_value(props, RENEWAL_DATE_FIELD))
+    initial_term = _as_number(_prefixed_value(props, INITIAL_TERM_PREFIX))
+    renewal_term = _as_number(_prefixed_value(props, RENEWAL_TERM_PREFIX))
+    notice_days = None
+    for prefix in NOTICE_PREFIXES:
+        notice_days = _as_number(_prefixed_value(props, prefix))
+        if notice_days is not None:
+            break
+
+    # Derive the end of the initial term when no explicit end date is recorded
+    term_end = end
+    if term_end is None and effective and initial_term:
+        term_end = DateParser.add_months(effective, int(initial_term))
+
+    renews = bool(renewal_term and renewal_term >= 1)
+    if term_end and renews:
+        # Auto-renewing: roll the term forward to the current one
+        rolls = 0
+        while term_end < as_of and rolls < MAX_RENEWAL_ROLLS:
+            term_end = DateParser.add_months(term_end, int(renewal_term))
+            rolls += 1
+
+    if renewal_date and renewal_date >= as_of:
+        next_renewal = renewal_date
+    elif renews:
+        next_renewal = term_end
+    else:
+        next_renewal = None
+
+    notice_deadline = None
+    notice_base = next_renewal or term_end
+    if notice_base and notice_days:
+        notice_deadline = notice_base - timedelta(days=int(notice_days))
+
+    if not (term_end or next_renewal):
+        return None
+
+    counterparty = props.get("counterpartyName", {})
+    return {
+        "id": record.get("id"),
+        "ironcladId": record.get("ironcladId"),
+        "name": record.get("name"),
+        "type": record.get("type"),
+        "counterparty": counterparty.get("value") if isinstance(counterparty, dict) else None,
+        "renews": renews,
+        "renewal_term_months": int(renewal_term) if renews else None,
+        "notice_days": int(notice_days) if notice_days else None,
+        "term_end": term_end,
+        "next_renewal": next_renewal,
+        "notice_deadline": notice_deadline,
+    }
+
+
+class RenewalCalendarIndex(ScanIndex):
+    """Date-sorted calendar of contract expirations, renewals and notice deadlines"""
+
+    def __init__(self):
+        super().__init__()
+        # Record ID -> calendar entry
+        self._entries: Dict[str, Dict] = {}
+        # Event -> sorted list of (date, record ID); rebuilt lazily after changes
+        self._calendar: Dict[str, List[Tuple[date, str]]] = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_records(self, records: List[Dict]) -> None:
+        """
+        Compute and store calendar entries for records
+
+        Args:
+            records: Records as returned by the Records API
+        """
+        as_of = datetime.now(timezone.utc).date()
+        for record in records:
+            record_id = record.get("id")
+            if not record_id:
+                continue
+            entry = compute_calendar_entry(record, as_of)
+            if entry is None:
+                self._entries.pop(record_id, None)
+            else:
+                self._entries[record_id] = entry
+            self._dirty = True
+
+    def on_scan_page(self, records: List[Dict]) -> None:
+        self.add_records(records)
+
+    def _sorted(self, event: str) -> List[Tuple[date, str]]:
+        if self._dirty:
+            self._calendar = {
+                name: sorted(
+                    (entry[field], record_id)
+                    for record_id, entry in self._entries.items()
+                    if entry[field] is not None
+                )
+                for name, field in EVENTS.items()
+            }
+            self._dirty = False
+        return self._calendar.get(event, [])
+
+    def upcoming(
+        self,
+        event: str,
+        start: date,
+        end: date,
+        record_type: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Entries whose event date falls within [start, end], earliest first
+
+        Args:
+            event: One of 'expiration', 'renewal', 'notice_deadline'
+            start: First date of the window (inclusive)
+            end: Last date of the window (inclusive)
+            record_type: Optional record type to restrict to
+
+        Returns:
+            List of calendar entry dicts
+        """
+        if event not in EVENTS:
+            raise ValueError(f"Unknown calendar event '{event}'. Use one of: {', '.join(EVENTS)}")
+
+        calendar = self._sorted(event)
+        lo = bisect_left(calendar, (start, ""))
+        hi = bisect_right(calendar, (end, "\uffff"))
+
+        entries = [self._entries[record_id] for _, record_id in calendar[lo:hi]]
+        if record_type:
+            entries = [entry for entry in entries if entry["type"] == record_type]
+        return entries
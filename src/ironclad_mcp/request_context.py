@@ -0,0 +1,41 @@
+"""
+Per-request context shared by the stdio and HTTP transports
+
+The HTTP server serves many users from one process, so the user a tool call
+acts for cannot come from the process environment. It is carried in a
+contextvar instead: set once per SSE connection and inherited by every task
+the MCP session spawns for that connection.
+"""
+import os
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+# Email of the user the current MCP session acts for (X-User-Email over HTTP)
+current_user_email: ContextVar[Optional[str]] = ContextVar("current_user_email", default=None)
+
+# Identifies the MCP session (one SSE connection; None for the stdio server)
+current_session_id: ContextVar[Optional[str]] = ContextVar("current_session_id", default=None)
+
+# Name of the MCP tool being run (for log and trace context)
+current_tool: ContextVar[Optional[str]] = ContextVar("current_tool", default=None)
+
+
+def get_user_email() -> Optional[str]:
+    """
+    Email of the user to impersonate for the current request
+
+    Returns:
+        The session's X-User-Email over HTTP, IRONCLAD_USER_EMAIL over stdio,
+        or None if neither is set
+    """
+    return current_user_email.get() or os.getenv("IRONCLAD_USER_EMAIL")
+
+
+def get_session_key() -> Tuple[Optional[str], str]:
+    """
+    Key for state that belongs to one user's MCP session
+
+    Returns:
+        (user email, session ID), with session ID 'stdio' for the stdio server
+    """
+    return get_user_email(), current_session_id.get() or "stdio"
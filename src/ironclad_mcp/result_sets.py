@@ -0,0 +1,460 @@
+"""
+Session-scoped result sets for follow-up questions
+
+"All procurement agreements" followed by "just the ones over $100k" or "sort
+by end date" used to mean a fresh upstream scan per follow-up. A scan can
+instead be materialized once into a result set identified by a short handle;
+refining, sorting and aggregating it then runs locally with no API calls.
+
+Result sets belong to one user's MCP session and are dropped when the
+session ends, when they expire or when the session holds too many. Large
+sets are spilled to a JSONL file so they don't stay resident in memory.
+Spill files hold contract data, so they are only written to a directory
+owned by and private to the server's user; if the directory belongs to
+someone else, sets stay in memory.
+
+Configured through the environment:
+- IRONCLAD_RESULT_SET_TTL_SECONDS: lifetime since last use (default 1800)
+- IRONCLAD_RESULT_SET_MAX_RECORDS: largest set that can be materialized (default 50000)
+- IRONCLAD_RESULT_SET_MEMORY_RECORDS: sets larger than this are spilled to disk (default 2000)
+- IRONCLAD_RESULT_SET_MAX_PER_SESSION: oldest sets are dropped beyond this (default 20)
+- IRONCLAD_RESULT_SET_DIR: spill directory (default:
+  $XDG_CACHE_HOME/ironclad-mcp/result-sets, i.e. ~/.cache/ironclad-mcp/result-sets)
+"""
+import json
+import logging
+import os
+import secrets
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .date_batch import period_labels
+from .date_utils import DateParser
+
+logger = logging.getLogger(__name__)
+
+RESULT_SET_TTL_SECONDS = int(os.getenv("IRONCLAD_RESULT_SET_TTL_SECONDS", "1800"))
+RESULT_SET_MAX_RECORDS = int(os.getenv("IRONCLAD_RESULT_SET_MAX_RECORDS", "50000"))
+RESULT_SET_MEMORY_RECORDS = int(os.getenv("IRONCLAD_RESULT_SET_MEMORY_RECORDS", "2000"))
+RESULT_SET_MAX_PER_SESSION = int(os.getenv("IRONCLAD_RESULT_SET_MAX_PER_SESSION", "20"))
+RESULT_SET_DIR = Path(os.getenv(
+    "IRONCLAD_RESULT_SET_DIR",
+    os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "ironclad-mcp", "result-sets")
+))
+
+# Record attributes kept next to the flattened properties
+RECORD_ATTRIBUTES = ("id", "ironcladId", "name", "type", "lastUpdated")
+
+AGGREGATE_METRICS = ("count", "sum", "avg", "min", "max")
+
+
+def flatten_record(record: Dict) -> Dict:
+    """
+    Keep a record's attributes and property values, without the type wrappers
+
+    Args:
+        record: Record as returned by the Records API
+
+    Returns:
+        Dict of attributes plus 'properties' (property key -> value)
+    """
+    flat = {key: record.get(key) for key in RECORD_ATTRIBUTES}
+    flat["properties"] = {
+        key: prop.get("value") if isinstance(prop, dict) else prop
+        for key, prop in record.get("properties", {}).items()
+    }
+    return flat
+
+
+def field_value(record: Dict, field: str) -> Any:
+    """
+    Value of an attribute or property of a flattened record
+
+    A property can be named by its full key or by the prefix before its ID
+    suffix (e.g. 'agreementEndDate'); monetary amounts yield their amount.
+    """
+    if field in RECORD_ATTRIBUTES:
+        value = record.get(field)
+    else:
+        props = record["properties"]
+        value = props.get(field)
+        if value is None:
+            value = next((v for key, v in props.items() if key.startswith(field) and v not in (None, "")), None)
+    if isinstance(value, dict):
+        value = value.get("amount")
+    return value
+
+
+def _comparable(value: Any) -> Optional[Tuple]:
+    """Normalize a value so numbers, dates and text each compare among themselves"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, float(value))
+    text = str(value)
+    try:
+        return (1, DateParser.parse_date(text))
+    except ValueError:
+        pass
+    try:
+        return (0, float(text))
+    except ValueError:
+        return (2, text.lower())
+
+
+def _group_members(value: Any) -> List[Any]:
+    """Groups a record falls in for a group_by value: one per member of a list"""
+    values = value if isinstance(value, (list, tuple)) else [value]
+    members = []
+    for member in values:
+        if member in (None, ""):
+            continue
+        if not isinstance(member, (str, int, float, bool)):
+            # Unhashable members (nested lists or objects) group by their JSON
+            member = json.dumps(member, sort_keys=True, default=str)
+        members.append(member)
+    return list(dict.fromkeys(members)) or ["(none)"]
+
+
+# ========== Predicates ==========
+
+def _compare(op: str, actual: Any, expected: Any) -> bool:
+    left, right = _comparable(actual), _comparable(expected)
+    if left is None or right is None or left[0] != right[0]:
+        return False
+    if op == "gt":
+        return left[1] > right[1]
+    if op == "gte":
+        return left[1] >= right[1]
+    if op == "lt":
+        return left[1] < right[1]
+    return left[1] <= right[1]
+
+
+_LEAF_OPERATORS = ("equals", "contains", "in", "gt", "gte", "lt", "lte")
+
+
+def compile_predicate(spec: Any, resolve_field: Callable[[str], str] = lambda field: field) -> Callable[[Dict], bool]:
+    """
+    Build a local predicate from the JSON filter grammar used by the search tools
+
+    Adds the comparison operators gt, gte, lt and lte, which compare numbers,
+    monetary amounts and dates, e.g. {"field": "minimumPlatformFee", "gt": 100000}.
+
+    Raises:
+        ValueError: If the filter is malformed
+    """
+    if not isinstance(spec, dict):
+        raise ValueError(f"Filter must be an object, got {type(spec).__name__}")
+
+    if "field" in spec:
+        operators = [key for key in spec if key in _LEAF_OPERATORS]
+        if len(operators) != 1 or set(spec) - {"field"} - set(_LEAF_OPERATORS):
+            raise ValueError(
+                f"Filter on field needs exactly one of {', '.join(_LEAF_OPERATORS)}; got keys {sorted(spec)}"
+            )
+        field = resolve_field(spec["field"])
+        op = operators[0]
+        expected = spec[op]
+        if op == "equals":
+            target = _comparable(expected)
+            return lambda record: _comparable(field_value(record, field)) == target
+        if op == "contains":
+            needle = str(expected).lower()
+            return lambda record: needle in str(field_value(record, field) or "").lower()
+        if op == "in":
+            if not isinstance(expected, list) or not expected:
+                raise ValueError(f"'in' filter on '{field}' needs a non-empty list of values")
+            allowed = {_comparable(value) for value in expected}
+            return lambda record: _comparable(field_value(record, field)) in allowed
+        return lambda record: _compare(op, field_value(record, field), expected)
+
+    if len(spec) != 1:
+        raise ValueError(f"Filter must have one of 'and', 'or', 'not' or 'field'; got keys {sorted(spec)}")
+    (op, operand), = spec.items()
+    if op == "not":
+        inner = compile_predicate(operand, resolve_field)
+        return lambda record: not inner(record)
+    if op in ("and", "or"):
+        if not isinstance(operand, list) or not operand:
+            raise ValueError(f"'{op}' needs a non-empty list of filters")
+        parts = [compile_predicate(item, resolve_field) for item in operand]
+        if op == "and":
+            return lambda record: all(part(record) for part in parts)
+        return lambda record: any(part(record) for part in parts)
+    raise ValueError(f"Unknown filter operator '{op}'")
+
+
+# ========== Result Sets ==========
+
+class ResultSet:
+    """Flattened records held in memory or in a JSONL spill file"""
+
+    def __init__(
+        self,
+        handle: str,
+        description: str,
+        records: List[Dict],
+        memory_limit: int,
+        spill_dir: Optional[Path] = None
+    ):
+        self.handle = handle
+        self.description = description
+        self.count = len(records)
+        self.created_at = datetime.now()
+        self.last_used = time.monotonic()
+        self._records: Optional[List[Dict]] = records
+        self.path: Optional[Path] = None
+        if self.count > memory_limit and spill_dir is not None:
+            self._spill(records, spill_dir)
+
+    def _spill(self, records: List[Dict], spill_dir: Path) -> None:
+        # mkstemp creates the file readable by this user only
+        fd, path = tempfile.mkstemp(prefix=f"{self.handle}-", suffix=".jsonl", dir=spill_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+        self.path = Path(path)
+        self._records = None
+        logger.info(f"Spilled result set {self.handle} ({self.count} records) to {self.path}")
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def records(self) -> Iterator[Dict]:
+        """Iterate the records in their stored order"""
+        if self._records is not None:
+            yield from self._records
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def discard(self) -> None:
+        if self.path is not None:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+
+class ResultSetStore:
+    """
+    Result sets per (user, session), bounded in lifetime, count and size
+
+    Methods are synchronous and thread-safe; spilled sets do file I/O, so
+    callers on the event loop run them with asyncio.to_thread().
+    """
+
+    def __init__(
+        self,
+        resolve_field: Callable[[str], str] = lambda field: field,
+        ttl_seconds: int = RESULT_SET_TTL_SECONDS,
+        max_records: int = RESULT_SET_MAX_RECORDS,
+        memory_records: int = RESULT_SET_MEMORY_RECORDS,
+        max_per_session: int = RESULT_SET_MAX_PER_SESSION,
+        directory: Path = RESULT_SET_DIR
+    ):
+        self.resolve_field = resolve_field
+        self.directory = Path(directory).expanduser()
+        # Whether the spill directory is known to be private (None = not checked yet)
+        self._directory_ok: Optional[bool] = None
+        self.ttl_seconds = ttl_seconds
+        self.max_records = max_records
+        self.memory_records = memory_records
+        self.max_per_session = max_per_session
+        self._lock = threading.Lock()
+        # (user, session) -> handle -> ResultSet, least recently used first
+        self._sessions: Dict[Tuple, "OrderedDict[str, ResultSet]"] = defaultdict(OrderedDict)
+
+    # ========== Lifecycle ==========
+
+    def _spill_dir(self) -> Optional[Path]:
+        """
+        The spill directory, created or checked to belong to this user; None if unusable
+
+        A directory owned by someone else (or a symlink) keeps every set in
+        memory; one of ours that others can read is made private.
+        """
+        if self._directory_ok is None:
+            try:
+                self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+                info = os.lstat(self.directory)
+                if not stat.S_ISDIR(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()):
+                    logger.error(
+                        f"Result set directory {self.directory} is not a directory owned by this user; "
+                        f"result sets stay in memory"
+                    )
+                    self._directory_ok = False
+                else:
+                    if info.st_mode & 0o077:
+                        os.chmod(self.directory, 0o700)
+                    self._directory_ok = True
+            except OSError as e:
+                logger.error(f"Result set directory {self.directory} is unusable ({e}); result sets stay in memory")
+                self._directory_ok = False
+        return self.directory if self._directory_ok else None
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        for key, sets in list(self._sessions.items()):
+            for handle, result_set in list(sets.items()):
+                if result_set.last_used < cutoff:
+                    del sets[handle]
+                    result_set.discard()
+            if not sets:
+                del self._sessions[key]
+
+    def add(self, session: Tuple, records: List[Dict], description: str) -> ResultSet:
+        """
+        Store flattened records as a new result set
+
+        Raises:
+            ValueError: If there are more records than the size cap
+        """
+        if len(records) > self.max_records:
+            raise ValueError(
+                f"{len(records):,} records exceed the result set limit of {self.max_records:,}. Narrow the search."
+            )
+        spill_dir = self._spill_dir() if len(records) > self.memory_records else None
+        result_set = ResultSet(f"rs-{secrets.token_hex(4)}", description, records, self.memory_records, spill_dir)
+        with self._lock:
+            self._expire()
+            sets = self._sessions[session]
+            sets[result_set.handle] = result_set
+            while len(sets) > self.max_per_session:
+                _, oldest = sets.popitem(last=False)
+                oldest.discard()
+        return result_set
+
+    def get(self, session: Tuple, handle: str) -> ResultSet:
+        """
+        Look up a result set of the session and mark it used
+
+        Raises:
+            ValueError: If the handle is unknown or expired
+        """
+        with self._lock:
+            self._expire()
+            result_set = self._sessions.get(session, {}).get(handle.strip())
+            if result_set is None:
+                raise ValueError(
+                    f"Result set '{handle}' not found. It may have expired; create it again with create_result_set."
+                )
+            result_set.last_used = time.monotonic()
+            self._sessions[session].move_to_end(result_set.handle)
+            return result_set
+
+    def drop_session(self, session: Tuple) -> None:
+        """Discard every result set of a session (e.g. when its connection closes)"""
+        with self._lock:
+            for result_set in self._sessions.pop(session, {}).values():
+                result_set.discard()
+
+    # ========== Operations ==========
+
+    def refine(self, session: Tuple, handle: str, spec: Dict) -> ResultSet:
+        """New result set with the records of `handle` that match the filter"""
+        source = self.get(session, handle)
+        predicate = compile_predicate(spec, self.resolve_field)
+        records = [record for record in source.records() if predicate(record)]
+        return self.add(session, records, f"{source.description}, refined by {json.dumps(spec)}")
+
+    def sort(self, session: Tuple, handle: str, sort_by: str, descending: bool = False) -> ResultSet:
+        """New result set with the records of `handle` ordered by a field (missing values last)"""
+        source = self.get(session, handle)
+        field = self.resolve_field(sort_by)
+        keyed = [(_comparable(field_value(record, field)), record) for record in source.records()]
+        present = [item for item in keyed if item[0] is not None]
+        missing = [record for key, record in keyed if key is None]
+        # Numbers, dates and text never compare with each other: order by kind first
+        present.sort(key=lambda item: (item[0][0], item[0][1]), reverse=descending)
+        records = [record for _, record in present] + missing
+        order = "descending" if descending else "ascending"
+        return self.add(session, records, f"{source.description}, sorted by {sort_by} {order}")
+
+    def aggregate(
+        self,
+        session: Tuple,
+        handle: str,
+        metric: str = "count",
+        field: Optional[str] = None,
+        group_by: Optional[str] = None,
+        period: Optional[str] = None
+    ) -> List[Tuple[Any, float, int]]:
+        """
+        Aggregate a result set, optionally per group
+
+        Args:
+            session: Session key
+            handle: Result set handle
+            metric: One of count, sum, avg, min, max
+            field: Numeric field the metric applies to (not needed for count)
+            group_by: Field to group by (None for one overall row)
+            period: Bucket a date group_by by 'month', 'quarter' or 'year'
+
+        Returns:
+            (group value, metric value, records in group) tuples, largest
+            metric first, or in date order when bucketed by period. A record
+            whose group_by value is a list (e.g. a multi-select property)
+            counts in the group of each member.
+        """
+        if metric not in AGGREGATE_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(AGGREGATE_METRICS)}")
+        if metric != "count" and not field:
+            raise ValueError(f"The '{metric}' metric needs a field")
+
+        source = self.get(session, handle)
+        if period and not group_by:
+            raise ValueError("A period needs group_by set to a date field (e.g. 'effectiveDate')")
+        field = self.resolve_field(field) if field else None
+        group_field = self.resolve_field(group_by) if group_by else None
+
+        records: Iterable[Dict] = source.records()
+        labels: Optional[List[Optional[str]]] = None
+        if period:
+            # Parse and bucket all the dates as one batch
+            records = list(records)
+            labels = period_labels([field_value(record, group_field) for record in records], period)
+
+        # group -> [record count, numeric values]
+        groups: Dict[Any, List] = defaultdict(lambda: [0, []])
+        for index, record in enumerate(records):
+            if labels is not None:
+                group = labels[index]
+            else:
+                group = field_value(record, group_field) if group_field else "all"
+            key = _comparable(field_value(record, field)) if field else None
+            for member in _group_members(group):
+                entry = groups[member]
+                entry[0] += 1
+                if key is not None and key[0] == 0:
+                    entry[1].append(key[1])
+
+        rows = []
+        for group, (count, values) in groups.items():
+            if metric == "count":
+                value = float(count)
+            elif not values:
+                continue
+            elif metric == "sum":
+                value = sum(values)
+            elif metric == "avg":
+                value = sum(values) / len(values)
+            elif metric == "min":
+                value = min(values)
+            else:
+                value = max(values)
+            rows.append((group, value, count))
+        if period:
+            rows.sort(key=lambda row: (row[0] == "(none)", row[0]))
+        else:
+            rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
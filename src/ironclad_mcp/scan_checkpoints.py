@@ -0,0 +1,204 @@
+"""
+Checkpoints for full scans that time out
+
+A full scan (IroncladClient.fetch_all_records) gives up after its timeout
+and returns what it has. Without a checkpoint, asking again starts over from
+page 0 and times out at the same place, so very large scans never finish.
+When a scan times out, its position (the next page to read) and the matches
+collected so far are saved under a fingerprint of the query. The same query
+from the same user then resumes at that page and merges the saved matches, so
+a large scan finishes over several calls.
+
+A checkpoint is discarded when the scan completes, when it expires, or when
+the number of records the query matches upstream has changed since it was
+saved (page boundaries would no longer line up).
+
+Checkpoints hold contract data and decide what a resumed scan returns, so
+they are kept in a directory owned by and private to the server's user,
+in files only that user can read. If the directory belongs to someone else,
+scans are not checkpointed.
+
+Configured through the environment:
+- IRONCLAD_SCAN_CHECKPOINT_DIR: where checkpoints are kept (default:
+  $XDG_CACHE_HOME/ironclad-mcp/scan-checkpoints, i.e. ~/.cache/ironclad-mcp/scan-checkpoints)
+- IRONCLAD_SCAN_CHECKPOINT_TTL_SECONDS: how long a checkpoint can be resumed (default 3600)
+"""
+import hashlib
+import json
+import logging
+import os
+import stat
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCAN_CHECKPOINT_DIR = Path(os.getenv(
+    "IRONCLAD_SCAN_CHECKPOINT_DIR",
+    os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "ironclad-mcp", "scan-checkpoints")
+))
+SCAN_CHECKPOINT_TTL_SECONDS = int(os.getenv("IRONCLAD_SCAN_CHECKPOINT_TTL_SECONDS", "3600"))
+
+
+def scan_fingerprint(user_email: Optional[str], scope: Dict[str, Any]) -> str:
+    """
+    Stable key for a scan: the user plus everything that decides which pages it reads and which records match
+
+    Args:
+        user_email: User the scan runs as
+        scope: JSON-serializable scan parameters (filters, sort, date range)
+
+    Returns:
+        Hex digest
+    """
+    payload = json.dumps({"user": user_email or "", **scope}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _open_private(path: Path):
+    """Open a file for writing, readable and writable by this user only"""
+    return os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w")
+
+
+@dataclass
+class ScanCheckpoint:
+    """Where a timed-out scan stopped and what it had collected"""
+
+    fingerprint: str
+    # Page to read next, and the upstream match count when the scan ran
+    next_page: int
+    total: int
+    # Whether a dated record was seen (see fetch_all_records' undated-tail stop)
+    seen_dated: bool = False
+    matches: List[Dict] = field(default_factory=list)
+    saved_at: float = 0.0
+
+
+class ScanCheckpointStore:
+    """
+    Checkpoints on local disk, one metadata file plus one JSONL file of matches each
+
+    Methods block on file I/O; call them through asyncio.to_thread.
+    """
+
+    def __init__(self, directory: Path = SCAN_CHECKPOINT_DIR, ttl_seconds: int = SCAN_CHECKPOINT_TTL_SECONDS):
+        self.directory = Path(directory).expanduser()
+        self.ttl_seconds = ttl_seconds
+        # Whether the directory is known to be private (None = not checked yet)
+        self._directory_ok: Optional[bool] = None
+
+    def _check_directory(self) -> bool:
+        """
+        Create the directory, or check an existing one belongs to this user
+
+        A directory owned by someone else (or a symlink) disables
+        checkpoints; one of ours that others can read is made private.
+        """
+        if self._directory_ok is None:
+            try:
+                self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+                info = os.lstat(self.directory)
+                if not stat.S_ISDIR(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()):
+                    logger.error(
+                        f"Scan checkpoint directory {self.directory} is not a directory owned by this user; "
+                        f"scan checkpoints disabled"
+                    )
+                    self._directory_ok = False
+                else:
+                    if info.st_mode & 0o077:
+                        os.chmod(self.directory, 0o700)
+                    self._directory_ok = True
+            except OSError as e:
+                logger.error(f"Scan checkpoint directory {self.directory} is unusable ({e}); scan checkpoints disabled")
+                self._directory_ok = False
+        return self._directory_ok
+
+    def _paths(self, fingerprint: str):
+        return self.directory / f"{fingerprint}.json", self.directory / f"{fingerprint}.jsonl"
+
+    def load(self, fingerprint: str) -> Optional[ScanCheckpoint]:
+        """
+        The checkpoint saved under `fingerprint`, if there is an unexpired one
+
+        Returns:
+            ScanCheckpoint, or None
+        """
+        if not self._check_directory():
+            return None
+        meta_path, matches_path = self._paths(fingerprint)
+        try:
+            meta = json.loads(meta_path.read_text())
+            if time.time() - meta["saved_at"] > self.ttl_seconds:
+                self.discard(fingerprint)
+                return None
+            with open(matches_path) as f:
+                matches = [json.loads(line) for line in f]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable scan checkpoint {fingerprint}: {e}")
+            self.discard(fingerprint)
+            return None
+        return ScanCheckpoint(
+            fingerprint=fingerprint,
+            next_page=meta["next_page"],
+            total=meta["total"],
+            seen_dated=meta.get("seen_dated", False),
+            matches=matches,
+            saved_at=meta["saved_at"],
+        )
+
+    def save(self, checkpoint: ScanCheckpoint) -> None:
+        """Write a checkpoint, replacing any earlier one with the same fingerprint"""
+        if not self._check_directory():
+            return
+        self.prune()
+        meta_path, matches_path = self._paths(checkpoint.fingerprint)
+        checkpoint.saved_at = time.time()
+
+        # Matches first, so a metadata file always has its matches beside it
+        partial = matches_path.with_suffix(".jsonl.partial")
+        with _open_private(partial) as f:
+            for record in checkpoint.matches:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(partial, matches_path)
+
+        meta = {
+            "next_page": checkpoint.next_page,
+            "total": checkpoint.total,
+            "seen_dated": checkpoint.seen_dated,
+            "matches": len(checkpoint.matches),
+            "saved_at": checkpoint.saved_at,
+        }
+        partial = meta_path.with_suffix(".json.partial")
+        with _open_private(partial) as f:
+            f.write(json.dumps(meta))
+        os.replace(partial, meta_path)
+        logger.info(
+            f"Saved scan checkpoint {checkpoint.fingerprint}: page {checkpoint.next_page}, "
+            f"{len(checkpoint.matches)} matches"
+        )
+
+    def discard(self, fingerprint: str) -> None:
+        """Delete a checkpoint (no-op if there is none)"""
+        for path in self._paths(fingerprint):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def prune(self) -> None:
+        """Delete expired checkpoints"""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            paths = list(self.directory.glob("*.json"))
+        except OSError:
+            return
+        for meta_path in paths:
+            try:
+                if meta_path.stat().st_mtime < cutoff:
+                    self.discard(meta_path.stem)
+            except OSError:
+                pass
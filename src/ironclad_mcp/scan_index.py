@@ -0,0 +1,49 @@
+"""
+Base class for local indexes fed by full scans
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from .ironclad_client import ScanListener
+
+logger = logging.getLogger(__name__)
+
+# Coverage key used for scans that were not restricted to a record type
+ALL_TYPES = "*"
+
+
+class ScanIndex(ScanListener):
+    """
+    Tracks which record types an index has seen a complete, unfiltered scan of
+
+    Subclasses implement on_scan_page() to absorb records; this class decides
+    when the index can be trusted to answer for a record type without another
+    scan.
+    """
+
+    def __init__(self):
+        # Record type (or ALL_TYPES) -> time of the last complete, unfiltered scan
+        self._indexed_types: Dict[str, datetime] = {}
+
+    def on_scan_complete(self, scope: Dict, complete: bool) -> None:
+        # Only an unfiltered, fully paged scan guarantees nothing is missing
+        unfiltered = not any(scope.get(key) for key in ("query", "counterparty", "status_filter", "filter"))
+        if complete and unfiltered:
+            coverage = scope.get("record_type") or ALL_TYPES
+            self._indexed_types[coverage] = datetime.now()
+            logger.info(f"{type(self).__name__} refreshed for type {coverage}")
+
+    def is_type_indexed(self, record_type: Optional[str], max_age_seconds: int) -> bool:
+        """
+        Check whether a record type has been fully scanned recently enough
+
+        Args:
+            record_type: Record type, or None for all types
+            max_age_seconds: Maximum age of the last complete scan
+        """
+        cutoff = datetime.now() - timedelta(seconds=max_age_seconds)
+        coverage = [self._indexed_types.get(ALL_TYPES)]
+        if record_type:
+            coverage.append(self._indexed_types.get(record_type))
+        return any(indexed_at and indexed_at > cutoff for indexed_at in coverage)
@@ -2,62 +2,181 @@
 Main MCP server for Ironclad integration
 """
 import asyncio
-import os
+import itertools
 import json
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+import httpx
 from mcp.server import Server
 from mcp.types import Tool, TextContent, Resource
-from .ironclad_client import IroncladClient
-from .auth import IroncladOAuthClient
-from .gcp_secrets import GCPSecretProvider
+from . import tracing
+from .circuit_breaker import CircuitOpen, collect_stale_reads
+from .deadlines import TOOL_BUDGET_SECONDS, DeadlineExceeded, deadline_scope
+from .ironclad_client import IroncladClient, ScanStats, parse_filter
+from .export import export_filename, export_records, output_suffix, user_export_path
+from .hierarchy import ContractHierarchyIndex
+from .http_cache import HttpCache
+from .knowledge_base import KnowledgeBaseRegistry
+from .metrics import TOOL_CALLS, TOOL_CANCELLATIONS, TOOL_DURATION, TOOL_ERRORS, record_cache_lookup
+from .pagination import UNKNOWN_TOTAL, Cursor, PagePrefetcher, decode_cursor, encode_cursor, snapshot_note
+from .query_planner import REFUSE, SCAN_CONCURRENCY, QueryPlanner
+from .record_index import RecordSummaryIndex
+from .renewal_calendar import EVENTS, RenewalCalendarIndex
+from .request_context import current_tool, get_session_key, get_user_email
+from .result_sets import ResultSet, ResultSetStore, flatten_record, field_value
+from .scan_checkpoints import ScanCheckpointStore
+from .startup import CredentialPrefetch
+from .upstream_scheduler import BACKGROUND, BROWSE, BULK, INTERACTIVE, upstream_priority
+from .user_quotas import QuotaExceeded
 
+logger = logging.getLogger(__name__)
 
 # Initialize MCP server
 app = Server("ironclad-mcp")
 
-# Global client instance (initialized on first use)
-_ironclad_client = None
-_oauth_client = None
+# Ironclad clients, one per impersonated user (initialized on first use)
+_user_clients: Dict[str, IroncladClient] = {}
+_client_lock = asyncio.Lock()
+
+# Background fetch of OAuth secrets and token (started by the stdio entry point)
+_credential_prefetch: Optional[CredentialPrefetch] = None
 
 # Knowledge base directory
 KNOWLEDGE_BASE_DIR = Path(__file__).parent.parent.parent / "knowledge_base"
 
+# Knowledge base files, loaded once and reloaded when they change on disk
+_knowledge_base = KnowledgeBaseRegistry(KNOWLEDGE_BASE_DIR)
+
+# Local indexes built as a side effect of full scans, kept per user so one
+# user's results never include records only another user can see
+_hierarchy_indexes: Dict[str, ContractHierarchyIndex] = defaultdict(ContractHierarchyIndex)
+_renewal_calendars: Dict[str, RenewalCalendarIndex] = defaultdict(RenewalCalendarIndex)
+_record_indexes: Dict[str, RecordSummaryIndex] = defaultdict(RecordSummaryIndex)
+
+# Positions of timed-out scans, so asking again continues them (keyed per user)
+_scan_checkpoints = ScanCheckpointStore()
+# Single records and workflows already downloaded (keyed per user)
+_http_cache = HttpCache()
+
+# Shared description of the structured `filter` tool argument
+FILTER_DESCRIPTION = (
+    "Structured filter applied server-side, ANDed with the other arguments. "
+    "Leaf: {\"field\": \"<property key>\", \"equals\" | \"contains\": \"<value>\"} or "
+    "{\"field\": \"<property key>\", \"in\": [\"<value>\", ...]}. "
+    "Combine with {\"and\": [...]}, {\"or\": [...]}, {\"not\": {...}}. "
+    "Example - Zoom or Slack contracts: "
+    "{\"or\": [{\"field\": \"counterpartyName\", \"contains\": \"Zoom\"}, "
+    "{\"field\": \"counterpartyName\", \"contains\": \"Slack\"}]}"
+)
+
+# Priority class of each tool's Ironclad requests (see upstream_scheduler);
+# tools not listed browse, and scans always run as bulk or lower
+TOOL_PRIORITIES = {
+    "get_contract_details": INTERACTIVE,
+    "get_contract_attachments": INTERACTIVE,
+    "get_workflow_details": INTERACTIVE,
+    "get_contract_family": INTERACTIVE,
+    "create_result_set": BULK,
+    "export_contracts": BULK,
+}
+
+# Shared description of the `budget_seconds` tool argument (see deadlines)
+BUDGET_DESCRIPTION = (
+    f"Time budget for this call in seconds (default {TOOL_BUDGET_SECONDS:g}). When it runs out, the "
+    "results found so far are returned, marked as partial, with a cursor to continue. "
+    "Use a small budget (e.g. 10) for a quick answer."
+)
+
+def _resolve_field(field: str) -> str:
+    """API field name for a knowledge base field key (e.g. 'renewalTermMonths'), else the field itself"""
+    definition = _knowledge_base.get_field(field)
+    return definition.get("apiField", field) if definition else field
+
+
+# Materialized scans for local follow-up queries, per user session
+_result_sets = ResultSetStore(resolve_field=_resolve_field)
+
+# Next pages fetched ahead of the cursor that will ask for them
+_page_prefetcher = PagePrefetcher()
+
+# How long a fully scanned record type stays fresh in the local indexes
+INDEX_TTL_SECONDS = int(os.getenv("IRONCLAD_INDEX_TTL_SECONDS", "3600"))
+
+# Most tool calls one multi_query can run
+MULTI_QUERY_MAX_QUERIES = int(os.getenv("IRONCLAD_MULTI_QUERY_MAX_QUERIES", "10"))
+
+# Tools multi_query can run: everything but exports, which write files for
+# much longer than a call's budget, and multi_query itself
+MULTI_QUERY_TOOLS = {
+    "search_contracts",
+    "get_contract_details",
+    "get_contract_attachments",
+    "count_contracts",
+    "search_workflows",
+    "get_workflow_details",
+    "get_contract_family",
+    "upcoming_renewals",
+    "create_result_set",
+    "refine_result_set",
+    "sort_result_set",
+    "aggregate_result_set",
+}
+
+
+def set_credential_prefetch(prefetch: CredentialPrefetch) -> None:
+    """Use credentials that are already being fetched in the background"""
+    global _credential_prefetch
+    _credential_prefetch = prefetch
+
 
 async def get_client() -> IroncladClient:
-    """Get or create the Ironclad client"""
-    global _ironclad_client, _oauth_client
+    """Get or create the Ironclad client for the current user"""
+    global _credential_prefetch
     
-    if _ironclad_client is None:
-        # Get OAuth credentials from GCP Secret Manager
-        secret_provider = GCPSecretProvider()
-        creds = secret_provider.get_oauth_credentials()
-        
-        # Initialize OAuth client
-        base_url = os.getenv("IRONCLAD_BASE_URL", "https://na1.ironcladapp.com")
-        _oauth_client = IroncladOAuthClient(
-            base_url=base_url,
-            client_id=creds["client_id"],
-            client_secret=creds["client_secret"]
-        )
-        
-        # Get access token
-        access_token = await _oauth_client.get_access_token()
-        
-        # Get user email for impersonation
-        user_email = os.getenv("IRONCLAD_USER_EMAIL")
-        if not user_email:
-            raise ValueError("IRONCLAD_USER_EMAIL environment variable must be set")
-        
-        # Initialize Ironclad client
-        timeout = int(os.getenv("IRONCLAD_API_TIMEOUT", "120"))
-        _ironclad_client = IroncladClient(
-            base_url=base_url,
-            access_token=access_token,
-            user_email=user_email,
-            timeout=timeout
-        )
+    user_email = get_user_email()
+    if not user_email:
+        raise ValueError("IRONCLAD_USER_EMAIL environment variable must be set")
     
-    return _ironclad_client
+    client = _user_clients.get(user_email)
+    if client is not None:
+        return client
+    
+    async with _client_lock:
+        if user_email not in _user_clients:
+            # Secrets and the OAuth token are fetched off the event loop
+            if _credential_prefetch is None:
+                _credential_prefetch = CredentialPrefetch().start()
+            try:
+                with tracing.span("resolve credentials"):
+                    access_token = await _credential_prefetch.wait_for_token()
+            except Exception:
+                # Start over on the next call instead of replaying the failure
+                _credential_prefetch = None
+                raise
+            
+            # Initialize Ironclad client (impersonating the user)
+            timeout = int(os.getenv("IRONCLAD_API_TIMEOUT", "120"))
+            client = IroncladClient(
+                base_url=_credential_prefetch.base_url,
+                access_token=access_token,
+                user_email=user_email,
+                timeout=timeout,
+                token_provider=_credential_prefetch.get_access_token
+            )
+            client.add_scan_listener(_hierarchy_indexes[user_email])
+            client.add_scan_listener(_renewal_calendars[user_email])
+            client.add_scan_listener(_record_indexes[user_email])
+            client.checkpoints = _scan_checkpoints
+            client.http_cache = _http_cache
+            _user_clients[user_email] = client
+    
+    return _user_clients[user_email]
 
 
 @app.list_tools()
@@ -66,7 +185,7 @@ async def list_tools():
     return [
         Tool(
             name="search_contracts",
-            description="Search for contracts in Ironclad repository by counterparty name, record type, or keywords. Returns instant results.",
+            description="Search for contracts in Ironclad repository by counterparty name, record type, keywords, or a date range. Returns instant results without a date filter; date filters are answered from a local index or a bounded scan, and very broad date-filtered searches are refused with suggestions to narrow them. To search several record types at once (e.g. a whole practice area), pass record_types or practice_area instead of calling this once per type; results are merged into one sorted, paginated listing.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -87,9 +206,57 @@ async def list_tools():
                         "type": "string",
                         "description": "Filter by record type (e.g., 'plusAgreement', 'procurementAgreement', 'nDA', etc.)"
                     },
+                    "record_types": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Search several record types at once (queried concurrently, merged in sort order)"
+                    },
+                    "practice_area": {
+                        "type": "string",
+                        "description": "Search every record type of a practice area: 'Revenue', 'Procurement' or 'Partnerships'"
+                    },
+                    "sort_by": {
+                        "type": "string",
+                        "description": "Sort key for a merged listing: 'name', 'lastUpdated', or a property key (e.g. 'effectiveDate')",
+                        "default": "name"
+                    },
+                    "sort_order": {
+                        "type": "string",
+                        "enum": ["asc", "desc"],
+                        "default": "asc"
+                    },
+                    "page": {
+                        "type": "number",
+                        "description": "Page to start at (0-indexed); each page holds `limit` contracts. Prefer the cursor for the next page.",
+                        "default": 0
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Continuation token from a previous response; returns the next page of that search (other arguments are ignored)"
+                    },
                     "counterparty": {
                         "type": "string",
                         "description": "Filter by counterparty name (e.g., 'Zoom', 'Microsoft'). Supports partial matching."
+                    },
+                    "date_field": {
+                        "type": "string",
+                        "description": "Date property to filter on (e.g., 'effectiveDate'). Requires date_from and/or date_to."
+                    },
+                    "date_from": {
+                        "type": "string",
+                        "description": "Start of the date range (YYYY-MM-DD)"
+                    },
+                    "date_to": {
+                        "type": "string",
+                        "description": "End of the date range (YYYY-MM-DD)"
+                    },
+                    "filter": {
+                        "type": "object",
+                        "description": FILTER_DESCRIPTION
+                    },
+                    "budget_seconds": {
+                        "type": "number",
+                        "description": BUDGET_DESCRIPTION
                     }
                 }
             }
@@ -124,7 +291,7 @@ async def list_tools():
         ),
         Tool(
             name="count_contracts",
-            description="Count contracts matching search criteria. Fast for simple counts. For date-filtered counts (e.g., 'in December 2025'), this will be slower (20-30 seconds) as the API doesn't support date filtering.",
+            description="Count contracts matching search criteria. Fast for simple counts. Date-filtered counts (e.g., 'in December 2025') need a scan the first time a record type is queried, since the API doesn't support date filtering; very broad ones are refused with suggestions to narrow them.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -139,6 +306,30 @@ async def list_tools():
                     "query": {
                         "type": "string",
                         "description": "Search query (keywords)"
+                    },
+                    "date_field": {
+                        "type": "string",
+                        "description": "Date property to filter on (e.g., 'effectiveDate'). Requires date_from and/or date_to."
+                    },
+                    "date_from": {
+                        "type": "string",
+                        "description": "Start of the date range (YYYY-MM-DD)"
+                    },
+                    "date_to": {
+                        "type": "string",
+                        "description": "End of the date range (YYYY-MM-DD)"
+                    },
+                    "filter": {
+                        "type": "object",
+                        "description": FILTER_DESCRIPTION
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Continuation token from a response whose scan ran out of time; continues that scan (other arguments are ignored)"
+                    },
+                    "budget_seconds": {
+                        "type": "number",
+                        "description": BUDGET_DESCRIPTION
                     }
                 }
             }
@@ -169,6 +360,19 @@ async def list_tools():
                     "stage": {
                         "type": "string",
                         "description": "Filter by workflow stage (CAPITALIZED): 'Draft', 'Review' (for approval), 'Sign' (for signature)"
+                    },
+                    "page": {
+                        "type": "number",
+                        "description": "Page to start at (0-indexed); each page holds `limit` workflows. Prefer the cursor for the next page.",
+                        "default": 0
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Continuation token from a previous response; returns the next page of that search (other arguments are ignored)"
+                    },
+                    "filter": {
+                        "type": "object",
+                        "description": FILTER_DESCRIPTION
                     }
                 }
             }
@@ -186,63 +390,591 @@ async def list_tools():
                 },
                 "required": ["workflow_id"]
             }
+        ),
+        Tool(
+            name="get_contract_family",
+            description="Get the full parent/child family tree for a contract (MSA with Order Forms and SOWs, Plus Agreement with Affiliate Agreements, etc.), including grandchildren. Pass any member of the family. The first call builds a local index of every contract's parent (slow, one scan of all record types); later calls are instant.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "record_id": {
+                        "type": "string",
+                        "description": "The Ironclad ID (e.g., 'IC-14349') or UUID of any contract in the family"
+                    }
+                },
+                "required": ["record_id"]
+            }
+        ),
+        Tool(
+            name="upcoming_renewals",
+            description="List contracts expiring, auto-renewing, or hitting their non-renewal notice deadline within the next N days, soonest first. Dates are computed from end date, renewal date, initial term and renewal term fields. The first call for a record type builds a local calendar (slow); later calls are instant.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "days": {
+                        "type": "number",
+                        "description": "Size of the window in days, starting today",
+                        "default": 90
+                    },
+                    "event": {
+                        "type": "string",
+                        "enum": ["expiration", "renewal", "notice_deadline"],
+                        "description": "'expiration' = current term ends, 'renewal' = auto-renews or has a renewal date, 'notice_deadline' = last day to give notice of non-renewal",
+                        "default": "expiration"
+                    },
+                    "record_type": {
+                        "type": "string",
+                        "description": "Filter by record type (e.g., 'procurementAgreement'). Strongly recommended - without it every record is scanned on the first call."
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of contracts to list",
+                        "default": 50
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="create_result_set",
+            description="Scan every contract matching the filters once and keep the results on the server as a result set. Returns a handle (e.g. 'rs-1a2b3c4d') for refine_result_set, sort_result_set and aggregate_result_set, which answer follow-up questions locally without another scan. Use this when you expect follow-ups on a large set (e.g. 'all procurement agreements', then 'just the ones over $100k', then 'sort by end date').",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "record_type": {
+                        "type": "string",
+                        "description": "Filter by record type (e.g., 'procurementAgreement'). Strongly recommended."
+                    },
+                    "counterparty": {
+                        "type": "string",
+                        "description": "Filter by counterparty name"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Search query (keywords in contract name)"
+                    },
+                    "date_field": {
+                        "type": "string",
+                        "description": "Date property to filter on (e.g., 'effectiveDate'). Requires date_from and/or date_to."
+                    },
+                    "date_from": {
+                        "type": "string",
+                        "description": "Start of the date range (YYYY-MM-DD)"
+                    },
+                    "date_to": {
+                        "type": "string",
+                        "description": "End of the date range (YYYY-MM-DD)"
+                    },
+                    "filter": {
+                        "type": "object",
+                        "description": FILTER_DESCRIPTION
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Continuation token from a response whose scan ran out of time; continues that scan (other arguments are ignored)"
+                    },
+                    "budget_seconds": {
+                        "type": "number",
+                        "description": BUDGET_DESCRIPTION
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="refine_result_set",
+            description="Filter a result set locally (no Ironclad API calls) and return a new handle. Supports the search filter syntax plus gt/gte/lt/lte comparisons on numbers, monetary amounts and dates, e.g. {\"field\": \"minimumPlatformFee\", \"gt\": 100000}.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "handle": {
+                        "type": "string",
+                        "description": "Result set handle from create_result_set or another result set tool"
+                    },
+                    "filter": {
+                        "type": "object",
+                        "description": "Leaf: {\"field\": \"<property>\", \"<op>\": <value>} with op one of equals, contains, in, gt, gte, lt, lte. Combine with {\"and\": [...]}, {\"or\": [...]}, {\"not\": {...}}. Properties can be named by their key prefix (e.g. 'agreementEndDate') or knowledge base name."
+                    }
+                },
+                "required": ["handle", "filter"]
+            }
+        ),
+        Tool(
+            name="sort_result_set",
+            description="Sort a result set locally (no Ironclad API calls) and list the first contracts. Returns a new handle with the sorted order.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "handle": {
+                        "type": "string",
+                        "description": "Result set handle"
+                    },
+                    "sort_by": {
+                        "type": "string",
+                        "description": "Field to sort by: 'name', 'lastUpdated', or a property (e.g. 'agreementEndDate', 'effectiveDate', 'minimumPlatformFee')"
+                    },
+                    "sort_order": {
+                        "type": "string",
+                        "enum": ["asc", "desc"],
+                        "default": "asc"
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Number of contracts to list",
+                        "default": 20
+                    }
+                },
+                "required": ["handle", "sort_by"]
+            }
+        ),
+        Tool(
+            name="aggregate_result_set",
+            description="Count, sum, average, min or max a result set locally (no Ironclad API calls), overall or grouped by a field (e.g. counterpartyName or type) or by month, quarter or year of a date field.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "handle": {
+                        "type": "string",
+                        "description": "Result set handle"
+                    },
+                    "metric": {
+                        "type": "string",
+                        "enum": ["count", "sum", "avg", "min", "max"],
+                        "default": "count"
+                    },
+                    "field": {
+                        "type": "string",
+                        "description": "Numeric or monetary field for sum/avg/min/max (e.g. 'minimumPlatformFee')"
+                    },
+                    "group_by": {
+                        "type": "string",
+                        "description": "Field to group by (e.g. 'counterpartyName', 'type', or a date such as 'effectiveDate' with period)"
+                    },
+                    "period": {
+                        "type": "string",
+                        "enum": ["month", "quarter", "year"],
+                        "description": "Bucket a date group_by into months, quarters or years, listed in date order (for trends, e.g. contracts per quarter)"
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of groups to list",
+                        "default": 25
+                    }
+                },
+                "required": ["handle"]
+            }
+        ),
+        Tool(
+            name="export_contracts",
+            description="Export every contract matching the filters to a file on the server (NDJSON, CSV or Parquet), streamed page by page so large extracts (100k+ rows) use constant memory. Returns the file path and row count, not the records. Use this for bulk extracts for finance or legal; use search_contracts to look at contracts.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "record_type": {
+                        "type": "string",
+                        "description": "Filter by record type (e.g., 'procurementAgreement')"
+                    },
+                    "counterparty": {
+                        "type": "string",
+                        "description": "Filter by counterparty name"
+                    },
+                    "query": {
+                        "type": "string",
+                        "description": "Search query (keywords in contract name)"
+                    },
+                    "date_field": {
+                        "type": "string",
+                        "description": "Date property to filter on (e.g., 'effectiveDate'). Requires date_from and/or date_to."
+                    },
+                    "date_from": {
+                        "type": "string",
+                        "description": "Start of the date range (YYYY-MM-DD)"
+                    },
+                    "date_to": {
+                        "type": "string",
+                        "description": "End of the date range (YYYY-MM-DD)"
+                    },
+                    "filter": {
+                        "type": "object",
+                        "description": FILTER_DESCRIPTION
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["ndjson", "csv", "parquet"],
+                        "default": "csv"
+                    },
+                    "compression": {
+                        "type": "string",
+                        "enum": ["none", "gzip", "zstd"],
+                        "default": "none"
+                    },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Columns to export, in order: attributes (id, ironcladId, name, type, lastUpdated) or properties (e.g. 'counterpartyName', 'agreementEndDate'). Default: everything."
+                    },
+                    "filename": {
+                        "type": "string",
+                        "description": "File name (without directories); a timestamped name is used by default"
+                    },
+                    "max_rows": {
+                        "type": "number",
+                        "description": "Stop after this many rows"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="multi_query",
+            description="Run several independent tool calls at once and get all their results in one response, e.g. count a counterparty's contracts, search its workflows and get the details of two contracts. Each query names a tool and passes the arguments that tool takes. The queries run concurrently under this call's time budget, so none of them can use the result of another; one failing does not affect the others.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "queries": {
+                        "type": "array",
+                        "minItems": 1,
+                        "maxItems": MULTI_QUERY_MAX_QUERIES,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "tool": {
+                                    "type": "string",
+                                    "enum": sorted(MULTI_QUERY_TOOLS),
+                                    "description": "Tool to call"
+                                },
+                                "arguments": {
+                                    "type": "object",
+                                    "description": "Arguments of that tool, as in its own schema"
+                                }
+                            },
+                            "required": ["tool"]
+                        },
+                        "description": f"Tool calls to run (at most {MULTI_QUERY_MAX_QUERIES})"
+                    },
+                    "budget_seconds": {
+                        "type": "number",
+                        "description": BUDGET_DESCRIPTION
+                    }
+                },
+                "required": ["queries"]
+            }
         )
     ]
 
 
+def _next_page_text(
+    tool: str,
+    arguments: dict,
+    page: int,
+    total: int,
+    cursor: Optional[Cursor],
+    user_email: Optional[str],
+    run_page: Callable[[int], Awaitable]
+) -> str:
+    """Issue the cursor for the page after `page` and start fetching that page"""
+    next_cursor = encode_cursor(
+        Cursor(
+            tool=tool,
+            arguments={key: value for key, value in arguments.items() if key not in ("cursor", "page")},
+            page=page + 1,
+            snapshot_total=cursor.snapshot_total if cursor else total,
+            snapshot_at=cursor.snapshot_at if cursor else time.time()
+        ),
+        user_email
+    )
+    budget = _tool_budget(tool, arguments)
+    
+    async def prefetch():
+        # The prefetch outlives this call, so it gets a budget of its own, and
+        # nobody waits for it yet, so it yields to every other request
+        with deadline_scope(budget, detached=True), upstream_priority(BACKGROUND):
+            return await run_page(page + 1)
+    
+    _page_prefetcher.schedule(user_email, next_cursor, prefetch, session=get_session_key())
+    return f"More results available. For the next page, call {tool} again with cursor: `{next_cursor}`\n\n"
+
+
+def _continuation_text(tool: str, arguments: dict, page: int, user_email: Optional[str]) -> str:
+    """Cursor that repeats a call whose scan stopped early, so it resumes from its checkpoint"""
+    token = encode_cursor(
+        Cursor(
+            tool=tool,
+            arguments={key: value for key, value in arguments.items() if key not in ("cursor", "page")},
+            page=page,
+            snapshot_total=UNKNOWN_TOTAL,
+            snapshot_at=time.time()
+        ),
+        user_email
+    )
+    return f"To continue the scan from where it stopped, call {tool} again with cursor: `{token}`"
+
+
+def _tool_budget(name: str, arguments: dict) -> Optional[float]:
+    """Time budget of a tool call: its budget_seconds, else the default (exports have their own timeout)"""
+    if arguments.get("budget_seconds") is not None:
+        budget = float(arguments["budget_seconds"])
+        if budget <= 0:
+            raise ValueError("budget_seconds must be positive")
+        return budget
+    return None if name == "export_contracts" else TOOL_BUDGET_SECONDS
+
+
+def drop_session_state(session) -> None:
+    """Release state held for an MCP session that has ended"""
+    _result_sets.drop_session(session)
+    _page_prefetcher.cancel_session(session)
+
+
+def _result_set_text(result_set: ResultSet, limit: int, show_field: Optional[str] = None) -> str:
+    """Describe a result set and list its first contracts (reads spilled sets from disk)"""
+    text = f"# Result set `{result_set.handle}`\n\n"
+    text += f"{result_set.count:,} contracts: {result_set.description}\n\n"
+    for record in itertools.islice(result_set.records(), limit):
+        counterparty = record["properties"].get("counterpartyName")
+        line = f"- **{record.get('ironcladId') or record.get('id')}** {record.get('name') or 'Unnamed Contract'}"
+        line += f" ({record.get('type') or 'N/A'})"
+        if counterparty:
+            line += f" - {counterparty}"
+        if show_field:
+            value = field_value(record, show_field)
+            line += f" — {show_field.split('_')[0]}: {value if value not in (None, '') else 'N/A'}"
+        text += line + "\n"
+    if result_set.count > limit:
+        text += f"\n... and {result_set.count - limit:,} more\n"
+    text += (
+        f"\nUse refine_result_set, sort_result_set or aggregate_result_set with handle "
+        f"`{result_set.handle}` for follow-up questions (no new scan needed)."
+    )
+    return text
+
+
+def _refusal_text(plan) -> str:
+    """Explain a refused query plan and how to narrow the query"""
+    text = f"⚠️ This search matches {plan.estimate:,} contracts before date filtering, "
+    text += "and the Ironclad API can only filter dates by scanning every one of them. "
+    text += "To get an answer, narrow it down:\n\n"
+    for suggestion in plan.suggestions:
+        text += f"- {suggestion}\n"
+    return text + f"\n{plan.describe()}"
+
+
+async def _sub_query(name: str, arguments: dict):
+    """Run one query of a multi_query as a tool call of its own, within the multi_query's deadline"""
+    TOOL_CALLS.inc(tool=name)
+    current_tool.set(name)
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"tool {name}", **{"mcp.tool": name}):
+            # A query's own budget_seconds can shorten the shared deadline, not extend it
+            with deadline_scope(_tool_budget(name, arguments)), upstream_priority(TOOL_PRIORITIES.get(name, BROWSE)):
+                return await _call_tool(name, arguments)
+    except Exception as e:
+        TOOL_ERRORS.inc(tool=name, error=type(e).__name__)
+        raise
+    finally:
+        TOOL_DURATION.observe(time.perf_counter() - start, tool=name)
+
+
+async def _multi_query(queries: list):
+    """Run the tool calls of a multi_query concurrently and combine their results"""
+    required = {tool.name: tool.inputSchema.get("required", []) for tool in await list_tools()}
+    
+    async def run(query: dict):
+        name = query.get("tool")
+        arguments = query.get("arguments") or {}
+        if name not in MULTI_QUERY_TOOLS:
+            raise ValueError(f"{name} cannot be run from multi_query")
+        missing = [argument for argument in required.get(name, []) if argument not in arguments]
+        if missing:
+            raise ValueError(f"missing required arguments: {', '.join(missing)}")
+        return await _sub_query(name, arguments)
+    
+    start = time.perf_counter()
+    # Each query handles its own errors; anything that still escapes one is
+    # reported in its place instead of failing the others
+    results = await asyncio.gather(*(run(query) for query in queries), return_exceptions=True)
+    
+    text = f"# Results of {len(queries)} queries\n\n"
+    extra_contents = []
+    for number, (query, result) in enumerate(zip(queries, results), 1):
+        arguments = json.dumps(query.get("arguments") or {}, ensure_ascii=False)
+        text += f"---\n\n## Query {number}: {query.get('tool')} {arguments}\n\n"
+        if isinstance(result, BaseException):
+            logger.warning(f"multi_query: query {number} ({query.get('tool')}) failed: {result!r}")
+            text += f"❌ Failed: {result}\n\n"
+            continue
+        for content in result:
+            if content.type == "text":
+                text += content.text.rstrip() + "\n\n"
+            else:
+                extra_contents.append(content)
+    text += f"---\n\n_{len(queries)} queries run concurrently in {time.perf_counter() - start:.1f}s_"
+    return [TextContent(type="text", text=text)] + extra_contents
+
+
 @app.call_tool()
 async def call_tool(name: str, arguments: dict):
     """Handle tool calls"""
+    TOOL_CALLS.inc(tool=name)
+    current_tool.set(name)
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"tool {name}", kind=tracing.KIND_SERVER, **{"mcp.tool": name}):
+            with deadline_scope(_tool_budget(name, arguments)), upstream_priority(TOOL_PRIORITIES.get(name, BROWSE)):
+                with collect_stale_reads() as stale:
+                    contents = await _call_tool(name, arguments)
+        # Say so when Ironclad was down and cached responses stood in for it
+        if stale.oldest is not None and contents and contents[0].type == "text":
+            contents[0] = TextContent(type="text", text=stale.notice() + contents[0].text)
+        return contents
+    except asyncio.CancelledError:
+        # The client sent notifications/cancelled or disconnected; the MCP
+        # session cancels this task, and with it every request it awaits
+        TOOL_CANCELLATIONS.inc(tool=name)
+        logger.info(f"Tool '{name}' cancelled after {time.perf_counter() - start:.1f}s")
+        raise
+    except Exception as e:
+        # Failures before a tool runs (e.g. credentials); tool errors are counted below
+        TOOL_ERRORS.inc(tool=name, error=type(e).__name__)
+        raise
+    finally:
+        TOOL_DURATION.observe(time.perf_counter() - start, tool=name)
+
+
+async def _call_tool(name: str, arguments: dict):
+    """Run a tool and render its result"""
     client = await get_client()
+    user_email = get_user_email()
+    hierarchy_index = _hierarchy_indexes[user_email]
+    renewal_calendar = _renewal_calendars[user_email]
+    record_index = _record_indexes[user_email]
+    session = get_session_key()
     
     try:
+        # A continuation token stands in for the arguments it was issued for
+        cursor_token = arguments.get("cursor")
+        cursor = decode_cursor(cursor_token, name, user_email) if cursor_token else None
+        if cursor is not None:
+            arguments = {**cursor.arguments, "page": cursor.page}
+        
+        # Structured server-side filter shared by the search and count tools
+        # (refine_result_set filters locally and accepts more operators)
+        filter_expr = None
+        if arguments.get("filter") and name != "refine_result_set":
+            filter_expr = parse_filter(arguments["filter"])
+        
         if name == "search_contracts":
-            # Handle ironclad_id searches separately (more efficient lookup)
-            if arguments.get("ironclad_id"):
-                ironclad_id = arguments["ironclad_id"]
-                search_result = await client.search_records(
-                    query=ironclad_id,
-                    page_size=arguments.get("limit", 20),
-                    page=0
+            planner = QueryPlanner(client, record_index, INDEX_TTL_SECONDS)
+            limit = int(arguments.get("limit", 20))
+            page = int(arguments.get("page", 0))
+            
+            record_types = list(arguments.get("record_types") or [])
+            if arguments.get("practice_area"):
+                area_types = _knowledge_base.get_practice_area_types(arguments["practice_area"])
+                if not area_types:
+                    raise ValueError(
+                        f"Unknown practice area '{arguments['practice_area']}'. "
+                        f"Known practice areas: {', '.join(_knowledge_base.get_practice_areas())}"
+                    )
+                record_types += area_types
+            if record_types and arguments.get("record_type"):
+                record_types.append(arguments["record_type"])
+            
+            sorted_listing = bool(record_types or arguments.get("sort_by"))
+            if sorted_listing and arguments.get("date_field") and (arguments.get("date_from") or arguments.get("date_to")):
+                raise ValueError(
+                    "Date filters work on one record type at a time and cannot be combined with "
+                    "record_types, practice_area or sort_by. Search each record type separately."
                 )
-                records = search_result.get("records", [])
-            else:
-                search_result = await client.search_records(
+            
+            async def run_page(page: int):
+                # Handle ironclad_id searches separately (more efficient lookup)
+                if arguments.get("ironclad_id"):
+                    return await planner.run(
+                        query=arguments["ironclad_id"],
+                        limit=limit,
+                        page=page
+                    )
+                if sorted_listing:
+                    return await planner.run_sorted(
+                        record_types or [arguments.get("record_type")],
+                        query=arguments.get("query"),
+                        counterparty=arguments.get("counterparty"),
+                        sort_by=arguments.get("sort_by") or "name",
+                        descending=arguments.get("sort_order", "asc").lower() == "desc",
+                        page=page,
+                        limit=limit,
+                        filter_expr=filter_expr
+                    )
+                return await planner.run(
                     query=arguments.get("query"),
-                    page_size=arguments.get("limit", 20),
-                    page=0,
                     record_type=arguments.get("record_type"),
-                    counterparty=arguments.get("counterparty")
+                    counterparty=arguments.get("counterparty"),
+                    date_field=arguments.get("date_field"),
+                    date_from=arguments.get("date_from"),
+                    date_to=arguments.get("date_to"),
+                    limit=limit,
+                    filter_expr=filter_expr,
+                    page=page
                 )
-                records = search_result.get("records", [])
             
+            result = await _page_prefetcher.take(user_email, cursor_token) if cursor else None
+            if result is None:
+                result = await run_page(page)
+            
+            if result.plan.strategy == REFUSE:
+                return [TextContent(type="text", text=_refusal_text(result.plan))]
+            
+            records = result.records
             if not records:
-                return [TextContent(
-                    type="text",
-                    text="No contracts found matching your search."
-                )]
+                result_text = "No contracts found matching your search.\n\n"
+                if not result.complete:
+                    result_text = "No matching contracts found before the scan stopped.\n\n"
+                    result_text += _continuation_text(name, arguments, page, user_email) + "\n\n"
+                return [TextContent(type="text", text=result_text + result.plan.describe())]
             
-            result_text = f"Found {len(records)} contracts:\n\n"
+            first = page * limit + 1
+            has_more = result.total > page * limit + len(records)
+            result_text = f"Found {len(records)} contracts"
+            if page or has_more:
+                result_text += f" (results {first:,}-{first + len(records) - 1:,}"
+                if result.total_exact:
+                    result_text += f" of {result.total:,} matches)"
+                else:
+                    result_text += ", more matches available)"
+            result_text += ":\n\n"
+            # A scan that stopped at the page limit only knows a lower bound
+            snapshot_total = result.total if result.total_exact else UNKNOWN_TOTAL
+            result_text += snapshot_note(cursor, snapshot_total)
+            if len(result.totals) > 1:
+                result_text += "Matches by type: " + ", ".join(
+                    f"{record_type} {count:,}" for record_type, count in result.totals.items()
+                ) + "\n\n"
             for record in records:
-                props = record.get('properties', {})
-                counterparty_name = props.get('counterpartyName', {}).get('value', 'N/A')
-                
-                result_text += f"**{record.get('name', 'Unnamed Contract')}**\n"
+                result_text += f"**{record.get('name') or 'Unnamed Contract'}**\n"
                 result_text += f"  Ironclad ID: {record.get('ironcladId', 'N/A')}\n"
-                result_text += f"  Counterparty: {counterparty_name}\n"
+                result_text += f"  Counterparty: {record.get('counterparty') or 'N/A'}\n"
                 result_text += f"  Type: {record.get('type', 'N/A')}\n"
+                date_field = arguments.get("date_field")
+                if date_field in record["dates"]:
+                    result_text += f"  {date_field}: {record['dates'][date_field].date()}\n"
                 result_text += f"  Record ID: {record.get('id')}\n\n"
             
+            if not result.complete:
+                result_text += "⚠️ The scan did not finish, so some matches may be missing. "
+                result_text += _continuation_text(name, arguments, page, user_email) + "\n\n"
+            if has_more:
+                result_text += _next_page_text(name, arguments, page, snapshot_total, cursor, user_email, run_page)
+            result_text += result.plan.describe()
+            
             return [TextContent(type="text", text=result_text)]
-        
+
         elif name == "get_contract_details":
             try:
-                import sys
                 record_id = arguments["record_id"]
-                print(f"\n🎯🎯🎯 get_contract_details called with record_id={record_id}", file=sys.stderr, flush=True)
+                logger.debug("get_contract_details called with record_id=%s", record_id)
                 
                 # Fetch the record directly (works with both IC-5701 format and UUID)
                 record = await client.get_record(record_id)
+                render_span = tracing.start_span("render", **{"mcp.tool": name})
                 props = record.get('properties', {})
             
                 # Helper function to extract property values
@@ -308,18 +1040,20 @@ async def call_tool(name: str, arguments: dict):
                 
                 # FIRST: Extract and display term-related fields prominently
                 import re
-                import sys
-                
-                # DEBUG: Log all property keys
-                print(f"\n🔍 DEBUG: Contract {record.get('ironcladId')} has {len(props)} properties", file=sys.stderr, flush=True)
-                print(f"🔍 DEBUG: Property keys: {list(props.keys())[:10]}...", file=sys.stderr, flush=True)  # First 10 keys
                 
                 # Check for specific known term fields
                 initial_term = get_prop('initialTermMonths_648ebaad-410a-4699-b44d-3766a659e1f0_number')
                 renewal_term = get_prop('renewalTerm_648ebaad-410a-4699-b44d-3766a659e1f0_number')
                 
-                print(f"🔍 DEBUG: initial_term = {initial_term}", file=sys.stderr, flush=True)
-                print(f"🔍 DEBUG: renewal_term = {renewal_term}", file=sys.stderr, flush=True)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Contract %s has %d properties", record.get('ironcladId'), len(props),
+                        extra={
+                            "property_keys": list(props)[:10],
+                            "initial_term": initial_term,
+                            "renewal_term": renewal_term
+                        }
+                    )
                 
                 # Also check for other term-related fields
                 term_keywords = ['term', 'renewal', 'duration', 'period', 'expir']
@@ -458,15 +1192,20 @@ async def call_tool(name: str, arguments: dict):
                 else:
                     result_text += "  No additional properties found.\n"
                 
+                render_span.end()
                 return [TextContent(type="text", text=result_text)]
             
+            except (httpx.HTTPError, CircuitOpen, DeadlineExceeded, QuotaExceeded):
+                # Upstream failures get the same short answer as in every other tool
+                raise
             except Exception as e:
                 import traceback
+                TOOL_ERRORS.inc(tool=name, error=type(e).__name__)
+                tracing.record_error(e)
                 error_msg = f"❌ Error retrieving contract details: {str(e)}\n\n"
                 error_msg += f"**Error Type:** {type(e).__name__}\n"
                 error_msg += f"**Details:** {traceback.format_exc()}\n"
-                print(f"❌ ERROR in get_contract_details: {e}", file=sys.stderr, flush=True)
-                print(traceback.format_exc(), file=sys.stderr, flush=True)
+                logger.exception(f"Error in get_contract_details: {e}")
                 return [TextContent(type="text", text=error_msg)]
         
         elif name == "get_contract_attachments":
@@ -492,33 +1231,68 @@ async def call_tool(name: str, arguments: dict):
             return [TextContent(type="text", text=result_text)]
         
         elif name == "count_contracts":
-            count = await client.count_records(
+            planner = QueryPlanner(client, record_index, INDEX_TTL_SECONDS)
+            result = await planner.run(
                 query=arguments.get("query"),
                 record_type=arguments.get("record_type"),
-                counterparty=arguments.get("counterparty")
+                counterparty=arguments.get("counterparty"),
+                date_field=arguments.get("date_field"),
+                date_from=arguments.get("date_from"),
+                date_to=arguments.get("date_to"),
+                limit=0,
+                filter_expr=filter_expr
             )
             
-            result_text = f"Found {count:,} contracts"
+            if result.plan.strategy == REFUSE:
+                return [TextContent(type="text", text=_refusal_text(result.plan))]
+            
+            result_text = f"Found {result.total:,} contracts"
+            if not result.complete:
+                result_text = f"Found at least {result.total:,} contracts"
             if arguments.get("record_type"):
                 result_text += f" of type '{arguments['record_type']}'"
             if arguments.get("counterparty"):
                 result_text += f" with counterparty '{arguments['counterparty']}'"
+            if filter_expr is not None:
+                result_text += f" matching {filter_expr.to_param()}"
+            date_field = arguments.get("date_field")
+            date_from, date_to = arguments.get("date_from"), arguments.get("date_to")
+            if date_field and date_from and date_to:
+                result_text += f" with {date_field} from {date_from} to {date_to}"
+            elif date_field and date_from:
+                result_text += f" with {date_field} on {date_from}"
+            elif date_field and date_to:
+                result_text += f" with {date_field} up to {date_to}"
             result_text += "."
+            if not result.complete:
+                result_text += "\n\n⚠️ The scan did not finish. " + _continuation_text(name, arguments, 0, user_email)
+            result_text += f"\n\n{result.plan.describe()}"
             
             return [TextContent(type="text", text=result_text)]
         
         elif name == "search_workflows":
-            search_result = await client.search_workflows(
-                query=arguments.get("query"),
-                record_type=arguments.get("record_type"),
-                counterparty=arguments.get("counterparty"),
-                stage=arguments.get("stage"),
-                page_size=arguments.get("limit", 20),
-                page=0
-            )
+            # Workflow pages are capped at 100 by Ironclad, so larger pages would skip results
+            limit = min(int(arguments.get("limit", 20)), 100)
+            page = int(arguments.get("page", 0))
+            
+            async def run_page(page: int):
+                return await client.search_workflows(
+                    query=arguments.get("query"),
+                    record_type=arguments.get("record_type"),
+                    counterparty=arguments.get("counterparty"),
+                    stage=arguments.get("stage"),
+                    page_size=limit,
+                    page=page,
+                    filter_expr=filter_expr
+                )
+            
+            search_result = await _page_prefetcher.take(user_email, cursor_token) if cursor else None
+            if search_result is None:
+                search_result = await run_page(page)
             
             workflows = search_result.get("workflows", [])
             total = search_result.get("total", 0)
+            has_more = total > page * limit + len(workflows)
             
             if not workflows:
                 return [TextContent(
@@ -527,9 +1301,11 @@ async def call_tool(name: str, arguments: dict):
                 )]
             
             result_text = f"Found {len(workflows)} in-progress contract(s)"
-            if total > len(workflows):
-                result_text += f" (showing {len(workflows)} of {total} total)"
+            if page or has_more:
+                first = page * limit + 1
+                result_text += f" (showing {first:,}-{first + len(workflows) - 1:,} of {total:,} total)"
             result_text += ":\n\n"
+            result_text += snapshot_note(cursor, total)
             
             for wf in workflows:
                 wf_id = wf.get('ironcladId', wf.get('id'))
@@ -551,23 +1327,20 @@ async def call_tool(name: str, arguments: dict):
                 result_text += f"  Status: {wf_status}\n"
                 result_text += f"  Counterparty: {counterparty}\n\n"
             
+            if has_more:
+                result_text += _next_page_text(name, arguments, page, total, cursor, user_email, run_page)
+            
             return [TextContent(type="text", text=result_text)]
         
         elif name == "get_workflow_details":
-            import sys
             workflow_id = arguments["workflow_id"]
-            print(f"\n🎯 get_workflow_details called with workflow_id={workflow_id}", file=sys.stderr, flush=True)
+            logger.debug("get_workflow_details called with workflow_id=%s", workflow_id)
             
-            try:
-                workflow = await client.get_workflow(workflow_id)
-                print(f"✅ Successfully retrieved workflow {workflow_id}", file=sys.stderr, flush=True)
-            except Exception as e:
-                print(f"❌ Error retrieving workflow: {type(e).__name__}: {e}", file=sys.stderr, flush=True)
-                import traceback
-                traceback.print_exc(file=sys.stderr)
-                raise
+            # Errors are logged and rendered by the exception handler below
+            workflow = await client.get_workflow(workflow_id)
             
             # Build detailed workflow information
+            render_span = tracing.start_span("render", **{"mcp.tool": name})
             wf_id = workflow.get('ironcladId', workflow.get('id'))
             wf_name = workflow.get('title') or workflow.get('name', 'Unnamed Workflow')
             wf_type = workflow.get('type', 'N/A')
@@ -652,25 +1425,330 @@ async def call_tool(name: str, arguments: dict):
                     result_text += f"\n... and {len(comments) - 5} more comments\n"
                 result_text += "\n"
             
+            render_span.end()
+            return [TextContent(type="text", text=result_text)]
+        
+        elif name == "get_contract_family":
+            record_id = arguments["record_id"]
+            
+            # Make sure the record and its ancestors are known locally
+            # (one direct lookup per missing ancestor, usually zero or one)
+            ref = record_id
+            seen_refs = set()
+            while ref and ref not in seen_refs:
+                seen_refs.add(ref)
+                known_id = hierarchy_index.resolve(ref)
+                if known_id is None:
+                    try:
+                        record = await client.get_record(ref)
+                    except Exception:
+                        if ref == record_id:
+                            raise
+                        # Parent not visible to this user - treat the child as the root
+                        break
+                    hierarchy_index.add_records([record])
+                    known_id = record.get("id")
+                ref = hierarchy_index.get_parent_ref(known_id)
+            
+            # Children can be of any record type (an MSA's SOWs, order forms,
+            # addenda...), so every type is indexed once, in one scan
+            indexed = hierarchy_index.is_type_indexed(None, INDEX_TTL_SECONDS)
+            record_cache_lookup("hierarchy", indexed)
+            if not indexed:
+                # The pages only feed the index (a scan listener), so none are kept here
+                async with aclosing(client.iter_record_pages(concurrency=SCAN_CONCURRENCY)) as pages:
+                    async for _ in pages:
+                        pass
+            
+            family = hierarchy_index.get_family(record_id)
+            if family is None:
+                return [TextContent(
+                    type="text",
+                    text=f"Contract {record_id} not found."
+                )]
+            
+            requested_id = hierarchy_index.resolve(record_id)
+            lines = []
+            
+            def render(node, depth):
+                marker = "  ← requested" if node["id"] == requested_id else ""
+                line = f"{'  ' * depth}- **{node.get('ironcladId') or node['id']}** {node.get('name') or 'Unnamed Contract'}"
+                line += f" ({node.get('type', 'N/A')})"
+                if node.get("counterparty"):
+                    line += f" - {node['counterparty']}"
+                lines.append(line + marker)
+                for child in node["children"]:
+                    render(child, depth + 1)
+            
+            render(family, 0)
+            
+            result_text = f"# Contract Family of {family.get('ironcladId') or family['id']}\n\n"
+            result_text += f"Found {len(lines)} contract(s) in this family:\n\n"
+            result_text += "\n".join(lines) + "\n"
+            
+            if not hierarchy_index.is_type_indexed(None, INDEX_TTL_SECONDS):
+                result_text += "\n⚠️ The scan did not finish, so this family may be missing contracts. Try again with a larger budget_seconds."
+            
+            return [TextContent(type="text", text=result_text)]
+        
+        elif name == "upcoming_renewals":
+            days = int(arguments.get("days", 90))
+            event = arguments.get("event", "expiration")
+            record_type = arguments.get("record_type")
+            limit = int(arguments.get("limit", 50))
+            
+            # Refresh the calendar with one scan when it doesn't cover this type yet
+            indexed = renewal_calendar.is_type_indexed(record_type, INDEX_TTL_SECONDS)
+            record_cache_lookup("renewal_calendar", indexed)
+            if not indexed:
+                await client.fetch_all_records(record_type=record_type, resumable=False)
+            
+            today = datetime.now(timezone.utc).date()
+            window_end = today + timedelta(days=days)
+            entries = renewal_calendar.upcoming(event, today, window_end, record_type=record_type)
+            
+            event_labels = {
+                "expiration": "a term ending",
+                "renewal": "a renewal",
+                "notice_deadline": "a non-renewal notice deadline"
+            }
+            scope = f" of type '{record_type}'" if record_type else ""
+            
+            if not entries:
+                result_text = f"No contracts{scope} with {event_labels[event]} between {today} and {window_end}."
+            else:
+                result_text = f"Found {len(entries)} contract(s){scope} with {event_labels[event]} between {today} and {window_end}"
+                if len(entries) > limit:
+                    result_text += f" (showing first {limit})"
+                result_text += ":\n\n"
+                
+                for entry in entries[:limit]:
+                    event_date = entry[EVENTS[event]]
+                    result_text += f"**{event_date}** - {entry.get('ironcladId', 'N/A')} {entry.get('name') or 'Unnamed Contract'}\n"
+                    result_text += f"  Type: {entry.get('type', 'N/A')}\n"
+                    if entry.get("counterparty"):
+                        result_text += f"  Counterparty: {entry['counterparty']}\n"
+                    if entry["renews"]:
+                        result_text += f"  Auto-renews every {entry['renewal_term_months']} months (current term ends {entry['term_end']})\n"
+                    elif entry["term_end"]:
+                        result_text += f"  Expires: {entry['term_end']}\n"
+                    if entry["next_renewal"] and entry["next_renewal"] != entry["term_end"]:
+                        result_text += f"  Renewal Date: {entry['next_renewal']}\n"
+                    if entry["notice_deadline"]:
+                        result_text += f"  Notice Deadline: {entry['notice_deadline']} ({entry['notice_days']} days notice)\n"
+                    result_text += "\n"
+            
+            if not renewal_calendar.is_type_indexed(record_type, INDEX_TTL_SECONDS):
+                result_text += "\n⚠️ The scan did not finish, so this calendar may be incomplete. Narrow by record_type and try again."
+            
+            return [TextContent(type="text", text=result_text)]
+        
+        elif name == "create_result_set":
+            record_type = arguments.get("record_type")
+            
+            # Probe the size first so an oversized scan is refused before it starts
+            estimate = await client.count_records(
+                query=arguments.get("query"),
+                record_type=record_type,
+                counterparty=arguments.get("counterparty"),
+                filter_expr=filter_expr
+            )
+            if estimate > _result_sets.max_records:
+                raise ValueError(
+                    f"{estimate:,} contracts match, more than the result set limit of {_result_sets.max_records:,}. "
+                    "Narrow the search with record_type, counterparty, query or filter."
+                )
+            
+            stats = ScanStats()
+            records = await client.fetch_all_records(
+                record_type=record_type,
+                query=arguments.get("query"),
+                counterparty=arguments.get("counterparty"),
+                date_field=arguments.get("date_field"),
+                date_from=arguments.get("date_from"),
+                date_to=arguments.get("date_to"),
+                concurrency=SCAN_CONCURRENCY,
+                filter_expr=filter_expr,
+                stats=stats
+            )
+            description = ", ".join(
+                f"{key}={json.dumps(arguments[key]) if key == 'filter' else arguments[key]}"
+                for key in ("record_type", "counterparty", "query", "date_field", "date_from", "date_to", "filter")
+                if arguments.get(key)
+            ) or "all contracts"
+            result_set = await asyncio.to_thread(
+                _result_sets.add, session, [flatten_record(record) for record in records], description
+            )
+            
+            result_text = await asyncio.to_thread(_result_set_text, result_set, 10)
+            if not stats.complete:
+                result_text += (
+                    f"\n\n⚠️ The scan stopped after {stats.records:,} of {stats.total:,} records, "
+                    "so this result set is partial. " + _continuation_text(name, arguments, 0, user_email)
+                )
+            return [TextContent(type="text", text=result_text)]
+        
+        elif name == "refine_result_set":
+            result_set = await asyncio.to_thread(
+                _result_sets.refine, session, arguments["handle"], arguments["filter"]
+            )
+            return [TextContent(type="text", text=await asyncio.to_thread(_result_set_text, result_set, 10))]
+        
+        elif name == "sort_result_set":
+            sort_by = arguments["sort_by"]
+            result_set = await asyncio.to_thread(
+                _result_sets.sort,
+                session,
+                arguments["handle"],
+                sort_by,
+                arguments.get("sort_order", "asc").lower() == "desc"
+            )
+            text = await asyncio.to_thread(
+                _result_set_text, result_set, int(arguments.get("limit", 20)), _resolve_field(sort_by)
+            )
+            return [TextContent(type="text", text=text)]
+        
+        elif name == "aggregate_result_set":
+            metric = arguments.get("metric", "count")
+            field = arguments.get("field")
+            group_by = arguments.get("group_by")
+            period = arguments.get("period")
+            limit = int(arguments.get("limit", 25))
+            source = _result_sets.get(session, arguments["handle"])
+            rows = await asyncio.to_thread(
+                _result_sets.aggregate, session, arguments["handle"], metric, field, group_by, period
+            )
+            
+            label = metric if metric == "count" else f"{metric} of {field}"
+            result_text = f"# {label.capitalize()}"
+            if group_by:
+                result_text += f" by {group_by}" + (f" ({period})" if period else "")
+            result_text += f"\n\nResult set {source.handle}: {source.description} ({source.count:,} contracts)\n\n"
+            if not rows:
+                result_text += f"No contracts have a numeric value for {field}.\n"
+            else:
+                result_text += f"| {group_by or 'Group'} | {label} | Contracts |\n|---|---|---|\n"
+                for group, value, count in rows[:limit]:
+                    shown = f"{value:,.0f}" if metric == "count" else f"{value:,.2f}"
+                    result_text += f"| {group} | {shown} | {count:,} |\n"
+                if len(rows) > limit:
+                    result_text += f"\n... and {len(rows) - limit} more groups\n"
+            
             return [TextContent(type="text", text=result_text)]
         
+        elif name == "export_contracts":
+            export_format = arguments.get("format", "csv")
+            compression = arguments.get("compression", "none")
+            fields = arguments.get("fields") or None
+            
+            # Exports land in a directory per user, under a plain file name
+            filename = Path(arguments.get("filename") or export_filename(
+                arguments.get("record_type"), export_format, compression
+            )).name
+            if not filename or filename.startswith("."):
+                raise ValueError("filename must be a plain file name")
+            suffix = output_suffix(export_format, compression)
+            if not filename.endswith(suffix):
+                filename += suffix
+            
+            result = await export_records(
+                client,
+                user_export_path(user_email, filename),
+                format=export_format,
+                compression=compression,
+                fields=fields,
+                record_type=arguments.get("record_type"),
+                query=arguments.get("query"),
+                counterparty=arguments.get("counterparty"),
+                filter_expr=filter_expr,
+                date_field=arguments.get("date_field"),
+                date_from=arguments.get("date_from"),
+                date_to=arguments.get("date_to"),
+                max_rows=int(arguments["max_rows"]) if arguments.get("max_rows") else None,
+                concurrency=SCAN_CONCURRENCY,
+                resolve_field=_resolve_field
+            )
+            
+            result_text = "# Export written\n\n"
+            result_text += f"**File:** `{result.path.resolve()}`\n"
+            result_text += f"**Format:** {result.format}"
+            if result.compression != "none":
+                result_text += f" ({result.compression})"
+            result_text += f"\n**Rows:** {result.rows:,} ({len(result.columns)} columns)\n"
+            result_text += f"**Size:** {result.bytes:,} bytes in {result.seconds:.1f}s\n"
+            if not result.complete:
+                result_text += (
+                    f"\n⚠️ The scan stopped after {result.scanned:,} of {result.total:,} records, so the export is partial. "
+                    "Narrow the filters or export in several parts.\n"
+                )
+            
+            return [TextContent(type="text", text=result_text)]
+        
+        elif name == "multi_query":
+            return await _multi_query(arguments["queries"])
+        
         else:
             return [TextContent(
                 type="text",
                 text=f"Unknown tool: {name}"
             )]
     
+    except DeadlineExceeded as e:
+        TOOL_ERRORS.inc(tool=name, error=type(e).__name__)
+        logger.warning(f"Tool '{name}' ran out of time: {e}")
+        return [TextContent(
+            type="text",
+            text=(
+                f"⏱️ {name} ran out of its time budget before it had any results ({e}). "
+                "Try again with a larger budget_seconds, or narrow the request."
+            )
+        )]
+    
+    except CircuitOpen as e:
+        TOOL_ERRORS.inc(tool=name, error=type(e).__name__)
+        logger.warning(f"Tool '{name}' failed: circuit breaker open")
+        return [TextContent(
+            type="text",
+            text=(
+                f"⚠️ {name} could not reach Ironclad: {e}, and nothing it needed was cached. "
+                f"Retry-After: {e.retry_after_header()} seconds."
+            )
+        )]
+    
+    except httpx.HTTPError as e:
+        # Upstream failures are not bugs in the server: no stack trace for the client
+        TOOL_ERRORS.inc(tool=name, error=type(e).__name__)
+        logger.warning(f"Tool '{name}' failed on an Ironclad API request: {e!r}")
+        if isinstance(e, httpx.HTTPStatusError):
+            problem = f"Ironclad answered {e.response.status_code} {e.response.reason_phrase}"
+        else:
+            problem = f"Ironclad could not be reached ({type(e).__name__})"
+        return [TextContent(
+            type="text",
+            text=f"⚠️ {name} failed: {problem}. Try again shortly."
+        )]
+    
+    except QuotaExceeded as e:
+        TOOL_ERRORS.inc(tool=name, error=type(e).__name__)
+        logger.warning(f"Tool '{name}' refused by the {e.quota} quota: {e}")
+        return [TextContent(
+            type="text",
+            text=(
+                f"⏳ {name} could not finish: {e}. "
+                f"Retry-After: {e.retry_after_header()} seconds."
+            )
+        )]
+    
     except Exception as e:
         import traceback
-        import sys
+        TOOL_ERRORS.inc(tool=name, error=type(e).__name__)
+        tracing.record_error(e)
         error_msg = f"❌ **Error calling tool '{name}'**\n\n"
         error_msg += f"**Error Type:** {type(e).__name__}\n"
         error_msg += f"**Error Message:** {str(e)}\n\n"
         error_msg += f"**Stack Trace:**\n```\n{traceback.format_exc()}\n```\n"
         
-        # Log to stderr for debugging
-        print(f"\n❌ EXCEPTION in call_tool '{name}':", file=sys.stderr, flush=True)
-        print(traceback.format_exc(), file=sys.stderr, flush=True)
+        logger.exception(f"Exception in call_tool '{name}'")
         
         return [TextContent(
             type="text",
@@ -717,64 +1795,14 @@ async def read_resource(uri: str):
     These provide context about Shopify's contract organization but are NOT exhaustive.
     Use them as a guide to understand structure and search strategies.
     """
-    if uri == "knowledge://shopify-ironclad/overview":
-        kb_path = KNOWLEDGE_BASE_DIR / "SHOPIFY_IRONCLAD_KNOWLEDGE_BASE.md"
-        try:
-            with open(kb_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Add disclaimer at the top
-            disclaimer = """
-> **IMPORTANT**: This knowledge base is a CONTEXT GUIDE ONLY.
-> It documents critical fields and common search patterns but is NOT exhaustive.
-> Many additional fields exist for each record type beyond those listed here.
-> Use this to understand organization and search strategies, not as a complete field dictionary.
-
----
-
-"""
-            return content + disclaimer if not content.startswith(">") else content
-            
-        except FileNotFoundError:
-            return "Knowledge base file not found. Please ensure knowledge_base directory exists."
-    
-    elif uri == "knowledge://shopify-ironclad/record-types":
-        kb_path = KNOWLEDGE_BASE_DIR / "record_types.json"
-        try:
-            with open(kb_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Add metadata disclaimer
-            if 'metadata' not in data:
-                data['metadata'] = {}
-            data['metadata']['disclaimer'] = "Context guide only - not an exhaustive list of all record types or document types"
-            
-            return json.dumps(data, indent=2)
-        except FileNotFoundError:
-            return json.dumps({"error": "Record types file not found"})
-    
-    elif uri == "knowledge://shopify-ironclad/critical-fields":
-        kb_path = KNOWLEDGE_BASE_DIR / "critical_fields.json"
-        try:
-            with open(kb_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Add metadata disclaimer
-            if 'metadata' not in data:
-                data['metadata'] = {}
-            data['metadata']['disclaimer'] = "Context guide only - many additional fields exist per record type beyond those documented here"
-            
-            return json.dumps(data, indent=2)
-        except FileNotFoundError:
-            return json.dumps({"error": "Critical fields file not found"})
-    
-    else:
+    content = _knowledge_base.get_resource(uri)
+    if content is None:
         return f"Unknown resource URI: {uri}"
+    return content
 
 
 def main():
-    """Entry point for the MCP server"""
-    import asyncio
+    """Run the MCP server over stdio (see startup.main for the cold-start entry point)"""
     from mcp.server.stdio import stdio_server
     
     async def run_server():
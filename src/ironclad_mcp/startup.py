@@ -0,0 +1,212 @@
+"""
+Cold-start entry point for the stdio MCP server
+
+`ironclad-mcp` is spawned once per editor session, so startup latency is
+paid by every user. This module stays free of heavy imports: it starts
+fetching the OAuth secrets and token on a background thread first, then
+imports the MCP SDK and tool code while that network work is in flight.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_BASE_URL = "https://na1.ironcladapp.com"
+
+_process_start = time.perf_counter()
+
+
+def _credentials_from_env() -> Optional[Dict[str, str]]:
+    """
+    OAuth credentials from IRONCLAD_OAUTH_CLIENT_ID/_SECRET, if both are set
+
+    Meant for local development and load testing against a mock Ironclad
+    API; deployments read the credentials from Secret Manager.
+    """
+    client_id = os.getenv("IRONCLAD_OAUTH_CLIENT_ID")
+    client_secret = os.getenv("IRONCLAD_OAUTH_CLIENT_SECRET")
+    if client_id and client_secret:
+        return {"client_id": client_id, "client_secret": client_secret}
+    return None
+
+
+class CredentialPrefetch:
+    """
+    Fetches OAuth credentials and an access token on a background thread
+
+    The token is published as soon as it is known: straight from the
+    encrypted token cache when one with most of its life left is stored
+    there, otherwise after the Secret Manager lookups (skipped when the
+    credentials are set in the environment) and the OAuth token request.
+    Long-lived clients should ask get_access_token before each request
+    rather than keep that first token: once the OAuth client is ready, it
+    renews the token before it expires.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or os.getenv("IRONCLAD_BASE_URL", DEFAULT_BASE_URL)
+        self.timings: Dict[str, float] = {}
+        self._token: Future = Future()
+        self._oauth_client: Future = Future()
+
+    def start(self) -> "CredentialPrefetch":
+        """Start the background fetch and return self"""
+        threading.Thread(
+            target=self._run,
+            name="ironclad-credential-prefetch",
+            daemon=True
+        ).start()
+        return self
+
+    @contextmanager
+    def _timed(self, label: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[label] = time.perf_counter() - start
+
+    def _run(self) -> None:
+        try:
+            self._fetch()
+        except BaseException as e:
+            for future in (self._token, self._oauth_client):
+                if not future.done():
+                    future.set_exception(e)
+
+    def _fetch(self) -> None:
+        with self._timed("import auth + token cache"):
+            from .auth import IroncladOAuthClient
+            from .metrics import record_cache_lookup
+            from .token_cache import TokenCache
+
+            token_cache = TokenCache.from_env()
+
+        if token_cache:
+            with self._timed("read token cache"):
+                cached = token_cache.load(self.base_url)
+            record_cache_lookup("oauth_token", cached is not None)
+            if cached:
+                self._token.set_result(cached[0])
+
+        creds = _credentials_from_env()
+        if creds is None:
+            with self._timed("import secret manager + create client"):
+                from .gcp_secrets import GCPSecretProvider
+
+                secret_provider = GCPSecretProvider()
+
+            with self._timed("fetch secrets (concurrent)"):
+                creds = secret_provider.get_oauth_credentials()
+
+        oauth_client = IroncladOAuthClient(
+            base_url=self.base_url,
+            client_id=creds["client_id"],
+            client_secret=creds["client_secret"],
+            token_cache=token_cache
+        )
+        if not self._token.done():
+            with self._timed("request OAuth token"):
+                access_token = asyncio.run(oauth_client.get_access_token())
+            self._token.set_result(access_token)
+        # Published last, so the event loop never requests a token while
+        # this thread is still requesting one
+        self._oauth_client.set_result(oauth_client)
+
+    async def wait_for_token(self) -> str:
+        """Await the access token without blocking the event loop"""
+        return await asyncio.wrap_future(self._token)
+
+    async def get_access_token(self) -> str:
+        """
+        A current access token, for IroncladClient's token_provider
+
+        The prefetched token until the OAuth client is ready, then the OAuth
+        client's, which is renewed before it expires.
+        """
+        if self._oauth_client.done() and self._oauth_client.exception() is None:
+            return await self._oauth_client.result().get_access_token()
+        return await self.wait_for_token()
+
+    def token_result(self, timeout: Optional[float] = None) -> str:
+        """Block until the access token is available"""
+        return self._token.result(timeout)
+
+
+class StartupProfile:
+    """Collects wall-clock timings of startup phases for --import-profile"""
+
+    def __init__(self):
+        self.phases: List[Tuple[str, float]] = []
+        self.notes: List[str] = []
+
+    @contextmanager
+    def phase(self, label: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((label, time.perf_counter() - start))
+
+    def report(self, prefetch: CredentialPrefetch, stream=sys.stderr) -> None:
+        total = time.perf_counter() - _process_start
+        print("Ironclad MCP startup profile", file=stream)
+        print("=" * 60, file=stream)
+        print("Main thread:", file=stream)
+        for label, seconds in self.phases:
+            print(f"  {label:<44} {seconds * 1000:8.1f} ms", file=stream)
+        print("Credential prefetch thread (overlaps main thread):", file=stream)
+        for label, seconds in prefetch.timings.items():
+            print(f"  {label:<44} {seconds * 1000:8.1f} ms", file=stream)
+        print("-" * 60, file=stream)
+        print(f"  {'ready to serve (since module import)':<44} {total * 1000:8.1f} ms", file=stream)
+        for note in self.notes:
+            print(f"  ⚠️  {note}", file=stream)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Entry point for the stdio MCP server"""
+    parser = argparse.ArgumentParser(
+        prog="ironclad-mcp",
+        description="Ironclad MCP server (stdio transport)"
+    )
+    parser.add_argument(
+        "--import-profile",
+        action="store_true",
+        help="Print a report of startup time (imports, secrets, OAuth token) to stderr and exit"
+    )
+    args = parser.parse_args(argv)
+
+    # stderr: stdout carries the MCP stdio protocol
+    from .structured_logging import configure_logging
+
+    configure_logging(stream=sys.stderr)
+
+    profile = StartupProfile()
+
+    # Start the network-bound work first so it overlaps the imports below
+    prefetch = CredentialPrefetch().start()
+
+    with profile.phase("import MCP SDK"):
+        import mcp.server.stdio  # noqa: F401
+
+    with profile.phase("import ironclad_mcp.server"):
+        from . import server
+
+    server.set_credential_prefetch(prefetch)
+
+    if args.import_profile:
+        with profile.phase("wait for OAuth token"):
+            try:
+                prefetch.token_result(timeout=60)
+            except Exception as e:
+                profile.notes.append(f"credential prefetch failed: {type(e).__name__}: {e}")
+        profile.report(prefetch)
+        return
+
+    server.main()
@@ -0,0 +1,161 @@
+"""
+Structured, non-blocking logging
+
+Log calls only format a record and put it on an in-memory queue; a
+QueueListener thread writes JSON lines to the configured stream/file, so
+no disk or pipe I/O happens on the event loop. Every record carries the
+request context it was logged from (user, tool, trace ID), captured in the
+calling task before the record is queued.
+
+Configured through the environment:
+- IRONCLAD_LOG_LEVEL: DEBUG, INFO (default), WARNING, ...
+- IRONCLAD_LOG_FORMAT: json (default) or text
+- IRONCLAD_LOG_FILE: also write to this file
+- IRONCLAD_LOG_DEBUG_SAMPLE_RATE: share of DEBUG records kept (default 1.0),
+  so hot-path debug events can stay on under load
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import List, Optional, TextIO
+
+from .request_context import current_tool, current_user_email
+from .tracing import current_trace_id
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+CONTEXT_FIELDS = ("user", "tool", "trace_id")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach user, tool and trace ID from the calling task's context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.user = current_user_email.get() or os.getenv("IRONCLAD_USER_EMAIL")
+        record.tool = current_tool.get()
+        record.trace_id = current_trace_id()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a share of DEBUG records; other levels always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, context and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and key not in CONTEXT_FIELDS and key not in entry:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        elif record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _PreformattedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps `extra` fields and context on the queued record"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message in the caller (arguments may change later) but
+        # keep the record's attributes for the JSON formatter
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # Tracebacks hold frames alive; the text is all the writer needs
+        record.exc_info = None
+        return record
+
+
+def configure_logging(
+    stream: TextIO = sys.stderr,
+    level: Optional[str] = None,
+    log_file: Optional[str] = None,
+    log_format: Optional[str] = None
+) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a background writer thread
+
+    Safe to call more than once; later calls replace the earlier setup.
+
+    Args:
+        stream: Stream to write to (stderr for stdio, which reserves stdout for MCP)
+        level: Root log level (default IRONCLAD_LOG_LEVEL or INFO)
+        log_file: Extra file to write to (default IRONCLAD_LOG_FILE)
+        log_format: 'json' or 'text' (default IRONCLAD_LOG_FORMAT or json)
+
+    Returns:
+        The running QueueListener
+    """
+    global _listener
+
+    level = (level or os.getenv("IRONCLAD_LOG_LEVEL", "INFO")).upper()
+    log_file = log_file or os.getenv("IRONCLAD_LOG_FILE")
+    log_format = (log_format or os.getenv("IRONCLAD_LOG_FORMAT", "json")).lower()
+    sample_rate = float(os.getenv("IRONCLAD_LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+    if log_format == "text":
+        formatter: logging.Formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(user)s %(tool)s %(trace_id)s] %(message)s"
+        )
+    else:
+        formatter = JsonFormatter()
+
+    handlers: List[logging.Handler] = [logging.StreamHandler(stream)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _PreformattedQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(sample_rate))
+    queue_handler.addFilter(RequestContextFilter())
+
+    if _listener is not None:
+        _listener.stop()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    return _listener
+
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
@@ -0,0 +1,124 @@
+"""
+Encrypted on-disk cache for the Ironclad OAuth access token
+
+Lets a freshly spawned stdio server reuse the token from a previous session
+instead of waiting on an OAuth round-trip. Tokens are encrypted with Fernet
+(AES-128-CBC + HMAC) using a key supplied through the environment, and the
+file is written with owner-only permissions.
+
+Needs the `cache` extra (`pip install 'ironclad-mcp[cache]'`, for
+cryptography). Enabled by setting both:
+- IRONCLAD_TOKEN_CACHE_PATH: file to store the token in
+- IRONCLAD_TOKEN_CACHE_KEY: Fernet key (generate with
+  `python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"`)
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A new process only starts with a cached token that has most of its life left
+MIN_REMAINING = timedelta(hours=1)
+
+
+class TokenCache:
+    """Stores one access token per Ironclad base URL, encrypted at rest"""
+
+    def __init__(self, path: Path, key: str):
+        """
+        Initialize the cache
+
+        Args:
+            path: File to store the encrypted tokens in
+            key: Fernet key used to encrypt the file
+        """
+        # cryptography is only needed when the cache is enabled
+        from cryptography.fernet import Fernet
+
+        self.path = Path(path).expanduser()
+        self._fernet = Fernet(key.encode() if isinstance(key, str) else key)
+
+    @classmethod
+    def from_env(cls) -> Optional["TokenCache"]:
+        """Create a cache from IRONCLAD_TOKEN_CACHE_PATH/_KEY, or None if not configured"""
+        path = os.getenv("IRONCLAD_TOKEN_CACHE_PATH")
+        key = os.getenv("IRONCLAD_TOKEN_CACHE_KEY")
+        if not path:
+            return None
+        if not key:
+            logger.warning("IRONCLAD_TOKEN_CACHE_PATH is set but IRONCLAD_TOKEN_CACHE_KEY is not; token cache disabled")
+            return None
+        try:
+            return cls(Path(path), key)
+        except ImportError:
+            logger.warning(
+                "Token cache requires the 'cryptography' package (pip install 'ironclad-mcp[cache]'); token cache disabled"
+            )
+        except ValueError as e:
+            logger.warning(f"Invalid IRONCLAD_TOKEN_CACHE_KEY ({e}); token cache disabled")
+        return None
+
+    def _read_all(self) -> dict:
+        from cryptography.fernet import InvalidToken
+
+        try:
+            encrypted = self.path.read_bytes()
+        except FileNotFoundError:
+            return {}
+        except OSError as e:
+            logger.warning(f"Could not read token cache {self.path}: {e}")
+            return {}
+
+        try:
+            return json.loads(self._fernet.decrypt(encrypted))
+        except (InvalidToken, ValueError):
+            # Wrong key or corrupted file - treat as empty, it will be overwritten
+            logger.warning(f"Token cache {self.path} could not be decrypted; ignoring it")
+            return {}
+
+    def load(self, base_url: str, min_remaining: timedelta = MIN_REMAINING) -> Optional[Tuple[str, datetime]]:
+        """
+        Read the cached token for an Ironclad base URL
+
+        Args:
+            base_url: Ironclad base URL the token was issued for
+            min_remaining: Ignore tokens expiring sooner than this (by default,
+                tokens past the first hours of their 6 hour life)
+
+        Returns:
+            Tuple of (access_token, expires_at), or None if no usable token is cached
+        """
+        entry = self._read_all().get(base_url)
+        if not entry:
+            return None
+        try:
+            access_token = entry["access_token"]
+            expires_at = datetime.fromisoformat(entry["expires_at"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if datetime.now() >= expires_at - min_remaining:
+            return None
+        return access_token, expires_at
+
+    def store(self, base_url: str, access_token: str, expires_at: datetime) -> None:
+        """Write a token for an Ironclad base URL, replacing any previous one"""
+        entries = self._read_all()
+        entries[base_url] = {
+            "access_token": access_token,
+            "expires_at": expires_at.isoformat()
+        }
+        encrypted = self._fernet.encrypt(json.dumps(entries).encode())
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(encrypted)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write token cache {self.path}: {e}")
@@ -0,0 +1,294 @@
+"""
+Lightweight request tracing
+
+Each MCP tool call gets a root span; credential resolution, every upstream
+Ironclad request and rendering are recorded as child spans. The current span
+is carried in a contextvar, so children are attached correctly across awaits
+and concurrent tool calls without passing anything around.
+
+Finished spans are batched on a background thread and exported to:
+- IRONCLAD_TRACE_FILE: a JSONL file, one span per line
+- IRONCLAD_TRACE_OTLP_ENDPOINT: an OTLP/HTTP collector (JSON encoding), e.g.
+  http://localhost:4318 for a local OpenTelemetry Collector or Jaeger
+
+With neither set, tracing is disabled and spans cost a context manager call.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "ironclad-mcp"
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"] = None,
+        kind: int = KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.end_ns: Optional[int] = None
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Finish the span (only the first call counts) and hand it to the exporter"""
+        if self.end_ns is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        self.end_ns = self.start_ns + int(self.duration_ms * 1_000_000)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        _export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is disabled"""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+# ========== Exporters ==========
+
+class JsonlExporter:
+    """Appends spans to a JSONL file"""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str):
+        self.url = endpoint.rstrip("/")
+        if not self.url.endswith("/v1/traces"):
+            self.url += "/v1/traces"
+
+    def export(self, spans: List[Span]) -> None:
+        import httpx
+
+        payload = {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]
+                },
+                "scopeSpans": [{
+                    "scope": {"name": "ironclad_mcp"},
+                    "spans": [self._span(span) for span in spans]
+                }]
+            }]
+        }
+        response = httpx.post(self.url, json=payload, timeout=5)
+        response.raise_for_status()
+
+    @staticmethod
+    def _span(span: Span) -> Dict[str, Any]:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+
+class BatchSpanProcessor:
+    """Queues finished spans and exports them in batches from a daemon thread"""
+
+    def __init__(self, exporters: List, max_batch: int = 256, flush_interval: float = 1.0, max_queue: int = 10_000):
+        self.exporters = exporters
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Span]" = queue.Queue(max_queue)
+        self._flush_lock = threading.Lock()
+        threading.Thread(target=self._run, name="ironclad-trace-export", daemon=True).start()
+        atexit.register(self.flush)
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            # Never block a request on tracing
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Export everything queued so far (also called at exit)"""
+        with self._flush_lock:
+            while True:
+                batch = []
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                for exporter in self.exporters:
+                    try:
+                        exporter.export(batch)
+                    except Exception as e:
+                        logger.warning(f"Trace export to {type(exporter).__name__} failed: {e}")
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+_processor: Optional[BatchSpanProcessor] = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_from_env() -> Optional[BatchSpanProcessor]:
+    """Set up exporters from IRONCLAD_TRACE_FILE / IRONCLAD_TRACE_OTLP_ENDPOINT (once)"""
+    global _processor, _configured
+    with _configure_lock:
+        if not _configured:
+            exporters = []
+            if os.getenv("IRONCLAD_TRACE_FILE"):
+                exporters.append(JsonlExporter(os.environ["IRONCLAD_TRACE_FILE"]))
+            if os.getenv("IRONCLAD_TRACE_OTLP_ENDPOINT"):
+                exporters.append(OtlpHttpExporter(os.environ["IRONCLAD_TRACE_OTLP_ENDPOINT"]))
+            _processor = BatchSpanProcessor(exporters) if exporters else None
+            _configured = True
+    return _processor
+
+
+def _export(span: Span) -> None:
+    if _processor is not None:
+        _processor.on_end(span)
+
+
+def is_enabled() -> bool:
+    return (_processor if _configured else configure_from_env()) is not None
+
+
+# ========== Span API ==========
+
+def start_span(name: str, kind: int = KIND_INTERNAL, **attributes: Any):
+    """
+    Start a child of the current span without making it current
+
+    For operations that start and end in different callbacks (e.g. an
+    upstream request). The caller must call end() on the returned span.
+    """
+    if not is_enabled():
+        return NOOP_SPAN
+    return Span(name, parent=_current_span.get(), kind=kind, attributes=attributes)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes: Any) -> Iterator:
+    """
+    Run a block in a new span that is current for everything it awaits
+
+    Usage:
+        with tracing.span("render", tool=name) as s:
+            s.set_attribute("chars", len(text))
+    """
+    if not is_enabled():
+        yield NOOP_SPAN
+        return
+    current = Span(name, parent=_current_span.get(), kind=kind, attributes=attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def record_error(error: BaseException) -> None:
+    """Mark the current span as failed (for errors that are handled, not raised)"""
+    current = _current_span.get()
+    if current is not None:
+        current.error = f"{type(error).__name__}: {error}"
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace ID of the current span, or None outside a traced request"""
+    current = _current_span.get()
+    return current.trace_id if current else None
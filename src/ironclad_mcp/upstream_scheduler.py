@@ -0,0 +1,196 @@
+"""
+Priority scheduling of Ironclad API requests
+
+Every upstream request, from every user's client, takes a slot from one
+process-wide concurrency budget. When the budget is used up, requests queue
+and free slots go to the most urgent class first:
+
+- interactive: single-record lookups (get_contract_details, ...)
+- browse: searches, counts and result pages
+- bulk: pages of full scans, exports and result sets
+- background: work nobody is waiting for yet (next-page prefetches)
+
+So one user's 300-page scan no longer delays another user's lookup by more
+than one request. Queued requests age: for every IRONCLAD_UPSTREAM_AGING_SECONDS
+a request has waited it is ranked one class higher, so bulk and background
+work still progresses while interactive traffic is heavy.
+
+The class is carried in a contextvar: tool calls set it from the tool, and
+scans and prefetches lower it for the requests they make.
+
+No user holds more than IRONCLAD_USER_MAX_CONCURRENT_REQUESTS slots: their
+further requests queue even while slots are free, and within a class the
+user with the fewest requests in flight goes first, so a heavy user gets a
+fair share of the budget rather than all of it (see also user_quotas).
+
+Configured through the environment:
+- IRONCLAD_UPSTREAM_CONCURRENCY: requests in flight at once, all users together (default 16)
+- IRONCLAD_UPSTREAM_AGING_SECONDS: wait after which a queued request moves up a class (default 2)
+- IRONCLAD_USER_MAX_CONCURRENT_REQUESTS: requests in flight at once for one user (default 8, 0 = no cap)
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from . import deadlines
+from .metrics import UPSTREAM_IN_FLIGHT, UPSTREAM_QUEUE_WAIT, UPSTREAM_QUEUED
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_CONCURRENCY = int(os.getenv("IRONCLAD_UPSTREAM_CONCURRENCY", "16"))
+UPSTREAM_AGING_SECONDS = float(os.getenv("IRONCLAD_UPSTREAM_AGING_SECONDS", "2"))
+USER_MAX_CONCURRENT_REQUESTS = int(os.getenv("IRONCLAD_USER_MAX_CONCURRENT_REQUESTS", "8"))
+
+# Priority classes, most urgent first
+INTERACTIVE = 0
+BROWSE = 1
+BULK = 2
+BACKGROUND = 3
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BROWSE: "browse", BULK: "bulk", BACKGROUND: "background"}
+
+# Class of the upstream requests made in the current context
+current_priority: ContextVar[int] = ContextVar("current_priority", default=BROWSE)
+
+
+@contextmanager
+def upstream_priority(priority: int) -> Iterator[None]:
+    """Make the block's upstream requests in the given priority class"""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class _Waiter:
+    """A request queued for a slot"""
+
+    __slots__ = ("priority", "user", "enqueued", "future")
+
+    def __init__(self, priority: int, user: Optional[str], future: asyncio.Future):
+        self.priority = priority
+        self.user = user
+        self.enqueued = time.monotonic()
+        self.future = future
+
+
+class UpstreamScheduler:
+    """
+    Shared concurrency budget for upstream requests, granted by priority class
+
+    A higher class takes the next free slot ahead of queued lower-class
+    work, but a request already in flight is never interrupted. Each user
+    holds at most `per_user` slots at once.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = UPSTREAM_CONCURRENCY,
+        aging_seconds: float = UPSTREAM_AGING_SECONDS,
+        per_user: int = USER_MAX_CONCURRENT_REQUESTS
+    ):
+        self.concurrency = max(1, concurrency)
+        self.aging_seconds = aging_seconds
+        self.per_user = per_user if per_user > 0 else self.concurrency
+        self._in_flight = 0
+        self._user_in_flight: Dict[Optional[str], int] = {}
+        self._waiting: List[_Waiter] = []
+
+    def _rank(self, waiter: _Waiter, now: float) -> Tuple[int, int, float]:
+        # One class up for every aging_seconds waited, so no class starves;
+        # within a class, users with fewer requests in flight go first
+        boost = int((now - waiter.enqueued) / self.aging_seconds) if self.aging_seconds > 0 else 0
+        return waiter.priority - boost, self._user_in_flight.get(waiter.user, 0), waiter.enqueued
+
+    def _has_room(self, user: Optional[str]) -> bool:
+        return self._in_flight < self.concurrency and self._user_in_flight.get(user, 0) < self.per_user
+
+    def _grant(self, user: Optional[str]) -> None:
+        self._in_flight += 1
+        self._user_in_flight[user] = self._user_in_flight.get(user, 0) + 1
+        UPSTREAM_IN_FLIGHT.set(self._in_flight)
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the highest-ranked queued requests whose user has room"""
+        now = time.monotonic()
+        while self._in_flight < self.concurrency:
+            eligible = [waiter for waiter in self._waiting if self._has_room(waiter.user)]
+            if not eligible:
+                break
+            waiter = min(eligible, key=lambda w: self._rank(w, now))
+            self._waiting.remove(waiter)
+            self._grant(waiter.user)
+            waiter.future.set_result(None)
+        UPSTREAM_QUEUED.set(len(self._waiting))
+
+    async def acquire(self, priority: int, user: Optional[str] = None) -> float:
+        """
+        Wait for a slot
+
+        Args:
+            priority: Priority class of the request
+            user: User the request is made for
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            DeadlineExceeded: If the call's deadline passes while queued
+        """
+        # Queued requests that could run have already been given a slot, so
+        # taking a free one here never jumps the queue
+        if self._has_room(user):
+            self._grant(user)
+            return 0.0
+
+        waiter = _Waiter(priority, user, asyncio.get_running_loop().create_future())
+        self._waiting.append(waiter)
+        UPSTREAM_QUEUED.set(len(self._waiting))
+        try:
+            left = deadlines.remaining()
+            if left is None:
+                await asyncio.shield(waiter.future)
+            else:
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), max(left, 0))
+                except asyncio.TimeoutError:
+                    raise deadlines.DeadlineExceeded("Time budget spent waiting for an upstream request slot")
+        except BaseException:
+            if waiter.future.done():
+                # The slot was handed over just as the wait ended: pass it on
+                self.release(user)
+            else:
+                waiter.future.cancel()
+                self._waiting.remove(waiter)
+                UPSTREAM_QUEUED.set(len(self._waiting))
+            raise
+        return time.monotonic() - waiter.enqueued
+
+    def release(self, user: Optional[str] = None) -> None:
+        """Free a user's slot, handing it to the highest-ranked queued request that can run"""
+        self._in_flight -= 1
+        remaining = self._user_in_flight.get(user, 0) - 1
+        if remaining > 0:
+            self._user_in_flight[user] = remaining
+        else:
+            self._user_in_flight.pop(user, None)
+        UPSTREAM_IN_FLIGHT.set(self._in_flight)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: int, user: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block"""
+        waited = await self.acquire(priority, user)
+        UPSTREAM_QUEUE_WAIT.observe(waited, priority=PRIORITY_NAMES.get(priority, str(priority)))
+        try:
+            yield
+        finally:
+            self.release(user)
+
+
+# Shared by every IroncladClient in the process
+scheduler = UpstreamScheduler()
@@ -0,0 +1,189 @@
+"""
+Per-user quotas on upstream work
+
+The upstream scheduler shares one request budget between all users and caps
+the requests any one user has in flight (IRONCLAD_USER_MAX_CONCURRENT_REQUESTS,
+see upstream_scheduler). Concurrency alone does not stop one user's
+back-to-back scans from spending the company's Ironclad rate limit, so each
+user (the X-User-Email their client connects with) is also held to:
+
+- pages per minute: Ironclad API requests, each returning one page of
+  records or one record. The allowance refills continuously and up to a
+  minute's worth can be spent in a burst.
+- concurrent scans: full scans and exports running at once.
+
+A request waits for its quota for at most IRONCLAD_USER_QUOTA_MAX_WAIT_SECONDS,
+and never past the call's deadline. Beyond that it fails with QuotaExceeded,
+which says when to retry: tools report it in their response, and the HTTP
+server answers further tool calls of a user who is out of pages with a 429
+and a Retry-After header.
+
+Configured through the environment (0 turns a quota off):
+- IRONCLAD_USER_PAGES_PER_MINUTE: Ironclad API requests per user per minute (default 1200)
+- IRONCLAD_USER_MAX_CONCURRENT_SCANS: full scans and exports per user at once (default 2)
+- IRONCLAD_USER_QUOTA_MAX_WAIT_SECONDS: longest wait for a quota before refusing (default 5)
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from . import deadlines
+from .metrics import USER_QUOTA_REJECTIONS, USER_QUOTA_WAIT
+
+logger = logging.getLogger(__name__)
+
+USER_PAGES_PER_MINUTE = int(os.getenv("IRONCLAD_USER_PAGES_PER_MINUTE", "1200"))
+USER_MAX_CONCURRENT_SCANS = int(os.getenv("IRONCLAD_USER_MAX_CONCURRENT_SCANS", "2"))
+USER_QUOTA_MAX_WAIT_SECONDS = float(os.getenv("IRONCLAD_USER_QUOTA_MAX_WAIT_SECONDS", "5"))
+
+PAGES_PER_MINUTE = "pages_per_minute"
+CONCURRENT_SCANS = "concurrent_scans"
+
+
+class QuotaExceeded(Exception):
+    """A user's quota is used up; the request can be retried after `retry_after` seconds"""
+
+    def __init__(self, quota: str, retry_after: float, message: str):
+        super().__init__(message)
+        self.quota = quota
+        self.retry_after = retry_after
+
+    def retry_after_header(self) -> str:
+        """Value for a Retry-After header (whole seconds, at least 1)"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class UserQuotas:
+    """Pages-per-minute and concurrent-scan quotas, tracked per user"""
+
+    def __init__(
+        self,
+        pages_per_minute: int = USER_PAGES_PER_MINUTE,
+        max_scans: int = USER_MAX_CONCURRENT_SCANS,
+        max_wait_seconds: float = USER_QUOTA_MAX_WAIT_SECONDS
+    ):
+        self.pages_per_minute = pages_per_minute
+        self.max_scans = max_scans
+        self.max_wait_seconds = max_wait_seconds
+        # user -> (pages left, time.monotonic() when counted); negative while
+        # requests are waiting for the allowance to refill
+        self._pages: Dict[Optional[str], Tuple[float, float]] = {}
+        self._scans: Dict[Optional[str], int] = {}
+        self._scan_waiters: Dict[Optional[str], List[asyncio.Future]] = {}
+
+    def _allowance(self, user: Optional[str], now: float) -> float:
+        pages, counted_at = self._pages.get(user, (self.pages_per_minute, now))
+        return min(self.pages_per_minute, pages + (now - counted_at) * self.pages_per_minute / 60)
+
+    def _max_wait(self) -> float:
+        left = deadlines.remaining()
+        return self.max_wait_seconds if left is None else max(0.0, min(self.max_wait_seconds, left))
+
+    def page_retry_after(self, user: Optional[str]) -> float:
+        """Seconds until `user` can make an upstream request without waiting (0 if they can now)"""
+        if self.pages_per_minute <= 0:
+            return 0.0
+        allowance = self._allowance(user, time.monotonic())
+        return 0.0 if allowance >= 1 else (1 - allowance) * 60 / self.pages_per_minute
+
+    async def take_page(self, user: Optional[str]) -> None:
+        """
+        Spend one page of a user's allowance, waiting for it to refill if needed
+
+        Raises:
+            QuotaExceeded: If the page would not be available within the
+                quota's max wait (or before the call's deadline)
+        """
+        if self.pages_per_minute <= 0:
+            return
+        now = time.monotonic()
+        # Reserve the page before waiting, so concurrent requests line up
+        # behind each other instead of all waking at the same moment
+        allowance = self._allowance(user, now) - 1
+        wait = -allowance * 60 / self.pages_per_minute if allowance < 0 else 0.0
+        if wait > self._max_wait():
+            USER_QUOTA_REJECTIONS.inc(quota=PAGES_PER_MINUTE)
+            logger.warning(f"Pages-per-minute quota of {user} used up, retry in {wait:.1f}s")
+            raise QuotaExceeded(
+                PAGES_PER_MINUTE,
+                wait,
+                f"Quota of {self.pages_per_minute} Ironclad API requests per minute used up"
+            )
+        self._pages[user] = (allowance, now)
+        USER_QUOTA_WAIT.observe(wait, quota=PAGES_PER_MINUTE)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Give back the page the abandoned request reserved
+                pages, counted_at = self._pages.get(user, (0.0, now))
+                self._pages[user] = (pages + 1, counted_at)
+                raise
+
+    def _release_scan(self, user: Optional[str]) -> None:
+        """End a user's scan, handing its place to one of their queued scans"""
+        waiters = self._scan_waiters.get(user)
+        if waiters:
+            waiters.pop(0).set_result(None)
+            if not waiters:
+                del self._scan_waiters[user]
+            return
+        running = self._scans.get(user, 0) - 1
+        if running > 0:
+            self._scans[user] = running
+        else:
+            self._scans.pop(user, None)
+
+    @asynccontextmanager
+    async def scan_slot(self, user: Optional[str]) -> AsyncIterator[None]:
+        """
+        Count a scan against a user's concurrent-scan quota for the duration of the block
+
+        Raises:
+            QuotaExceeded: If none of the user's running scans finishes within
+                the quota's max wait (or before the call's deadline)
+        """
+        if self.max_scans <= 0:
+            yield
+            return
+
+        start = time.monotonic()
+        if self._scans.get(user, 0) < self.max_scans:
+            self._scans[user] = self._scans.get(user, 0) + 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._scan_waiters.setdefault(user, []).append(future)
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self._max_wait())
+            except BaseException as e:
+                if future.done():
+                    # Handed a place just as the wait ended: pass it on
+                    self._release_scan(user)
+                else:
+                    future.cancel()
+                    waiters = self._scan_waiters.get(user, [])
+                    waiters.remove(future)
+                    if not waiters:
+                        self._scan_waiters.pop(user, None)
+                if isinstance(e, asyncio.TimeoutError):
+                    USER_QUOTA_REJECTIONS.inc(quota=CONCURRENT_SCANS)
+                    logger.warning(f"Concurrent-scan quota of {user} used up")
+                    raise QuotaExceeded(
+                        CONCURRENT_SCANS,
+                        self.max_wait_seconds,
+                        f"{self.max_scans} scans of yours are already running; wait for one to finish"
+                    ) from None
+                raise
+        USER_QUOTA_WAIT.observe(time.monotonic() - start, quota=CONCURRENT_SCANS)
+        try:
+            yield
+        finally:
+            self._release_scan(user)
+
+
+# Shared by every IroncladClient in the process
+quotas = UserQuotas()
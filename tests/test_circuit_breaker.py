@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from ironclad_mcp import circuit_breaker
+from ironclad_mcp.circuit_breaker import (
+    CLOSED,
+    ERROR,
+    HALF_OPEN,
+    OK,
+    OPEN,
+    SLOW,
+    CircuitBreaker,
+    CircuitOpen,
+    LastKnownGood,
+    collect_stale_reads,
+    format_age,
+)
+from ironclad_mcp.ironclad_client import InstrumentedAsyncClient
+
+
+def make_breaker(**overrides):
+    settings = dict(window=4, min_requests=4, error_ratio=0.5, slow_ratio=0.75, slow_seconds=1, open_seconds=0.05)
+    settings.update(overrides)
+    return CircuitBreaker(**settings)
+
+
+def feed(breaker, *outcomes):
+    for outcome in outcomes:
+        breaker.record(outcome, breaker.before_request())
+
+
+def test_classify():
+    breaker = make_breaker()
+    assert breaker.classify(503, 0.1) == ERROR
+    assert breaker.classify(404, 0.1) == OK
+    assert breaker.classify(200, 2.0) == SLOW
+
+
+def test_opens_on_errors_only_after_min_requests():
+    breaker = make_breaker()
+    feed(breaker, ERROR, ERROR, OK)
+    assert breaker.state == CLOSED
+    feed(breaker, OK)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen) as raised:
+        breaker.before_request()
+    assert 0 < raised.value.retry_after <= 0.05
+    assert raised.value.retry_after_header() == "1"
+
+
+def test_opens_on_slow_requests():
+    breaker = make_breaker()
+    feed(breaker, SLOW, SLOW, OK, SLOW)
+    assert breaker.state == OPEN
+
+
+def test_abandoned_requests_are_not_counted():
+    breaker = make_breaker()
+    feed(breaker, ERROR, None, None, None, ERROR, OK)
+    assert breaker.state == CLOSED
+
+
+def test_successful_probe_closes_the_breaker():
+    breaker = make_breaker()
+    feed(breaker, ERROR, ERROR, ERROR, ERROR)
+    time.sleep(0.06)
+    assert breaker.before_request() is True
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpen):
+        breaker.before_request()
+    breaker.record(OK, probe=True)
+    assert breaker.state == CLOSED
+    assert breaker.before_request() is False
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = make_breaker()
+    feed(breaker, ERROR, ERROR, ERROR, ERROR)
+    time.sleep(0.06)
+    breaker.record(ERROR, breaker.before_request())
+    assert breaker.state == OPEN
+    assert breaker.retry_after() > 0
+
+
+def test_abandoned_probe_lets_another_through():
+    breaker = make_breaker()
+    feed(breaker, ERROR, ERROR, ERROR, ERROR)
+    time.sleep(0.06)
+    breaker.record(None, breaker.before_request())
+    assert breaker.state == HALF_OPEN
+    assert breaker.before_request() is True
+
+
+def json_response(body=b'{"id": "r1"}', status_code=200):
+    return httpx.Response(status_code, headers={"content-type": "application/json"}, content=body)
+
+
+def test_last_known_good_is_per_user_and_url():
+    kept = LastKnownGood(max_bytes=1024)
+    kept.put("a", "https://x/r1", json_response())
+    age, status_code, headers, body = kept.get("a", "https://x/r1")
+    assert age < 1 and status_code == 200 and body == b'{"id": "r1"}'
+    assert kept.get("b", "https://x/r1") is None
+    assert kept.get("a", "https://x/r2") is None
+
+
+def test_last_known_good_skips_non_json_and_drops_old_entries():
+    kept = LastKnownGood(max_bytes=1024, max_age_seconds=60)
+    kept.put("a", "https://x/file", httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF"))
+    assert kept.get("a", "https://x/file") is None
+    kept.put("a", "https://x/r1", json_response(), fetched_at=time.time() - 120)
+    assert kept.get("a", "https://x/r1") is None
+
+
+def test_last_known_good_stays_within_its_budget():
+    kept = LastKnownGood(max_bytes=800)
+    body = b'{"pad": "' + b"x" * 80 + b'"}'
+    for index in range(20):
+        kept.put("a", f"https://x/r{index}", json_response(body))
+    assert kept._bytes <= 800
+    assert kept.get("a", "https://x/r0") is None
+    assert kept.get("a", "https://x/r19") is not None
+
+
+@pytest.mark.parametrize("seconds, text", [
+    (0, "0 seconds"),
+    (1, "1 second"),
+    (59, "59 seconds"),
+    (60, "1 minute"),
+    (7200, "2 hours"),
+    (86400 * 3 + 5, "3 days"),
+])
+def test_format_age(seconds, text):
+    assert format_age(seconds) == text
+
+
+def test_client_serves_the_last_good_response_while_ironclad_fails(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "breaker", make_breaker(open_seconds=60))
+    monkeypatch.setattr(circuit_breaker, "last_known_good", LastKnownGood())
+    failing = False
+
+    def handler(request):
+        # Streamed like a real transport's responses, so httpx times them
+        if failing:
+            return httpx.Response(503, stream=httpx.ByteStream(b""))
+        return httpx.Response(200, headers={"content-type": "application/json"}, stream=httpx.ByteStream(b'{"id": "r1"}'))
+
+    async def scenario():
+        nonlocal failing
+        async with InstrumentedAsyncClient(transport=httpx.MockTransport(handler)) as client:
+            assert (await client.get("https://ironclad.test/records/r1")).status_code == 200
+            failing = True
+            with collect_stale_reads() as reads:
+                stale = await client.get("https://ironclad.test/records/r1")
+            assert stale.json() == {"id": "r1"}
+            assert reads.count == 1 and "cached data" in reads.notice()
+            assert (await client.get("https://ironclad.test/records/r2")).status_code == 503
+
+    asyncio.run(scenario())
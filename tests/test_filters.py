@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+import pytest
+
+from ironclad_mcp.ironclad_client import (
+    Contains,
+    Equals,
+    In,
+    IroncladClient,
+    combine_filters,
+    parse_filter,
+)
+
+
+def test_values_are_quoted_and_escaped():
+    assert Equals("counterpartyName", 'Acme "Global"').to_param() == r'(Equals([counterpartyName], "Acme \"Global\""))'
+    assert Contains("name", "C:\\share").serialize() == r'Contains([name], "C:\\share")'
+    assert Equals("autoRenew", True).serialize() == 'Equals([autoRenew], "true")'
+
+
+def test_injected_expression_stays_inside_the_value():
+    injected = 'x"), Equals([owner], "admin'
+    assert Equals("name", injected).serialize() == r'Equals([name], "x\"), Equals([owner], \"admin")'
+
+
+@pytest.mark.parametrize("field", ["", "  ", "a]b", "a[b", 'a"b', None])
+def test_invalid_field_names_are_rejected(field):
+    with pytest.raises(ValueError):
+        Equals(field, "value")
+
+
+def test_parse_filter_builds_the_expression():
+    expression = parse_filter({
+        "and": [
+            {"field": "counterpartyName", "contains": "Zoom"},
+            {"not": {"field": "step", "in": ["Sign", "Archive", "Sign"]}},
+        ]
+    })
+    assert expression.to_param() == (
+        '(And(Contains([counterpartyName], "Zoom"), '
+        'Not(Or(Equals([step], "Sign"), Equals([step], "Archive")))))'
+    )
+
+
+@pytest.mark.parametrize("spec", [
+    [],
+    {},
+    {"field": "name"},
+    {"field": "name", "equals": "a", "contains": "b"},
+    {"field": "name", "equals": "a", "extra": 1},
+    {"and": []},
+    {"or": {"field": "name", "equals": "a"}},
+    {"xor": []},
+    {"field": "name", "in": "abc"},
+])
+def test_parse_filter_rejects_malformed_specs(spec):
+    with pytest.raises(ValueError):
+        parse_filter(spec)
+
+
+def test_combine_filters_skips_missing_expressions():
+    assert combine_filters(None, None) is None
+    assert combine_filters(Equals("a", 1), None, In("b", [2])) == '(And(Equals([a], "1"), Equals([b], "2")))'
+
+
+def test_get_workflow_search_fallback_escapes_the_id():
+    filters = []
+
+    def handler(request):
+        if request.url.path.endswith("/workflows"):
+            filters.append(request.url.params["filter"])
+            return httpx.Response(200, json={"list": []})
+        return httpx.Response(404, json={})
+
+    async def lookup():
+        client = IroncladClient("https://ironclad.test", "token", "user@example.com")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with client:
+            await client.get_workflow('IC-1"), Equals([step], "Sign')
+
+    with pytest.raises(ValueError):
+        asyncio.run(lookup())
+    assert filters == [r'(Equals([ironcladId], "IC-1\"), Equals([step], \"Sign"))']
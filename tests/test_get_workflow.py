@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import pytest
+
+from ironclad_mcp.circuit_breaker import CircuitOpen
+from ironclad_mcp.deadlines import DeadlineExceeded
+from ironclad_mcp.ironclad_client import IroncladClient
+from ironclad_mcp.user_quotas import PAGES_PER_MINUTE, QuotaExceeded
+
+
+def get_workflow(workflow_id, search_error):
+    """Look up a workflow whose direct lookup is a 404 and whose search raises search_error"""
+    def handler(request):
+        if request.url.path.endswith("/workflows"):
+            if search_error is not None:
+                raise search_error
+            return httpx.Response(200, json={"list": []})
+        return httpx.Response(404, json={})
+
+    async def lookup():
+        client = IroncladClient("https://ironclad.test", "token", "user@example.com")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with client:
+            return await client.get_workflow(workflow_id)
+
+    return asyncio.run(lookup())
+
+
+def test_missing_workflow_is_reported_as_not_found():
+    with pytest.raises(ValueError, match="not found"):
+        get_workflow("IC-1", None)
+
+
+@pytest.mark.parametrize("error", [
+    DeadlineExceeded("Time budget spent"),
+    QuotaExceeded(PAGES_PER_MINUTE, 3.0, "Page quota used up"),
+    CircuitOpen(30.0),
+    httpx.ConnectError("connection refused"),
+])
+def test_search_failures_are_not_reported_as_not_found(error):
+    with pytest.raises(type(error)):
+        get_workflow("IC-1", error)
+
+
+def test_connection_failure_skips_the_search_fallback():
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        raise httpx.ConnectError("connection refused")
+
+    async def lookup():
+        client = IroncladClient("https://ironclad.test", "token", "user@example.com")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with client:
+            await client.get_workflow("IC-1")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(lookup())
+    assert requests == ["/public/api/v1/workflows/IC-1"]
@@ -0,0 +1,62 @@
+import json
+import os
+
+from ironclad_mcp.knowledge_base import CRITICAL_FIELDS_FILE, RECORD_TYPES_FILE, KnowledgeBaseRegistry
+
+RECORD_TYPES = {
+    "practiceAreas": {
+        "Procurement": {
+            "recordTypes": {
+                "procurement": {"apiValue": "procurementAgreement", "description": "Vendor contracts"}
+            }
+        }
+    }
+}
+CRITICAL_FIELDS = {
+    "universalFields": {
+        "counterpartyName": {"apiField": "counterpartyName", "type": "string"}
+    }
+}
+
+
+def write(path, data):
+    # A distinct mtime, so the registry sees the change even on coarse clocks
+    mtime = path.stat().st_mtime + 10 if path.exists() else None
+    path.write_text(json.dumps(data))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def make_registry(tmp_path):
+    write(tmp_path / RECORD_TYPES_FILE, RECORD_TYPES)
+    write(tmp_path / CRITICAL_FIELDS_FILE, CRITICAL_FIELDS)
+    return KnowledgeBaseRegistry(tmp_path, check_interval=0)
+
+
+def test_lookups(tmp_path):
+    registry = make_registry(tmp_path)
+
+    assert registry.get_record_type("PROCUREMENTAGREEMENT")["practiceArea"] == "Procurement"
+    assert registry.get_practice_area_types("procurement") == ["procurementAgreement"]
+    assert registry.get_field("counterpartyName")["category"] == "universalFields"
+
+
+def test_malformed_nested_entry_keeps_previous_version(tmp_path):
+    registry = make_registry(tmp_path)
+    broken = {"practiceAreas": {"Procurement": {"recordTypes": {"procurement": "not an object"}}}}
+    write(tmp_path / RECORD_TYPES_FILE, broken)
+
+    registry.refresh(force=True)
+
+    assert registry.get_record_type("procurement")["apiValue"] == "procurementAgreement"
+    payload = json.loads(registry.get_resource("knowledge://shopify-ironclad/record-types"))
+    assert payload["practiceAreas"] == RECORD_TYPES["practiceAreas"]
+
+
+def test_non_object_metadata_keeps_previous_version(tmp_path):
+    registry = make_registry(tmp_path)
+    write(tmp_path / CRITICAL_FIELDS_FILE, {**CRITICAL_FIELDS, "metadata": "oops"})
+
+    registry.refresh(force=True)
+
+    assert registry.get_field("counterpartyName") is not None
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from ironclad_mcp import pagination
+from ironclad_mcp.pagination import (
+    UNKNOWN_TOTAL,
+    Cursor,
+    PagePrefetcher,
+    _b64decode,
+    _b64encode,
+    decode_cursor,
+    encode_cursor,
+    snapshot_note,
+)
+
+USER = "user@example.com"
+
+
+def make_cursor(**changes):
+    fields = dict(
+        tool="search_contracts",
+        arguments={"query": "Zoom", "limit": 20},
+        page=2,
+        snapshot_total=416,
+        snapshot_at=time.time(),
+    )
+    fields.update(changes)
+    return Cursor(**fields)
+
+
+def test_round_trip():
+    cursor = make_cursor()
+    decoded = decode_cursor(encode_cursor(cursor, USER), "search_contracts", USER)
+    assert (decoded.arguments, decoded.page, decoded.snapshot_total) == (cursor.arguments, 2, 416)
+
+
+def test_cursor_of_another_user_is_rejected():
+    token = encode_cursor(make_cursor(), USER)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(token, "search_contracts", "other@example.com")
+
+
+def test_edited_cursor_is_rejected():
+    payload, signature = encode_cursor(make_cursor(), USER).split(".")
+    edited = _b64decode(payload).replace(b'"p":2', b'"p":9')
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(f"{_b64encode(edited)}.{signature}", "search_contracts", USER)
+
+
+@pytest.mark.parametrize("token", ["", "garbage", "a.b.c", "!!!.???"])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(token, "search_contracts", USER)
+
+
+def test_cursor_for_another_tool_is_rejected():
+    token = encode_cursor(make_cursor(), USER)
+    with pytest.raises(ValueError, match="belongs to search_contracts"):
+        decode_cursor(token, "search_workflows", USER)
+
+
+def test_expired_cursor_is_rejected():
+    token = encode_cursor(make_cursor(snapshot_at=time.time() - pagination.CURSOR_TTL_SECONDS - 1), USER)
+    with pytest.raises(ValueError, match="expired"):
+        decode_cursor(token, "search_contracts", USER)
+
+
+def test_snapshot_note_reports_changes_only():
+    cursor = make_cursor()
+    assert snapshot_note(None, 500) == ""
+    assert snapshot_note(cursor, 416) == ""
+    assert snapshot_note(cursor, UNKNOWN_TOTAL) == ""
+    assert "420, 4 added" in snapshot_note(cursor, 420)
+    assert "410, 6 removed" in snapshot_note(cursor, 410)
+
+
+def test_prefetched_page_is_taken_once_by_its_user():
+    async def scenario():
+        prefetcher = PagePrefetcher()
+
+        async def fetch():
+            return "page 3"
+
+        prefetcher.schedule(USER, "token", fetch)
+        assert await prefetcher.take("other@example.com", "token") is None
+        assert await prefetcher.take(USER, "token") == "page 3"
+        assert await prefetcher.take(USER, "token") is None
+
+    asyncio.run(scenario())
+
+
+def test_prefetches_of_a_closed_session_are_cancelled():
+    async def scenario():
+        prefetcher = PagePrefetcher()
+        started = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            await asyncio.sleep(60)
+
+        prefetcher.schedule(USER, "token", fetch, session="s1")
+        await started.wait()
+        assert prefetcher.cancel_session("s1") == 1
+        assert await prefetcher.take(USER, "token") is None
+
+    asyncio.run(scenario())
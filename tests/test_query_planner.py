@@ -0,0 +1,46 @@
+import asyncio
+
+from ironclad_mcp.query_planner import PAGE_SIZE, SERVER_FILTER, QueryPlanner
+from ironclad_mcp.record_index import RecordSummaryIndex
+
+
+class PagedClient:
+    """Serves search_records from a list, capping pages like the Records API"""
+
+    def __init__(self, total):
+        self.records = [{"id": f"r{i}", "name": f"Contract {i}", "properties": {}} for i in range(total)]
+        self.requests = []
+
+    async def search_records(self, page_size=20, page=0, **filters):
+        page_size = min(page_size, PAGE_SIZE)
+        self.requests.append((page_size, page))
+        start = page * page_size
+        return {"records": self.records[start:start + page_size], "total": len(self.records)}
+
+
+def run(client, **kwargs):
+    planner = QueryPlanner(client, RecordSummaryIndex(), index_ttl_seconds=60)
+    return asyncio.run(planner.run(**kwargs))
+
+
+def test_server_filter_page_within_api_limit():
+    client = PagedClient(250)
+    result = run(client, limit=20, page=2)
+    assert result.plan.strategy == SERVER_FILTER
+    assert [r["id"] for r in result.records] == [f"r{i}" for i in range(40, 60)]
+    assert client.requests == [(20, 2)]
+
+
+def test_server_filter_page_larger_than_api_limit():
+    client = PagedClient(500)
+    result = run(client, limit=150, page=1)
+    assert result.total == 500
+    assert [r["id"] for r in result.records] == [f"r{i}" for i in range(150, 300)]
+    assert client.requests == [(PAGE_SIZE, 1), (PAGE_SIZE, 2)]
+
+
+def test_server_filter_large_page_stops_at_last_record():
+    client = PagedClient(180)
+    result = run(client, limit=150, page=1)
+    assert [r["id"] for r in result.records] == [f"r{i}" for i in range(150, 180)]
+    assert client.requests == [(PAGE_SIZE, 1)]
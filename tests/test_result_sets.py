@@ -0,0 +1,91 @@
+import pytest
+
+from ironclad_mcp.result_sets import ResultSetStore, flatten_record
+
+SESSION = ("user@example.com", "session-1")
+
+
+def record(record_id, **properties):
+    return flatten_record({
+        "id": record_id,
+        "name": f"Contract {record_id}",
+        "type": "procurementAgreement",
+        "properties": {key: {"type": "string", "value": value} for key, value in properties.items()},
+    })
+
+
+RECORDS = [
+    record("a", tags=["msa", "nda"], fee={"amount": 150000, "currency": "USD"}, region="EMEA"),
+    record("b", tags=["nda"], fee={"amount": 50000, "currency": "USD"}, region="EMEA"),
+    record("c", tags=[], fee={"amount": 20000, "currency": "USD"}, region="AMER"),
+    record("d", fee={"amount": 80000, "currency": "USD"}),
+]
+
+
+@pytest.fixture
+def store():
+    return ResultSetStore(memory_records=100)
+
+
+def test_aggregate_counts_list_values_per_member(store):
+    handle = store.add(SESSION, RECORDS, "all").handle
+    rows = store.aggregate(SESSION, handle, "count", None, "tags")
+    assert sorted(rows) == [("(none)", 2.0, 2), ("msa", 1.0, 1), ("nda", 2.0, 2)]
+
+
+def test_aggregate_sums_amounts_per_group(store):
+    handle = store.add(SESSION, RECORDS, "all").handle
+    rows = store.aggregate(SESSION, handle, "sum", "fee", "region")
+    assert rows == [("EMEA", 200000.0, 2), ("(none)", 80000.0, 1), ("AMER", 20000.0, 1)]
+    assert store.aggregate(SESSION, handle, "max", "fee") == [("all", 150000.0, 4)]
+
+
+def test_aggregate_rejects_unknown_metric_and_missing_field(store):
+    handle = store.add(SESSION, RECORDS, "all").handle
+    with pytest.raises(ValueError):
+        store.aggregate(SESSION, handle, "median", "fee")
+    with pytest.raises(ValueError):
+        store.aggregate(SESSION, handle, "sum")
+
+
+def test_refine_and_sort_make_new_sets(store):
+    handle = store.add(SESSION, RECORDS, "all").handle
+    refined = store.refine(SESSION, handle, {"field": "fee", "gt": 60000})
+    assert [r["id"] for r in refined.records()] == ["a", "d"]
+    ordered = store.sort(SESSION, handle, "region", descending=True)
+    assert [r["id"] for r in ordered.records()] == ["a", "b", "c", "d"]
+    assert store.get(SESSION, handle).count == 4
+
+
+def test_result_sets_are_private_to_their_session(store):
+    handle = store.add(SESSION, RECORDS, "all").handle
+    with pytest.raises(ValueError, match="not found"):
+        store.get(("other@example.com", "session-1"), handle)
+    store.drop_session(SESSION)
+    with pytest.raises(ValueError, match="not found"):
+        store.get(SESSION, handle)
+
+
+def test_large_sets_spill_to_a_private_directory(tmp_path):
+    directory = tmp_path / "spill"
+    store = ResultSetStore(memory_records=2, directory=directory)
+    result_set = store.add(SESSION, RECORDS, "all")
+    assert result_set.spilled
+    assert result_set.path.parent == directory
+    assert directory.stat().st_mode & 0o777 == 0o700
+    assert result_set.path.stat().st_mode & 0o777 == 0o600
+    assert [r["id"] for r in result_set.records()] == ["a", "b", "c", "d"]
+    store.drop_session(SESSION)
+    assert not result_set.path.exists()
+
+
+def test_sets_stay_in_memory_when_the_directory_is_a_symlink(tmp_path):
+    target = tmp_path / "elsewhere"
+    target.mkdir()
+    link = tmp_path / "spill"
+    link.symlink_to(target)
+    store = ResultSetStore(memory_records=2, directory=link)
+    result_set = store.add(SESSION, RECORDS, "all")
+    assert not result_set.spilled
+    assert list(target.iterdir()) == []
+    assert result_set.count == 4
@@ -0,0 +1,75 @@
+import os
+import time
+
+from ironclad_mcp.scan_checkpoints import ScanCheckpoint, ScanCheckpointStore, scan_fingerprint
+
+MATCHES = [{"id": "r1", "name": "Contract 1"}, {"id": "r2", "name": "Contract 2"}]
+
+
+def checkpoint(fingerprint="f" * 32):
+    return ScanCheckpoint(fingerprint=fingerprint, next_page=7, total=1200, seen_dated=True, matches=list(MATCHES))
+
+
+def test_fingerprint_depends_on_user_and_scope():
+    scope = {"record_type": "procurementAgreement", "date_from": "2024-01-01"}
+    assert scan_fingerprint("a@example.com", scope) == scan_fingerprint("a@example.com", dict(reversed(scope.items())))
+    assert scan_fingerprint("a@example.com", scope) != scan_fingerprint("b@example.com", scope)
+    assert scan_fingerprint("a@example.com", scope) != scan_fingerprint("a@example.com", {**scope, "date_to": "2024-12-31"})
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = ScanCheckpointStore(tmp_path / "checkpoints")
+    store.save(checkpoint())
+    loaded = store.load("f" * 32)
+    assert (loaded.next_page, loaded.total, loaded.seen_dated) == (7, 1200, True)
+    assert loaded.matches == MATCHES
+    store.discard("f" * 32)
+    assert store.load("f" * 32) is None
+
+
+def test_checkpoints_are_private(tmp_path):
+    directory = tmp_path / "checkpoints"
+    ScanCheckpointStore(directory).save(checkpoint())
+    assert directory.stat().st_mode & 0o777 == 0o700
+    for path in directory.iterdir():
+        assert path.stat().st_mode & 0o777 == 0o600
+
+
+def test_readable_directory_is_made_private(tmp_path):
+    directory = tmp_path / "checkpoints"
+    directory.mkdir(mode=0o755)
+    os.chmod(directory, 0o755)
+    ScanCheckpointStore(directory).save(checkpoint())
+    assert directory.stat().st_mode & 0o777 == 0o700
+
+
+def test_symlinked_directory_is_refused(tmp_path):
+    target = tmp_path / "elsewhere"
+    target.mkdir()
+    link = tmp_path / "checkpoints"
+    link.symlink_to(target)
+    # A planted checkpoint behind the link is never read
+    ScanCheckpointStore(target).save(checkpoint())
+    store = ScanCheckpointStore(link)
+    assert store.load("f" * 32) is None
+    store.save(checkpoint("e" * 32))
+    assert not (target / f"{'e' * 32}.json").exists()
+
+
+def test_expired_checkpoints_are_discarded(tmp_path):
+    store = ScanCheckpointStore(tmp_path / "checkpoints", ttl_seconds=60)
+    store.save(checkpoint())
+    meta_path = tmp_path / "checkpoints" / f"{'f' * 32}.json"
+    old = time.time() - 120
+    os.utime(meta_path, (old, old))
+    store.prune()
+    assert not meta_path.exists()
+    assert store.load("f" * 32) is None
+
+
+def test_unreadable_checkpoint_is_discarded(tmp_path):
+    store = ScanCheckpointStore(tmp_path / "checkpoints")
+    store.save(checkpoint())
+    (tmp_path / "checkpoints" / f"{'f' * 32}.jsonl").write_text("not json\n")
+    assert store.load("f" * 32) is None
+    assert list((tmp_path / "checkpoints").iterdir()) == []
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from ironclad_mcp.deadlines import DeadlineExceeded, deadline_scope
+from ironclad_mcp.upstream_scheduler import (
+    BACKGROUND,
+    BROWSE,
+    BULK,
+    INTERACTIVE,
+    UpstreamScheduler,
+    current_priority,
+    upstream_priority,
+)
+
+
+async def queue(scheduler, order, name, priority, user=None):
+    """Start a request that records its name once it gets a slot, and let it queue"""
+    async def request():
+        await scheduler.acquire(priority, user)
+        order.append(name)
+
+    task = asyncio.create_task(request())
+    await asyncio.sleep(0)
+    return task
+
+
+def test_free_slots_go_to_the_most_urgent_class():
+    async def scenario():
+        scheduler = UpstreamScheduler(concurrency=1, aging_seconds=60)
+        await scheduler.acquire(BULK)
+        order = []
+        tasks = [
+            await queue(scheduler, order, "background", BACKGROUND),
+            await queue(scheduler, order, "bulk", BULK),
+            await queue(scheduler, order, "interactive", INTERACTIVE),
+            await queue(scheduler, order, "browse", BROWSE),
+        ]
+        assert order == []
+        for _ in tasks:
+            scheduler.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "browse", "bulk", "background"]
+
+
+def test_queued_requests_age_into_higher_classes():
+    async def scenario():
+        scheduler = UpstreamScheduler(concurrency=1, aging_seconds=0.02)
+        await scheduler.acquire(BROWSE)
+        order = []
+        bulk = await queue(scheduler, order, "bulk", BULK)
+        await asyncio.sleep(0.1)
+        interactive = await queue(scheduler, order, "interactive", INTERACTIVE)
+        for _ in range(2):
+            scheduler.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(bulk, interactive)
+        return order
+
+    assert asyncio.run(scenario()) == ["bulk", "interactive"]
+
+
+def test_per_user_cap_queues_a_user_while_slots_are_free():
+    async def scenario():
+        scheduler = UpstreamScheduler(concurrency=4, aging_seconds=60, per_user=1)
+        assert await scheduler.acquire(BROWSE, "heavy") == 0.0
+        order = []
+        second = await queue(scheduler, order, "heavy again", BROWSE, "heavy")
+        assert order == []
+        assert await scheduler.acquire(BROWSE, "light") == 0.0
+        scheduler.release("heavy")
+        await second
+        return order
+
+    assert asyncio.run(scenario()) == ["heavy again"]
+
+
+def test_user_with_fewer_requests_in_flight_goes_first():
+    async def scenario():
+        scheduler = UpstreamScheduler(concurrency=3, aging_seconds=60)
+        for _ in range(2):
+            await scheduler.acquire(BULK, "heavy")
+        await scheduler.acquire(BULK, "light")
+        order = []
+        heavy = await queue(scheduler, order, "heavy", BULK, "heavy")
+        light = await queue(scheduler, order, "light", BULK, "light")
+        scheduler.release("light")
+        await asyncio.sleep(0)
+        scheduler.release("heavy")
+        await asyncio.gather(heavy, light)
+        return order
+
+    # With "light"'s slot freed, it has none in flight against two for "heavy"
+    assert asyncio.run(scenario()) == ["light", "heavy"]
+
+
+def test_deadline_passing_while_queued_raises_and_leaves_the_queue():
+    async def scenario():
+        scheduler = UpstreamScheduler(concurrency=1, aging_seconds=60)
+        await scheduler.acquire(BULK)
+        with deadline_scope(0.05):
+            with pytest.raises(DeadlineExceeded):
+                await scheduler.acquire(INTERACTIVE)
+        assert scheduler._waiting == []
+        scheduler.release()
+        # The slot is free again, not held by the abandoned request
+        assert await scheduler.acquire(BROWSE) == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_request_leaves_the_queue():
+    async def scenario():
+        scheduler = UpstreamScheduler(concurrency=1, aging_seconds=60)
+        await scheduler.acquire(BULK)
+        task = await queue(scheduler, [], "cancelled", BROWSE)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert scheduler._waiting == []
+
+    asyncio.run(scenario())
+
+
+def test_upstream_priority_sets_the_class_for_the_block():
+    assert current_priority.get() == BROWSE
+    with upstream_priority(BACKGROUND):
+        assert current_priority.get() == BACKGROUND
+    assert current_priority.get() == BROWSE
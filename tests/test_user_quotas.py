@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from ironclad_mcp.deadlines import deadline_scope
+from ironclad_mcp.user_quotas import CONCURRENT_SCANS, PAGES_PER_MINUTE, QuotaExceeded, UserQuotas
+
+
+def test_page_quota_is_per_user():
+    async def scenario():
+        quotas = UserQuotas(pages_per_minute=2, max_wait_seconds=0)
+        await quotas.take_page("a")
+        await quotas.take_page("a")
+        with pytest.raises(QuotaExceeded) as raised:
+            await quotas.take_page("a")
+        await quotas.take_page("b")
+        return raised.value, quotas.page_retry_after("a"), quotas.page_retry_after("b")
+
+    error, retry_a, retry_b = asyncio.run(scenario())
+    assert error.quota == PAGES_PER_MINUTE
+    assert 29 < error.retry_after <= 30
+    assert error.retry_after_header() == "30"
+    assert 29 < retry_a <= 30
+    assert retry_b == 0.0
+
+
+def test_page_waits_for_the_allowance_to_refill():
+    async def scenario():
+        quotas = UserQuotas(pages_per_minute=600, max_wait_seconds=1)
+        for _ in range(600):
+            await quotas.take_page("a")
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await quotas.take_page("a")
+        return loop.time() - start
+
+    assert 0.05 < asyncio.run(scenario()) < 0.5
+
+
+def test_deadline_shortens_the_wait_for_a_page():
+    async def scenario():
+        quotas = UserQuotas(pages_per_minute=1, max_wait_seconds=3600)
+        await quotas.take_page("a")
+        with deadline_scope(0.5):
+            with pytest.raises(QuotaExceeded):
+                await quotas.take_page("a")
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_wait_gives_the_page_back():
+    async def scenario():
+        quotas = UserQuotas(pages_per_minute=60, max_wait_seconds=5)
+        for _ in range(60):
+            await quotas.take_page("a")
+        waiting = asyncio.create_task(quotas.take_page("a"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        return quotas.page_retry_after("a")
+
+    # Only the 60 pages actually taken count against the allowance (the
+    # reserved 61st would push the retry to 2s)
+    assert asyncio.run(scenario()) <= 1.0
+
+
+def test_no_page_quota_when_disabled():
+    async def scenario():
+        quotas = UserQuotas(pages_per_minute=0, max_wait_seconds=0)
+        for _ in range(1000):
+            await quotas.take_page("a")
+
+    asyncio.run(scenario())
+
+
+def test_scan_quota_rejects_a_scan_over_the_limit():
+    async def scenario():
+        quotas = UserQuotas(max_scans=1, max_wait_seconds=0.05)
+        async with quotas.scan_slot("a"):
+            with pytest.raises(QuotaExceeded) as raised:
+                async with quotas.scan_slot("a"):
+                    pass
+            async with quotas.scan_slot("b"):
+                pass
+        async with quotas.scan_slot("a"):
+            pass
+        return raised.value
+
+    assert asyncio.run(scenario()).quota == CONCURRENT_SCANS
+
+
+def test_queued_scan_takes_the_place_of_a_finished_one():
+    async def scenario():
+        quotas = UserQuotas(max_scans=1, max_wait_seconds=5)
+        order = []
+
+        async def scan(name, seconds):
+            async with quotas.scan_slot("a"):
+                order.append(f"{name} start")
+                await asyncio.sleep(seconds)
+                order.append(f"{name} end")
+
+        await asyncio.gather(scan("first", 0.05), scan("second", 0))
+        return order, quotas._scans, quotas._scan_waiters
+
+    order, scans, waiters = asyncio.run(scenario())
+    assert order == ["first start", "first end", "second start", "second end"]
+    assert scans == {} and waiters == {}